@@ -144,6 +144,12 @@ def plot_verbose_position_heatmaps(index_file, output_file, normalize):
 @click.option('--node-scaling', type=float, default=1e5, help="Scale factor for nodes by usage")
 @click.option('--scale-node-by-usage', type=bool, default=True, help="Scale node sizes by usages probabilities")
 @click.option('--width-per-group', type=float, default=8, help="Width (in inches) for figure canvas per group")
+@click.option('--cache-layout', is_flag=True, help="Save the node layout next to the output file and reuse it in later plots")
+@click.option('--n-bootstrap', type=int, default=0, help="Number of session bootstrap draws used to only show significant difference edges (0 shows all)")
+@click.option('--bootstrap-alpha', type=float, default=0.05, help="Significance level for bootstrapped difference edges")
+@click.option('--separate-figures', is_flag=True, help="Also save each group and difference graph to its own file, rendered in parallel")
+@click.option('--processes', type=int, default=None, help="Number of processes used to render separate figures")
+@click.option('--skip-summary', is_flag=True, help="Do not save the combined figure when rendering separate figures")
 def plot_transition_graph(index_file, model_fit, output_file, **config_data):
 
     plot_transition_graph_wrapper(index_file, model_fit, output_file, config_data)
@@ -364,6 +364,10 @@ def plot_transition_graph_wrapper(index_file, model_fit, output_file, config_dat
         except ImportError:
             raise ImportError('pygraphviz must be installed to use graphviz layout engines')
 
+    # Optionally persist the node layout next to the output file to keep node positions stable across plots
+    if config_data.get('cache_layout', False):
+        config_data['layout_cache_file'] = f'{output_file}_layout.p'
+
 # Get labels and optionally relabel them by usage sorting
     if config_data['sort']:
         model_data['labels'] = relabel_by_usage(model_data['labels'], count=config_data['count'])[0]
@@ -379,7 +383,7 @@ def plot_transition_graph_wrapper(index_file, model_fit, output_file, config_dat
     print('Computing transition matrices...')
     try:
         # Compute and plot Transition Matrices
-        plt = compute_and_graph_grouped_TMs(config_data, model_data['labels'], label_group, group)
+        plt = compute_and_graph_grouped_TMs(config_data, model_data['labels'], label_group, group, output_file)
     except Exception as e:
         print('Error:', e)
         print('Incorrectly inputted group, plotting all groups.')
@@ -388,10 +392,11 @@ def plot_transition_graph_wrapper(index_file, model_fit, output_file, config_dat
         group = sorted(list(set(label_group)))
 
         print('Recomputing transition matrices...')
-        plt = compute_and_graph_grouped_TMs(config_data, model_data['labels'], label_group, group)
+        plt = compute_and_graph_grouped_TMs(config_data, model_data['labels'], label_group, group, output_file)
 
     # Save figure
-    save_fig(plt, output_file)
+    if plt is not None:
+        save_fig(plt, output_file)
 
     return plt
 
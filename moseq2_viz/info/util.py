@@ -3,115 +3,487 @@ Utility functions for computing syllable usage entropy, and syllable transition
 These can be used for measuring modeling model performance and group separability.
 '''
 import numpy as np
-from moseq2_viz.model.trans_graph import get_transition_matrix
-from moseq2_viz.model.util import get_syllable_statistics, relabel_by_usage
+from scipy.sparse import csr_matrix
+from joblib import Parallel, delayed
+from moseq2_viz.util import as_seed_sequence, get_rng_blocks, draw_rng_blocks
+from moseq2_viz.model.trans_graph import normalize_transition_matrix
 
 
-
-def entropy(labels, truncate_syllable=40, smoothing=1.0, relabel_by='usage'):
+def _get_syllable_runs(labels, relabel_by='usage'):
     '''
-    Computes syllable usage entropy, base 2.
+    Run-length encodes the syllable labels of all sessions at once, optionally relabeling the syllables by
+     their usage across all sessions (as in `relabel_by_usage`) through a lookup table on the run labels.
+     As in `get_transitions`, the first run of each session (usually the -5 padding) is dropped.
 
     Parameters
     ----------
-    labels (list of np.ndarray): list of predicted syllable label arrays from a group of sessions
-    truncate_syllable (int): truncate list of relabeled syllables
-    smoothing (float): a constant added to label usages before normalization
+    labels (list or dict): list of predicted syllable label arrays, one per session.
     relabel_by (str): mode to relabel predicted labels. Either 'usage', 'frames', or None.
 
     Returns
     -------
-    ent (list): list of entropies for each session.
+    run_labels (1D np.ndarray): syllable label of each run, concatenated across sessions.
+    run_session (1D np.ndarray): session index of each run.
+    n_sessions (int): number of sessions.
     '''
 
+    if isinstance(labels, dict):
+        labels = list(labels.values())
+    labels = [np.asarray(v) for v in labels]
+    n_sessions = len(labels)
+
+    lengths = np.array([len(v) for v in labels], dtype='int64')
+    session_starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    all_labels = np.concatenate(labels).astype('int64') if n_sessions > 0 else np.zeros(0, dtype='int64')
+
+    # runs start at every label change and at every session boundary
+    run_start = np.ones(len(all_labels), dtype='bool')
+    run_start[1:] = all_labels[1:] != all_labels[:-1]
+    run_start[session_starts[lengths > 0]] = True
+    onsets = np.where(run_start)[0]
+
+    run_labels = all_labels[onsets]
+    run_session = np.repeat(np.arange(n_sessions), lengths)[onsets]
+    first_run = np.zeros(len(onsets), dtype='bool')
+    first_run[np.searchsorted(onsets, session_starts[lengths > 0])] = True
+
     if relabel_by is not None:
-        labels, _ = relabel_by_usage(labels, count=relabel_by)
+        assert relabel_by in ('usage', 'frames'), 'relabel_by must be "usage", "frames" or None'
+        # relabel_by_usage counts all runs (including the first) of the 100 possible syllables
+        n_sort = 100
+        in_sort = (run_labels >= 0) & (run_labels < n_sort)
+        weights = None
+        if relabel_by == 'frames':
+            weights = np.diff(np.append(onsets, len(all_labels)))[in_sort]
+        global_counts = np.bincount(run_labels[in_sort], weights=weights, minlength=n_sort)
+
+        lut = np.empty(n_sort, dtype='int64')
+        lut[np.argsort(-global_counts, kind='stable')] = np.arange(n_sort)
+        run_labels = np.where(in_sort, lut[np.clip(run_labels, 0, n_sort - 1)], run_labels)
 
-    ent = []
-    for v in labels:
-        usages = get_syllable_statistics([v])[0]
+    keep = ~first_run
 
-        syllables = np.array(list(usages))
-        truncate_point = np.where(syllables == truncate_syllable)[0]
+    return run_labels[keep], run_session[keep], n_sessions
 
-        if truncate_point is None or len(truncate_point) != 1:
-            truncate_point = len(syllables)
-        else:
-            truncate_point = truncate_point[0]
 
-        usages = np.array(list(usages.values()), dtype='float')
-        usages = usages[:truncate_point] + smoothing
-        usages /= usages.sum()
+def get_syllable_counts(labels, max_syllable=100, relabel_by='usage'):
+    '''
+    Computes per-session syllable usages and transition counts in a single vectorized pass over all sessions.
+    Syllables are optionally relabeled by their usage across all sessions (as in `relabel_by_usage`) through a
+    lookup table on the syllable runs, so the frame labels are never copied. As in `get_syllable_statistics`
+    and `get_transition_matrix`, the first run of each session (usually the -5 padding) is skipped.
+
+    Parameters
+    ----------
+    labels (list of np.ndarray): list of predicted syllable label arrays, one per session.
+    max_syllable (int): number of syllables to count.
+    relabel_by (str): mode to relabel predicted labels. Either 'usage', 'frames', or None.
+
+    Returns
+    -------
+    usages (2D np.ndarray): syllable usage counts with shape (n_sessions, max_syllable).
+    trans_counts (3D np.ndarray): syllable transition counts with shape (n_sessions, max_syllable, max_syllable),
+     where rows are the outgoing and columns the incoming syllables.
+    '''
 
-        entropy = -np.sum(usages * np.log2(usages))
-        ent.append(entropy)
+    run_labels, run_session, n_sessions = _get_syllable_runs(labels, relabel_by=relabel_by)
+    valid = (run_labels >= 0) & (run_labels < max_syllable)
 
-    return ent
+    usages = np.bincount(run_session[valid] * max_syllable + run_labels[valid],
+                         minlength=n_sessions * max_syllable).astype('float')
+    usages = usages.reshape(n_sessions, max_syllable)
 
+    # bigrams of consecutive runs within the same session
+    pair = (run_session[1:] == run_session[:-1]) & valid[1:] & valid[:-1]
+    flat_idx = np.ravel_multi_index((run_session[:-1][pair], run_labels[:-1][pair], run_labels[1:][pair]),
+                                    (n_sessions, max_syllable, max_syllable))
+    trans_counts = np.bincount(flat_idx, minlength=n_sessions * max_syllable ** 2).astype('float')
+    trans_counts = trans_counts.reshape(n_sessions, max_syllable, max_syllable)
 
-def entropy_rate(labels, truncate_syllable=40, normalize='bigram',
-                 smoothing=1.0, tm_smoothing=1.0, relabel_by='usage'):
+    return usages, trans_counts
+
+
+def _get_truncate_point(truncate_syllable, max_syllable):
     '''
-    Computes entropy rate, base 2 using provided syllable labels. If
-    syllable labels have not been re-labeled by usage, this function will do so.
+    Returns the number of syllables kept when truncating at `truncate_syllable`.
 
     Parameters
     ----------
-    labels (list or np.ndarray): a list of label arrays, where each entry in the list
-            is an array of labels for one subject.
+    truncate_syllable (int): truncate list of relabeled syllables
+    max_syllable (int): number of counted syllables.
+
+    Returns
+    -------
+    truncate_point (int): number of syllables to keep.
+    '''
+
+    if 0 <= truncate_syllable < max_syllable:
+        return int(truncate_syllable)
+    return max_syllable
+
+
+def _usage_probabilities(usages, truncate_syllable, smoothing):
+    '''
+    Truncates, smooths and normalizes syllable usage counts.
+
+    Parameters
+    ----------
+    usages (2D np.ndarray): syllable usage counts with shape (n_sessions, n_syllables).
+    truncate_syllable (int): truncate list of relabeled syllables
+    smoothing (float): a constant added to label usages before normalization
+
+    Returns
+    -------
+    usages (2D np.ndarray): syllable usage probabilities with shape (n_sessions, truncate_point).
+    '''
+
+    truncate_point = _get_truncate_point(truncate_syllable, usages.shape[1])
+    usages = usages[:, :truncate_point] + smoothing
+    return usages / usages.sum(axis=1, keepdims=True)
+
+
+def entropy_from_counts(usages, truncate_syllable=40, smoothing=1.0):
+    '''
+    Computes syllable usage entropy, base 2, from syllable usage counts.
+
+    Parameters
+    ----------
+    usages (2D np.ndarray): syllable usage counts with shape (n_sessions, n_syllables) (see `get_syllable_counts`).
+    truncate_syllable (int): truncate list of relabeled syllables
+    smoothing (float): a constant added to label usages before normalization
+
+    Returns
+    -------
+    ent (np.ndarray): entropy of each session.
+    '''
+
+    usages = _usage_probabilities(np.atleast_2d(usages), truncate_syllable, smoothing)
+    return -np.sum(usages * np.log2(usages), axis=1)
+
+
+def entropy_rate_from_counts(usages, trans_counts, truncate_syllable=40, normalize='bigram',
+                             smoothing=1.0, tm_smoothing=1.0):
+    '''
+    Computes entropy rate, base 2, from syllable usage and transition counts.
+
+    Parameters
+    ----------
+    usages (2D np.ndarray): syllable usage counts with shape (n_sessions, n_syllables) (see `get_syllable_counts`).
+    trans_counts (3D np.ndarray): syllable transition counts with shape (n_sessions, n_syllables, n_syllables).
     truncate_syllable (int): maximum number of labels to keep for this calculation.
     normalize (str): the type of transition matrix normalization to perform. Options
             are: 'bigram', 'rows', or 'columns'.
     smoothing (float): a constant added to label usages before normalization
     tm_smoothing (float): a constant added to label transtition counts before normalization.
+
+    Returns
+    -------
+    ent (np.ndarray): entropy rate of each session.
+    '''
+
+    usages = _usage_probabilities(np.atleast_2d(usages), truncate_syllable, smoothing)
+    truncate_point = usages.shape[1]
+
+    trans_counts = trans_counts if np.ndim(trans_counts) == 3 else trans_counts[None]
+    tm = trans_counts[:, :truncate_point, :truncate_point] + tm_smoothing
+    tm = normalize_transition_matrix(tm, normalize)
+
+    return -np.sum(usages[:, None, :] * tm * np.log2(tm), axis=(1, 2))
+
+
+def transition_entropy_from_counts(trans_counts, tm_smoothing=0, truncate_syllable=40, transition_type='incoming'):
+    '''
+    Computes directional syllable transition entropy from syllable transition counts.
+
+    Parameters
+    ----------
+    trans_counts (3D np.ndarray): syllable transition counts with shape (n_sessions, n_syllables, n_syllables)
+     (see `get_syllable_counts`).
+    tm_smoothing (float): a constant added to label transtition counts before normalization.
+    truncate_syllable (int): maximum number of labels to keep for this calculation.
+    transition_type (str): can be either "incoming" or "outgoing" to compute the entropy of each
+        incoming or outgoing syllable transition.
+
+    Returns
+    -------
+    entropies (2D np.ndarray): transition entropies with shape (n_sessions, truncate_point).
+    '''
+
+    if transition_type not in ('incoming', 'outgoing'):
+        raise ValueError('transition_type must be incoming or outgoing')
+
+    trans_counts = trans_counts if np.ndim(trans_counts) == 3 else trans_counts[None]
+    truncate_point = _get_truncate_point(truncate_syllable, trans_counts.shape[-1])
+    tm = trans_counts[:, :truncate_point, :truncate_point] + tm_smoothing
+
+    if transition_type == 'outgoing':
+        # normalize each row (outgoing syllables)
+        tm = tm.transpose(0, 2, 1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        tm = tm / tm.sum(axis=1, keepdims=True)
+        return -np.nansum(tm * np.log2(tm), axis=1)
+
+
+def compute_entropy_metrics(labels, truncate_syllable=40, normalize='bigram', smoothing=1.0,
+                            tm_smoothing=1.0, transition_tm_smoothing=0, relabel_by='usage'):
+    '''
+    Computes syllable usage entropy, entropy rate and incoming/outgoing transition entropy for each
+     session from a single pass over the labels (see `get_syllable_counts`).
+
+    Parameters
+    ----------
+    labels (list or dict): list of predicted syllable label arrays, one per session.
+    truncate_syllable (int): maximum number of labels to keep for this calculation.
+    normalize (str): the type of transition matrix normalization to perform for the entropy rate.
+    smoothing (float): a constant added to label usages before normalization
+    tm_smoothing (float): a constant added to label transtition counts before computing the entropy rate.
+    transition_tm_smoothing (float): a constant added to label transtition counts before computing
+     the transition entropies.
+    relabel_by (str): how to re-order labels. Options are: 'usage', 'frames', or None.
+
+    Returns
+    -------
+    metrics (dict): dictionary with the 'entropy' and 'entropy_rate' of each session (1D arrays) and the
+     'incoming_transition_entropy' and 'outgoing_transition_entropy' of each session and syllable (2D arrays).
+    '''
+
+    usages, trans_counts = get_syllable_counts(labels, relabel_by=relabel_by)
+
+    return {
+        'entropy': entropy_from_counts(usages, truncate_syllable, smoothing),
+        'entropy_rate': entropy_rate_from_counts(usages, trans_counts, truncate_syllable, normalize,
+                                                 smoothing, tm_smoothing),
+        'incoming_transition_entropy': transition_entropy_from_counts(trans_counts, transition_tm_smoothing,
+                                                                      truncate_syllable, 'incoming'),
+        'outgoing_transition_entropy': transition_entropy_from_counts(trans_counts, transition_tm_smoothing,
+                                                                      truncate_syllable, 'outgoing'),
+    }
+
+
+def _block_bootstrap_counts(runs, n_syllables, blocks, block_size):
+    '''
+    Computes syllable usage and transition counts of moving-block bootstrap resamples of one session's
+     run sequence. Each resample concatenates randomly placed blocks of `block_size` consecutive runs;
+     the number of times every run (and bigram within a block) is covered is accumulated with cumulative
+     sums, and the counts follow from a single sparse matrix product.
+
+    Parameters
+    ----------
+    runs (1D np.ndarray): syllable label of each run in the session.
+    n_syllables (int): number of syllables to count; runs with other labels are not counted.
+    blocks (list): seeded blocks of resamples in this chunk (see `moseq2_viz.util.get_rng_blocks`).
+    block_size (int): number of consecutive runs in each block.
+
+    Returns
+    -------
+    usages (2D np.ndarray): syllable usage counts with shape (n_draws, n_syllables).
+    trans_counts (3D np.ndarray): syllable transition counts with shape (n_draws, n_syllables, n_syllables).
+    '''
+
+    n_runs = len(runs)
+    block_size = max(1, min(block_size, n_runs))
+    n_starts = n_runs - block_size + 1
+    n_blocks = max(1, int(round(n_runs / block_size)))
+
+    # cumulative number of blocks starting at or before each run, with shape (n_runs, n_draws)
+    starts = draw_rng_blocks(blocks, lambda rng, n: rng.integers(0, n_starts, size=(n, n_blocks)))
+    n_draws = len(starts)
+    starts = starts * n_draws + np.arange(n_draws)[:, None]
+    cum_starts = np.bincount(starts.ravel(), minlength=n_runs * n_draws).reshape(n_runs, n_draws)
+    np.cumsum(cum_starts, axis=0, out=cum_starts)
+
+    # run k is covered by the blocks starting in [k - block_size + 1, k]
+    run_cover = cum_starts.astype('float')
+    run_cover[block_size:] -= cum_starts[:n_runs - block_size]
+    # bigram (k, k + 1) is covered by the blocks starting in [k - block_size + 2, k]
+    bigram_cover = cum_starts[:-1].astype('float')
+    if block_size > 1:
+        bigram_cover[block_size - 1:] -= cum_starts[:n_runs - block_size]
+    else:
+        bigram_cover[:] = 0
+
+    valid = (runs >= 0) & (runs < n_syllables)
+    run_idx = np.where(valid)[0]
+    run_onehot = csr_matrix((np.ones(len(run_idx)), (runs[run_idx], run_idx)), shape=(n_syllables, n_runs))
+    usages = run_onehot.dot(run_cover).T
+
+    bigram_idx = np.where(valid[1:] & valid[:-1])[0]
+    bigram_onehot = csr_matrix((np.ones(len(bigram_idx)), (runs[bigram_idx] * n_syllables + runs[bigram_idx + 1], bigram_idx)),
+                               shape=(n_syllables ** 2, max(n_runs - 1, 0)))
+    trans_counts = bigram_onehot.dot(bigram_cover).T.reshape(n_draws, n_syllables, n_syllables)
+
+    return usages, trans_counts
+
+
+def _bootstrap_entropy_chunk(runs, n_syllables, blocks, block_size, normalize, smoothing, tm_smoothing):
+    '''
+    Computes the entropy and entropy rate of a chunk of block bootstrap resamples of one session.
+
+    Parameters
+    ----------
+    runs (1D np.ndarray): syllable label of each run in the session.
+    n_syllables (int): number of syllables kept for the entropy calculations.
+    blocks (list): seeded blocks of resamples in this chunk (see `moseq2_viz.util.get_rng_blocks`).
+    block_size (int): number of consecutive runs in each block.
+    normalize (str): the type of transition matrix normalization to perform.
+    smoothing (float): a constant added to label usages before normalization
+    tm_smoothing (float): a constant added to label transtition counts before normalization.
+
+    Returns
+    -------
+    ent (1D np.ndarray): entropy of each resample, NaN if the session has no runs.
+    ent_rate (1D np.ndarray): entropy rate of each resample, NaN if the session has no runs.
+    '''
+
+    if len(runs) == 0:
+        # nothing to resample in a session without labeled runs
+        nans = np.full(sum(n for n, _ in blocks), np.nan)
+        return nans, nans.copy()
+
+    usages, trans_counts = _block_bootstrap_counts(runs, n_syllables, blocks, block_size)
+
+    ent = entropy_from_counts(usages, n_syllables, smoothing)
+    ent_rate = entropy_rate_from_counts(usages, trans_counts, n_syllables, normalize, smoothing, tm_smoothing)
+
+    return ent, ent_rate
+
+
+def bootstrap_entropy(labels, label_group=None, n_bootstrap=10000, block_size=10, ci=0.95,
+                      truncate_syllable=40, normalize='bigram', smoothing=1.0, tm_smoothing=1.0,
+                      relabel_by='usage', chunk_size=1000, seed=0, n_jobs=1):
+    '''
+    Computes bootstrap confidence intervals of the syllable usage entropy and entropy rate of each session
+     and each group. Each session's run-length encoded syllable sequence is resampled with a moving-block
+     bootstrap, so short-range transition structure is kept within blocks. Each session is resampled from its
+     own random stream of fixed seeded blocks (see `moseq2_viz.util.get_rng_blocks`), so results do not
+     depend on `chunk_size` or `n_jobs`.
+     Group intervals are computed from the mean of the session resamples in each group. Sessions without
+     labeled runs have NaN intervals and are left out of their group.
+
+    Parameters
+    ----------
+    labels (list of np.ndarray): list of predicted syllable label arrays, one per session.
+    label_group (list): optional group name of each session.
+    n_bootstrap (int): number of bootstrap resamples per session.
+    block_size (int): number of consecutive syllable runs in each resampled block.
+    ci (float): confidence level of the percentile intervals.
+    truncate_syllable (int): maximum number of labels to keep for this calculation.
+    normalize (str): the type of transition matrix normalization to perform for the entropy rate.
+    smoothing (float): a constant added to label usages before normalization
+    tm_smoothing (float): a constant added to label transtition counts before normalization.
     relabel_by (str): how to re-order labels. Options are: 'usage', 'frames', or None.
+    chunk_size (int): number of resamples computed at once, bounding memory use.
+    seed (int): random seed.
+    n_jobs (int): number of parallel jobs used to process the chunks.
 
     Returns
     -------
-    ent (list): list of entropy rates per syllable label
+    session_ci (dict): 'entropy' and 'entropy_rate' arrays with shape (n_sessions, 3) holding the point
+     estimate, lower and upper confidence bound of each session.
+    group_ci (dict): 'groups' (unique groups, in order of appearance) and 'entropy' and 'entropy_rate'
+     arrays with shape (n_groups, 3) for the mean across the sessions of each group. Empty if
+     `label_group` is None.
     '''
 
-    if relabel_by is not None:
-        labels, _ = relabel_by_usage(labels, count=relabel_by)
+    run_labels, run_session, n_sessions = _get_syllable_runs(labels, relabel_by=relabel_by)
+    n_syllables = _get_truncate_point(truncate_syllable, 100)
+    session_runs = np.split(run_labels, np.searchsorted(run_session, np.arange(1, n_sessions)))
+
+    # point estimates from the observed counts
+    usages, trans_counts = get_syllable_counts(labels, max_syllable=n_syllables, relabel_by=relabel_by)
+    estimates = {
+        'entropy': entropy_from_counts(usages, n_syllables, smoothing),
+        'entropy_rate': entropy_rate_from_counts(usages, trans_counts, n_syllables, normalize, smoothing, tm_smoothing),
+    }
+
+    seed = as_seed_sequence(seed)
+    chunks = [get_rng_blocks(seed, n_bootstrap, chunk_size, stream=i) for i in range(n_sessions)]
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(_bootstrap_entropy_chunk)(session_runs[i], n_syllables, blocks, block_size,
+                                          normalize, smoothing, tm_smoothing)
+        for i in range(n_sessions) for blocks in chunks[i])
+    n_chunks = len(chunks[0]) if n_sessions > 0 else 0
+
+    replicates = {
+        'entropy': np.array([np.concatenate([r[0] for r in results[i * n_chunks:(i + 1) * n_chunks]])
+                             for i in range(n_sessions)]),
+        'entropy_rate': np.array([np.concatenate([r[1] for r in results[i * n_chunks:(i + 1) * n_chunks]])
+                                  for i in range(n_sessions)]),
+    }
+
+    bounds = [50 * (1 - ci), 50 * (1 + ci)]
+
+    session_ci = {}
+    for metric, reps in replicates.items():
+        session_ci[metric] = np.column_stack([estimates[metric], np.percentile(reps, bounds, axis=1).T])
+
+    group_ci = {}
+    if label_group is not None:
+        label_group = np.asarray(label_group)
+        groups = list(dict.fromkeys(label_group))
+        group_ci['groups'] = groups
+        has_runs = np.array([len(r) > 0 for r in session_runs], dtype='bool')
+        for metric, reps in replicates.items():
+            stats = []
+            for g in groups:
+                in_group = (label_group == g) & has_runs
+                if not in_group.any():
+                    stats.append(np.full(3, np.nan))
+                    continue
+                group_reps = reps[in_group].mean(axis=0)
+                stats.append(np.concatenate([[estimates[metric][in_group].mean()], np.percentile(group_reps, bounds)]))
+            group_ci[metric] = np.array(stats)
+
+    return session_ci, group_ci
 
-    ent = []
-    for v in labels:
 
-        usages = get_syllable_statistics([v])[0]
-        syllables = np.array(list(usages.keys()))
-        truncate_point = np.where(syllables == truncate_syllable)[0]
+def entropy(labels, truncate_syllable=40, smoothing=1.0, relabel_by='usage'):
+    '''
+    Computes syllable usage entropy, base 2.
 
-        if truncate_point is None or len(truncate_point) != 1:
-            truncate_point = len(syllables)
-        else:
-            truncate_point = truncate_point[0]
+    Parameters
+    ----------
+    labels (list of np.ndarray): list of predicted syllable label arrays from a group of sessions
+    truncate_syllable (int): truncate list of relabeled syllables
+    smoothing (float): a constant added to label usages before normalization
+    relabel_by (str): mode to relabel predicted labels. Either 'usage', 'frames', or None.
 
-        syllables = syllables[:truncate_point]
+    Returns
+    -------
+    ent (list): list of entropies for each session.
+    '''
 
-        usages = np.array(list(usages.values()), dtype='float')
-        usages = usages[:truncate_point] + smoothing
-        usages /= usages.sum()
+    usages, _ = get_syllable_counts(labels, relabel_by=relabel_by)
 
-        tm = get_transition_matrix([v],
-                                   max_syllable=100,
-                                   normalize=None,
-                                   smoothing=0,
-                                   disable_output=True,
-                                   combine=True) + tm_smoothing
+    return list(entropy_from_counts(usages, truncate_syllable, smoothing))
 
-        tm = tm[:truncate_point, :truncate_point]
 
-        if normalize == 'bigram':
-            tm /= tm.sum()
-        elif normalize == 'rows':
-            tm /= tm.sum(axis=1, keepdims=True)
-        elif normalize == 'columns':
-            tm /= tm.sum(axis=0, keepdims=True)
+def entropy_rate(labels, truncate_syllable=40, normalize='bigram',
+                 smoothing=1.0, tm_smoothing=1.0, relabel_by='usage'):
+    '''
+    Computes entropy rate, base 2 using provided syllable labels. If
+    syllable labels have not been re-labeled by usage, this function will do so.
 
-        entropy_rate = -np.sum(usages * tm * np.log2(tm))
-        ent.append(entropy_rate)
+    Parameters
+    ----------
+    labels (list or np.ndarray): a list of label arrays, where each entry in the list
+            is an array of labels for one subject.
+    truncate_syllable (int): maximum number of labels to keep for this calculation.
+    normalize (str): the type of transition matrix normalization to perform. Options
+            are: 'bigram', 'rows', or 'columns'.
+    smoothing (float): a constant added to label usages before normalization
+    tm_smoothing (float): a constant added to label transtition counts before normalization.
+    relabel_by (str): how to re-order labels. Options are: 'usage', 'frames', or None.
 
-    return ent
+    Returns
+    -------
+    ent (list): list of entropy rates per syllable label
+    '''
+
+    usages, trans_counts = get_syllable_counts(labels, relabel_by=relabel_by)
+
+    return list(entropy_rate_from_counts(usages, trans_counts, truncate_syllable, normalize, smoothing, tm_smoothing))
 
 
 def transition_entropy(labels, tm_smoothing=0, truncate_syllable=40, transition_type='incoming', relabel_by='usage'):
@@ -135,39 +507,9 @@ def transition_entropy(labels, tm_smoothing=0, truncate_syllable=40, transition_
         each mouse and syllable.
     '''
 
-    old_settings = np.seterr(divide='ignore', invalid='ignore')
-
     if transition_type not in ('incoming', 'outgoing'):
         raise ValueError('transition_type must be incoming or outgoing')
 
-    if relabel_by is not None:
-        labels, _ = relabel_by_usage(labels, count=relabel_by)
-    entropies = []
-
-    for v in labels:
-        usages = get_syllable_statistics([v])[0]
-
-        syllables = np.array(list(usages))
-        truncate_point = np.where(syllables == truncate_syllable)[0]
-
-        if truncate_point is None or len(truncate_point) != 1:
-            truncate_point = len(syllables)
-        else:
-            truncate_point = truncate_point[0]
-
-        tm = get_transition_matrix([v], max_syllable=100, normalize=None, smoothing=0,
-                                   combine=True, disable_output=True) + tm_smoothing
-        tm = tm[:truncate_point, :truncate_point]
-
-        if transition_type == 'outgoing':
-            # normalize each row (outgoing syllables)
-            tm = tm.T
-        # if incoming, don't reshape the transition matrix
-        tm = tm / tm.sum(axis=0, keepdims=True)
-        ent = -np.nansum(tm * np.log2(tm), axis=0)
-        entropies.append(ent)
-
-    _ = np.seterr(**old_settings)
-
-    return entropies
+    _, trans_counts = get_syllable_counts(labels, relabel_by=relabel_by)
 
+    return list(transition_entropy_from_counts(trans_counts, tm_smoothing, truncate_syllable, transition_type))
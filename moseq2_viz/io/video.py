@@ -226,7 +226,7 @@ def _matrix_writer_helper(syll, matrix_fun, slice_fun, write_fun, namer):
     (function): helper function to write the crowd movies to their respective files, if the video matrices were created.
     '''
 
-    mtx = matrix_fun(slice_fun(syll))
+    mtx = matrix_fun(slice_fun(syll), stream=syll)
     if mtx is not None:
         return write_fun(namer(syll), mtx)
     return None
@@ -12,8 +12,8 @@ from cytoolz import keyfilter, curry
 from moseq2_viz.util import strided_app, h5_to_dict
 from scipy.spatial.distance import squareform, pdist
 from moseq2_viz.model.util import (whiten_pcs, parse_model_results,
-                                   simulate_ar_trajectory, get_transitions,
-                                   get_syllable_slices, retrieve_pcs_from_slices, normalize_pcs)
+                                   simulate_ar_trajectories, get_transitions,
+                                   get_syllable_instance_table, retrieve_pcs_from_slices, normalize_pcs)
 from moseq2_viz.scalars.util import get_scalar_map, get_scalar_triggered_average, process_scalars
 
 
@@ -147,7 +147,7 @@ def get_behavioral_distance(index, model_file, whiten='all',
 
         elif dist.lower() == 'pca[dtw]':
 
-            slice_fun = get_syllable_slices(
+            instances = get_syllable_instance_table(
                 labels=list(model_fit['labels'].values()),
                 label_uuids=list(model_fit['labels'].keys()),
                 index=index)
@@ -160,7 +160,7 @@ def get_behavioral_distance(index, model_file, whiten='all',
 
             pc_slices = []
             for syllable in tqdm(range(max_syllable), desc='Retrieving Syllable Aligned PC Slices'):
-                pc_slice = retrieve_pcs_from_slices(slice_fun(syllable),
+                pc_slice = retrieve_pcs_from_slices(instances[instances['syllable'] == syllable],
                                                     pca_scores,
                                                     **use_options)
                 pc_slices.append(pc_slice)
@@ -198,7 +198,7 @@ def get_behavioral_distance(index, model_file, whiten='all',
             parallel = use_options.pop('parallel')
             use_options['npcs'] += len(incl_keys)
 
-            slice_fun = get_syllable_slices(
+            instances = get_syllable_instance_table(
                 labels=[model_fit['labels'][k] for k in pca_scores],
                 label_uuids=list(pca_scores.keys()),
                 index=index,
@@ -206,7 +206,7 @@ def get_behavioral_distance(index, model_file, whiten='all',
 
             pc_slices = []
             for syllable in tqdm(range(max_syllable), desc='Retrieving Syllable Aligned PC Slices'):
-                pc_slice = retrieve_pcs_from_slices(slice_fun(syllable),
+                pc_slice = retrieve_pcs_from_slices(instances[instances['syllable'] == syllable],
                                                     pca_scores,
                                                     **use_options)
                 pc_slices.append(pc_slice)
@@ -229,7 +229,8 @@ def get_behavioral_distance_ar(ar_mat, init_point=None, sim_points=10, max_sylla
    Parameters
    ----------
    ar_mat (3D numpy array): Trained model AutoRegressive matrices; shape=(max_syllable, npcs, npcs*nlags+1)
-   init_point (list): Initial values as a reference point for distance estimation
+   init_point (list): Initial values as a reference point for distance estimation. Each item can hold a single
+    initial point (nlags, npcs), or multiple initial points (n_init, nlags, npcs) per syllable.
    sim_points (int): Number of AR trajectories to simulate
    max_syllable (int): Max number of syllables included in the analysis. Should be equal to ar_mat.shape[0]
    dist (str): Distance operation to compute. Either 'correlation' or 'dtw'.
@@ -246,17 +247,22 @@ def get_behavioral_distance_ar(ar_mat, init_point=None, sim_points=10, max_sylla
     if init_point is None:
         init_point = [None] * max_syllable
 
-    ar_traj = np.zeros((max_syllable, sim_points, npcs), dtype='float32')
-
-    for i in range(max_syllable):
-        ar_traj[i] = simulate_ar_trajectory(ar_mat[i], init_point[i], sim_points=sim_points)
+    # simulate all syllables (and initial points) together
+    ar_traj = simulate_ar_trajectories(np.asarray(ar_mat)[:max_syllable], init_point[:max_syllable],
+                                       sim_points=sim_points).astype('float32')
+    # shape = (max_syllable, n_init, sim_points, npcs)
+    if ar_traj.ndim == 3:
+        ar_traj = ar_traj[:, None]
+    n_init = ar_traj.shape[1]
 
     if dist.lower() == 'correlation':
-        ar_dist = squareform(pdist(ar_traj.reshape(max_syllable, sim_points * npcs), 'correlation'))
+        ar_dist = squareform(pdist(ar_traj.reshape(max_syllable, n_init * sim_points * npcs), 'correlation'))
     elif dist.lower() == 'dtw':
         print('Computing DTW matrix (this may take a minute)...')
-        ar_dist = dtw_ndim.distance_matrix(ar_traj, parallel=parallel, show_progress=True)
-        ar_dist = reformat_dtw_distances(ar_dist, nsyllables=ar_dist.shape[0], rescale=False)
+        # distances between initial points are averaged per syllable pair in reformat_dtw_distances
+        ar_dist = dtw_ndim.distance_matrix(ar_traj.reshape(max_syllable * n_init, sim_points, npcs),
+                                           parallel=parallel, show_progress=True)
+        ar_dist = reformat_dtw_distances(ar_dist, nsyllables=max_syllable, rescale=False)
     else:
         raise RuntimeError(f'Did not understand distance {dist}')
 
@@ -18,6 +18,7 @@ import pandas as pd
 import numpy as np
 from os.path import join
 from os import makedirs
+from moseq2_viz.util import get_rng, spawn_seeds
 
 
 def robust_min(v):
@@ -208,7 +209,7 @@ def plotting_fingerprint(summary, save_dir, range_dict, preprocessor=None, num_l
     fig.savefig(join(save_dir, 'moseq_fingerprint.png'))
 
 def classifier_fingerprint(summary, features=['MoSeq'], preprocessor=None, classes=['group'], param_search=True, C_list=None,
-                           model_type='lr', cv='loo', n_splits=5):
+                           model_type='lr', cv='loo', n_splits=5, seed=None):
     '''
     classifier using the fingerprint dataframe
 
@@ -222,6 +223,7 @@ def classifier_fingerprint(summary, features=['MoSeq'], preprocessor=None, class
         model_type (str, optional): name of the linear classifier. 'lr' for logistic regression or 'svc' for linearSVC. Defaults to 'lr'.
         cv (str, optional): cross validation type. 'loo' for LeaveOneOut 'skf' for StratifiedKFold. Defaults to 'loo'.
         n_splits (int, optional): number of splits for StratifiedKFold. Defaults to 5.
+        seed (int, optional): random seed for the parameter search folds and the label shuffles. Each shuffle is drawn from its own stream spawned from the seed. Defaults to None, which uses the global numpy random state.
 
     Returns:
         y_true ([np.array]): array for true label
@@ -249,7 +251,8 @@ def classifier_fingerprint(summary, features=['MoSeq'], preprocessor=None, class
             C_list=np.logspace(-6,3, 50)
 
         parameters = {'C': C_list}
-        grid_search = GridSearchCV(clf, parameters, cv=RepeatedStratifiedKFold(n_splits=n_splits, n_repeats=5), scoring='accuracy')
+        random_state = None if seed is None else int(get_rng(seed, stream=0).integers(2**31))
+        grid_search = GridSearchCV(clf, parameters, cv=RepeatedStratifiedKFold(n_splits=n_splits, n_repeats=5, random_state=random_state), scoring='accuracy')
         grid_search.fit(X,y)
         # set the best parameter for the classifier
         clf = clf.set_params(**grid_search.best_params_)
@@ -287,8 +290,13 @@ def classifier_fingerprint(summary, features=['MoSeq'], preprocessor=None, class
 
         out['coefs'].append(clf.coef_[0])
 
-    for i in range(100):
-        y_shuffle = np.random.permutation(y)
+    n_shuffles = 100
+    shuffle_seeds = [None] * n_shuffles if seed is None else spawn_seeds(seed, n_shuffles, stream=1)
+    for i in range(n_shuffles):
+        if shuffle_seeds[i] is None:
+            y_shuffle = np.random.permutation(y)
+        else:
+            y_shuffle = get_rng(shuffle_seeds[i]).permutation(y)
         for split, (train_ix, test_ix) in enumerate(cv.split(X, y)):
             X_train, X_test = X[train_ix], X[test_ix]
             # shuffle y for shuffle analysis
@@ -0,0 +1,252 @@
+'''
+Utility functions for indexing syllable transition sequences and searching them for multi-syllable motifs.
+Each session's labels are converted to their transition sequence (see `get_transitions`), concatenated
+with session separators and indexed with a suffix array, so motif counts and locations can be looked up
+with a binary search instead of scanning every session.
+'''
+
+import numpy as np
+import pandas as pd
+from moseq2_viz.model.trans_graph import get_transitions
+
+# value separating sessions in the concatenated transition sequence; never matched by a motif
+_SEPARATOR = -1
+
+
+def build_suffix_array(sequence):
+    '''
+    Builds the suffix array of an integer sequence by prefix doubling: suffixes are repeatedly sorted by
+     the rank pair of their first k and next k elements until all ranks are unique.
+
+    Parameters
+    ----------
+    sequence (1D np.ndarray): integer sequence to index.
+
+    Returns
+    -------
+    suffix_array (1D np.ndarray): start indices of the suffixes of `sequence` in lexicographic order.
+    '''
+
+    sequence = np.asarray(sequence)
+    n = len(sequence)
+    if n == 0:
+        return np.zeros(0, dtype='int64')
+
+    # initial ranks are the dense-ranked values themselves
+    _, rank = np.unique(sequence, return_inverse=True)
+    rank = rank.astype('int64')
+
+    k = 1
+    while True:
+        # rank of the suffix starting k elements later, -1 past the end of the sequence
+        second = np.full(n, -1, dtype='int64')
+        second[:n - k] = rank[k:]
+
+        order = np.lexsort((second, rank))
+        first_sorted, second_sorted = rank[order], second[order]
+        new_group = np.ones(n, dtype='int64')
+        new_group[1:] = (first_sorted[1:] != first_sorted[:-1]) | (second_sorted[1:] != second_sorted[:-1])
+
+        rank = np.empty(n, dtype='int64')
+        rank[order] = np.cumsum(new_group) - 1
+
+        if rank.max() == n - 1 or k >= n:
+            return order
+        k *= 2
+
+
+def build_motif_index(labels, uuids=None):
+    '''
+    Builds a searchable index over the transition sequences of all sessions.
+
+    Parameters
+    ----------
+    labels (list of np.ndarray): list of frame labels for each included session
+    uuids (list): optional session uuids (one per session); defaults to the session positions.
+
+    Returns
+    -------
+    index (dict): dictionary containing the concatenated transition 'sequence' (int16), its 'suffix_array',
+     and for each sequence position the 'session' index, the 'position' of the transition among the labeled
+     transitions of its session and the 'frame' where the syllable starts. 'uuids' and 'session_lengths' (in frames) are kept
+     to report locations.
+    '''
+
+    if uuids is None:
+        uuids = list(range(len(labels)))
+
+    sequences, sessions, positions, frames = [], [], [], []
+    for i, lbl in enumerate(labels):
+        transitions, locs = get_transitions(np.asarray(lbl))
+        # unlabeled (negative) runs, e.g. the -5 padding at the start of a session, are replaced by separators
+        # so motifs cannot span them
+        labeled = transitions >= 0
+        transitions = np.where(labeled, transitions, _SEPARATOR)
+        # position of each labeled transition among the labeled transitions of the session
+        position = np.cumsum(labeled) - labeled
+
+        # each session is followed by a separator so motifs cannot span sessions
+        sequences.append(np.append(transitions, _SEPARATOR))
+        sessions.append(np.full(len(transitions) + 1, i))
+        positions.append(np.append(position, labeled.sum()))
+        frames.append(np.append(locs, len(lbl)))
+
+    sequence = np.concatenate(sequences).astype('int16') if sequences else np.zeros(0, dtype='int16')
+
+    return {
+        'sequence': sequence,
+        'suffix_array': build_suffix_array(sequence),
+        'session': np.concatenate(sessions) if sessions else np.zeros(0, dtype='int64'),
+        'position': np.concatenate(positions) if positions else np.zeros(0, dtype='int64'),
+        'frame': np.concatenate(frames) if frames else np.zeros(0, dtype='int64'),
+        'uuids': list(uuids),
+        'session_lengths': [len(lbl) for lbl in labels],
+    }
+
+
+def _motif_bounds(index, motif):
+    '''
+    Binary searches the suffix array for the range of suffixes that start with `motif`.
+
+    Parameters
+    ----------
+    index (dict): motif index returned by `build_motif_index`.
+    motif (list): sequence of syllable labels to search for.
+
+    Returns
+    -------
+    lo (int): first suffix array position matching the motif.
+    hi (int): one past the last suffix array position matching the motif.
+    '''
+
+    sequence, suffix_array = index['sequence'], index['suffix_array']
+    motif = tuple(int(m) for m in motif)
+    m = len(motif)
+
+    def _prefix(i):
+        start = suffix_array[i]
+        return tuple(sequence[start:start + m].tolist())
+
+    lo, hi = 0, len(suffix_array)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if _prefix(mid) < motif:
+            lo = mid + 1
+        else:
+            hi = mid
+    start = lo
+
+    hi = len(suffix_array)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if _prefix(mid) <= motif:
+            lo = mid + 1
+        else:
+            hi = mid
+
+    return start, lo
+
+
+def count_motif(index, motif):
+    '''
+    Counts the occurrences of a syllable sequence across all indexed sessions.
+
+    Parameters
+    ----------
+    index (dict): motif index returned by `build_motif_index`.
+    motif (list): sequence of syllable labels to search for, e.g. [1, 5, 3].
+
+    Returns
+    -------
+    count (int): number of times the motif occurs.
+    '''
+
+    if len(motif) == 0 or min(motif) < 0:
+        return 0
+
+    lo, hi = _motif_bounds(index, motif)
+    return hi - lo
+
+
+def find_motif(index, motif):
+    '''
+    Finds the locations of a syllable sequence across all indexed sessions.
+
+    Parameters
+    ----------
+    index (dict): motif index returned by `build_motif_index`.
+    motif (list): sequence of syllable labels to search for, e.g. [1, 5, 3].
+
+    Returns
+    -------
+    locations (pd.DataFrame): one row per occurrence, sorted by session and time, with columns
+     'uuid', 'session', 'position' (index of the first syllable in the session's transition sequence),
+     'start' (first frame of the motif) and 'end' (frame after the last syllable of the motif ends).
+    '''
+
+    columns = ['uuid', 'session', 'position', 'start', 'end']
+    if len(motif) == 0 or min(motif) < 0:
+        return pd.DataFrame(columns=columns)
+
+    lo, hi = _motif_bounds(index, motif)
+    hits = np.sort(index['suffix_array'][lo:hi])
+
+    sessions = index['session'][hits]
+    # the separator position stores the session length, so the motif end is always defined
+    ends = index['frame'][hits + len(motif)]
+
+    return pd.DataFrame({
+        'uuid': [index['uuids'][s] for s in sessions],
+        'session': sessions,
+        'position': index['position'][hits],
+        'start': index['frame'][hits],
+        'end': ends,
+    }, columns=columns)
+
+
+def get_top_n_grams(index, n=3, k=10, label_group=None):
+    '''
+    Enumerates the k most frequent syllable n-grams, optionally for each group of sessions.
+
+    Parameters
+    ----------
+    index (dict): motif index returned by `build_motif_index`.
+    n (int): length of the syllable sequences to count.
+    k (int): number of n-grams to return per group.
+    label_group (list): optional group name for each indexed session. If None, all sessions are pooled.
+
+    Returns
+    -------
+    top_n_grams (pd.DataFrame): dataframe with columns 'group', 'motif' (tuple of syllables), 'count'
+     and 'rank', sorted by group and descending count. Ties are broken by motif order.
+    '''
+
+    sequence = index['sequence'].astype('int64')
+    n_sessions = len(index['uuids'])
+    if label_group is None:
+        label_group = ['all'] * n_sessions
+    label_group = np.asarray(label_group)
+
+    results = []
+    if len(sequence) < n:
+        return pd.DataFrame(results, columns=['group', 'motif', 'count', 'rank'])
+
+    # all length-n windows that do not cross a session separator
+    windows = np.stack([sequence[i:len(sequence) - n + 1 + i] for i in range(n)], axis=1)
+    valid = np.all(windows >= 0, axis=1)
+    windows = windows[valid]
+    window_groups = label_group[index['session'][:len(valid)][valid]]
+
+    n_labels = int(sequence.max()) + 1 if len(sequence) > 0 else 1
+    for g in pd.unique(label_group):
+        group_windows = windows[window_groups == g]
+        if len(group_windows) == 0:
+            continue
+        codes = np.ravel_multi_index(group_windows.T, (n_labels,) * n)
+        uniq, counts = np.unique(codes, return_counts=True)
+        order = np.argsort(-counts, kind='stable')[:k]
+        for rank, o in enumerate(order):
+            motif = tuple(int(x) for x in np.unravel_index(uniq[o], (n_labels,) * n))
+            results.append((g, motif, int(counts[o]), rank))
+
+    return pd.DataFrame(results, columns=['group', 'motif', 'count', 'rank'])
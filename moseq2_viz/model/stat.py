@@ -1,15 +1,126 @@
+import os
+import joblib
+import weakref
 import numpy as np
 import pandas as pd
 import seaborn as sns
 import matplotlib.pyplot as plt
 from scipy import stats
-from itertools import combinations
+from itertools import chain, combinations
+from joblib import Parallel, delayed, cpu_count
 from statsmodels.stats.multitest import multipletests
+from moseq2_viz.util import as_seed_sequence, spawn_seeds, get_rng_blocks, draw_rng_blocks, RNG_BLOCK_SIZE
+
+
+# factorized (group, uuid, syllable) keys of stats DataFrames, keyed by id(df); entries are removed when the
+# DataFrame is garbage collected
+_SESSION_INDEX_CACHE = {}
+
+
+def clear_session_mean_cache():
+    """
+    Empties the in-memory cache of factorized stats DataFrames used by `get_session_mean_df`.
+
+    Returns
+    -------
+    """
+
+    _SESSION_INDEX_CACHE.clear()
+
+
+def _get_session_index(df, max_syllable=40):
+    """
+    Factorizes the group, uuid and syllable columns of a stats DataFrame into the (session, syllable) cell of each
+    row, in the sorted order used by `pivot_table`. The factorization is cached for the lifetime of the DataFrame,
+    so different statistics (and repeated calls) reuse it. Cache entries are validated against a row-wise hash of
+    the group, uuid and syllable columns, so the factorization is recomputed whenever they change, e.g. after
+    sessions are regrouped in place.
+
+    Parameters
+    ----------
+    df (pd.DataFrame): Output of moseq2_viz.model.compute_behavioral_statistics().
+    max_syllable (int): Maximum number of syllables to include
+
+    Returns
+    -------
+    session_index (dict): dictionary with the 'rows' of df that are included, their 'cells' (flat
+     session * n_syllables + syllable index), the sorted 'sessions' MultiIndex and 'syllables' Index.
+    """
+
+    key = (id(df), max_syllable)
+    key_hash = pd.util.hash_pandas_object(df[["group", "uuid", "syllable"]], index=False).values
+    cached = _SESSION_INDEX_CACHE.get(key)
+    if cached is not None and np.array_equal(cached["key_hash"], key_hash):
+        return cached
+
+    group_codes, groups = pd.factorize(df["group"], sort=True)
+    uuid_codes, uuids = pd.factorize(df["uuid"], sort=True)
+    syllable = df["syllable"].values
+    # rows with missing keys are dropped by pivot_table
+    rows = np.where((group_codes >= 0) & (uuid_codes >= 0) & (syllable < max_syllable))[0]
+
+    session_codes, session_inv = np.unique(group_codes[rows] * len(uuids) + uuid_codes[rows], return_inverse=True)
+    syllable_codes, syllables = pd.factorize(syllable[rows], sort=True)
+
+    session_index = {
+        "key_hash": key_hash,
+        "rows": rows,
+        "cells": session_inv.ravel() * len(syllables) + syllable_codes,
+        "sessions": pd.MultiIndex.from_arrays(
+            [groups.take(session_codes // len(uuids)), uuids.take(session_codes % len(uuids))],
+            names=["group", "uuid"],
+        ),
+        "syllables": pd.Index(syllables, name="syllable"),
+    }
+
+    if key not in _SESSION_INDEX_CACHE:
+        weakref.finalize(df, _SESSION_INDEX_CACHE.pop, key, None)
+    _SESSION_INDEX_CACHE[key] = session_index
+
+    return session_index
+
+
+def _get_session_means(df, statistics, max_syllable=40):
+    """
+    Computes the mean of several syllable statistics in each (session, syllable) cell by scattering the values into
+    preallocated arrays. NaN values are ignored, as in `pivot_table`.
+
+    Parameters
+    ----------
+    df (pd.DataFrame): Output of moseq2_viz.model.compute_behavioral_statistics().
+    statistics (list): statistics to compute means for (any of the columns in input df).
+    max_syllable (int): Maximum number of syllables to include
+
+    Returns
+    -------
+    sessions (pd.MultiIndex): sorted (group, uuid) of each session.
+    syllables (pd.Index): sorted syllables.
+    means (np.array): mean statistics, NaN for empty cells; shape = (n_sessions, n_syllables, n_statistics)
+    """
+
+    session_index = _get_session_index(df, max_syllable)
+    rows, cells = session_index["rows"], session_index["cells"]
+    sessions, syllables = session_index["sessions"], session_index["syllables"]
+    n_cells = len(sessions) * len(syllables)
+
+    means = np.empty((n_cells, len(statistics)))
+    for k, statistic in enumerate(statistics):
+        values = df[statistic].values[rows].astype("float")
+        valid = ~np.isnan(values)
+        sums = np.bincount(cells[valid], weights=values[valid], minlength=n_cells)
+        counts = np.bincount(cells[valid], minlength=n_cells)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            means[:, k] = np.where(counts > 0, sums / counts, np.nan)
+
+    return sessions, syllables, means.reshape(len(sessions), len(syllables), len(statistics))
 
 
 def get_session_mean_df(df, statistic="usage", max_syllable=40):
     """
-    Compute a given mean syllable statistic grouped by groups and UUIDs.
+    Compute a given mean syllable statistic grouped by groups and UUIDs. Equivalent to
+    `df.pivot_table(index=["group", "uuid"], columns="syllable", values=statistic).replace(np.nan, 0)`, but the
+    group, uuid and syllable columns are factorized once per DataFrame (see `_get_session_index`) and the values
+    are scattered into a dense array.
 
     Parameters
     ----------
@@ -25,16 +136,62 @@ def get_session_mean_df(df, statistic="usage", max_syllable=40):
     df_pivot (pd.DataFrame): Mean syllable statistic per session; shape=(n_sessions, max_syllable)
     """
 
-    df_pivot = (
-        df[df.syllable < max_syllable]
-            .pivot_table(index=["group", "uuid"], columns="syllable", values=statistic)
-            .replace(np.nan, 0)
-    )
+    sessions, syllables, means = _get_session_means(df, [statistic], max_syllable)
+    means = means[..., 0]
+
+    # like pivot_table, drop sessions and syllables without any values
+    has_values = ~np.isnan(means)
+    keep_sessions, keep_syllables = has_values.any(1), has_values.any(0)
+    means = np.nan_to_num(means[keep_sessions][:, keep_syllables], nan=0.0)
+
+    return pd.DataFrame(means, index=sessions[keep_sessions], columns=syllables[keep_syllables])
+
+
+# bump to invalidate on-disk stats caches written by older versions of the tests
+_STATS_CACHE_VERSION = 1
+
+
+def _cached_stats_result(cache_dir, name, inputs, params, compute):
+    """
+    Loads the result of a statistical test from an on-disk cache, or computes and stores it. Entries are keyed by
+    a hash of the test name, its (pivoted) input data, including the group of each session, and its parameters,
+    so any change to the inputs misses the cache and the old entry is simply not used.
+
+    Parameters
+    ----------
+    cache_dir (str): directory holding the cached results. If None, the result is computed without caching.
+    name (str): name of the test.
+    inputs (pd.DataFrame or np.array): input data of the test, e.g. the output of `get_session_mean_df`.
+    params (dict): all parameters that change the result, including the random seed.
+    compute (function): called without arguments to compute the result on a cache miss.
+
+    Returns
+    -------
+    result: the cached or computed result.
+    """
+
+    if cache_dir is None:
+        return compute()
+
+    if isinstance(inputs, pd.DataFrame):
+        inputs = (inputs.index.tolist(), inputs.columns.tolist(), inputs.values)
+    key = joblib.hash((_STATS_CACHE_VERSION, name, inputs, params))
+    cache_file = os.path.join(cache_dir, f"{name}_{key}.pkl")
+
+    if os.path.exists(cache_file):
+        return joblib.load(cache_file)
+
+    result = compute()
+    os.makedirs(cache_dir, exist_ok=True)
+    # write to a temporary file first so interrupted runs never leave a partial entry
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+    joblib.dump(result, tmp_file)
+    os.replace(tmp_file, cache_file)
 
-    return df_pivot
+    return result
 
 
-def bootstrap_me(usages, n_iters=10000):
+def bootstrap_me(usages, n_iters=10000, seed=None, stream=None):
     """
     Bootstraps the inputted stat data using random sampling with replacement.
 
@@ -42,6 +199,8 @@ def bootstrap_me(usages, n_iters=10000):
     ----------
     usages (np.array): Data to bootstrap; shape = (n_mice, n_syllables)
     n_iters (int): Number of samples to return.
+    seed (int): Random seed. If None, samples are drawn from the global numpy random state.
+    stream (int): Random sub-stream of `seed`, e.g. to bootstrap several groups independently.
 
     Returns
     -------
@@ -49,7 +208,152 @@ def bootstrap_me(usages, n_iters=10000):
     """
 
     n_mice = usages.shape[0]
-    return np.nanmean(usages[np.random.choice(n_mice, size=(n_mice, n_iters))], axis=0)
+    if seed is None:
+        return np.nanmean(usages[np.random.choice(n_mice, size=(n_mice, n_iters))], axis=0)
+
+    # same resamples as `bootstrap_moments` with the same seed
+    blocks = list(chain.from_iterable(get_rng_blocks(seed, n_iters, stream=stream)))
+    draws = draw_rng_blocks(blocks, lambda rng, n: rng.integers(0, n_mice, size=(n, n_mice)))
+    return np.nanmean(usages[draws.T], axis=0)
+
+
+def _bootstrap_chunk_moments(usages, blocks, bin_edges=None):
+    """
+    Bootstraps the mean of the inputted stat data for a chunk of resamples and returns the moments of the
+    bootstrapped means. Resamples are represented by the number of times each mouse is drawn, so the means
+    follow from a matrix product instead of indexing a (n_mice, n_iters, n_syllables) array.
+
+    Parameters
+    ----------
+    usages (np.array): Data to bootstrap; shape = (n_mice, n_syllables)
+    blocks (list): seeded blocks of resamples in this chunk (see `moseq2_viz.util.get_rng_blocks`).
+    bin_edges (np.array): optional histogram bin edges of each syllable; shape = (n_syllables, n_bins + 1)
+
+    Returns
+    -------
+    n (np.array): Number of non-NaN bootstrapped means per syllable.
+    mean (np.array): Mean of the bootstrapped means per syllable.
+    m2 (np.array): Sum of squared deviations from the mean per syllable.
+    hist (np.array): Histogram counts of the bootstrapped means; shape = (n_syllables, n_bins), or None.
+    """
+
+    n_mice, n_syllables = usages.shape
+
+    draws = draw_rng_blocks(blocks, lambda rng, n: rng.integers(0, n_mice, size=(n, n_mice)))
+    n_iters = len(draws)
+    draws = draws + n_mice * np.arange(n_iters)[:, None]
+    weights = np.bincount(draws.ravel(), minlength=n_iters * n_mice).reshape(n_iters, n_mice).astype("float")
+
+    # nanmean of each resample
+    valid = ~np.isnan(usages)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        boots = weights.dot(np.where(valid, usages, 0)) / weights.dot(valid.astype("float"))
+
+    finite = ~np.isnan(boots)
+    n = finite.sum(0)
+    mean = np.nansum(boots, 0) / np.maximum(n, 1)
+    m2 = np.nansum((boots - mean) ** 2, 0)
+
+    hist = None
+    if bin_edges is not None:
+        n_bins = bin_edges.shape[1] - 1
+        hist = np.zeros((n_syllables, n_bins), dtype="int64")
+        for s_i in range(n_syllables):
+            hist[s_i] = np.histogram(boots[finite[:, s_i], s_i], bins=bin_edges[s_i])[0]
+
+    return n, mean, m2, hist
+
+
+def bootstrap_moments(usages, n_iters=10000, chunk_size=1000, seed=None, n_jobs=1, quantiles=None, n_bins=1000,
+                      stream=None):
+    """
+    Streaming version of `bootstrap_me`: resamples are drawn in chunks and only the running mean and variance of the
+    bootstrapped means (and optionally a histogram sketch for quantiles) are kept, so memory does not grow with
+    n_iters. Chunks run in parallel and resamples are drawn from fixed seeded blocks (see
+    `moseq2_viz.util.get_rng_blocks`), so results only depend on `seed`, not on chunk_size or n_jobs.
+
+    Parameters
+    ----------
+    usages (np.array): Data to bootstrap; shape = (n_mice, n_syllables)
+    n_iters (int): Number of bootstrap samples.
+    chunk_size (int): Number of samples drawn at once.
+    seed (int): Random seed used to initialize the pseudo-random number generators.
+    n_jobs (int): Number of chunks processed in parallel.
+    quantiles (list): optional quantiles (between 0 and 1) of the bootstrap distribution to estimate, e.g.
+     [0.025, 0.975] for a 95% percentile interval. Quantiles are read from a histogram with `n_bins` bins
+     spanning the range of each syllable's data, so their error is at most one bin width.
+    n_bins (int): Number of histogram bins used for the quantile sketch.
+    stream (int): Random sub-stream of `seed`, e.g. to bootstrap several groups independently.
+
+    Returns
+    -------
+    moments (dict): dict with the 'mean' and 'std' of the bootstrapped means (each of len == n_syllables),
+     the number of samples 'n' and, if requested, the 'quantiles' array; shape = (len(quantiles), n_syllables)
+    """
+
+    usages = np.asarray(usages, dtype="float")
+    n_syllables = usages.shape[1]
+
+    bin_edges = None
+    if quantiles is not None:
+        # means of resampled data lie within the range of the data
+        with np.errstate(invalid="ignore"):
+            lo, hi = np.nanmin(usages, 0), np.nanmax(usages, 0)
+        lo, hi = np.nan_to_num(lo), np.nan_to_num(hi)
+        hi = np.where(hi > lo, hi, lo + 1)
+        bin_edges = np.linspace(lo, hi, n_bins + 1).T
+
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(_bootstrap_chunk_moments)(usages, blocks, bin_edges)
+        for blocks in get_rng_blocks(seed, n_iters, chunk_size, stream=stream)
+    )
+
+    # merge the chunk moments (Chan et al. parallel variance)
+    n, mean, m2 = np.zeros(n_syllables), np.zeros(n_syllables), np.zeros(n_syllables)
+    for n_b, mean_b, m2_b, _ in results:
+        n_ab = n + n_b
+        with np.errstate(divide="ignore", invalid="ignore"):
+            delta = mean_b - mean
+            mean = np.where(n_ab > 0, mean + delta * n_b / n_ab, 0)
+            m2 = np.where(n_ab > 0, m2 + m2_b + delta ** 2 * n * n_b / n_ab, 0)
+        n = n_ab
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        moments = {
+            "n": n,
+            "mean": np.where(n > 0, mean, np.nan),
+            "std": np.sqrt(m2 / n),
+        }
+
+    if quantiles is not None:
+        hist = sum(r[3] for r in results)
+        cdf = np.cumsum(hist, 1) / np.maximum(hist.sum(1, keepdims=True), 1)
+        moments["quantiles"] = np.array([
+            [np.interp(q, np.concatenate([[0], cdf[s_i]]), bin_edges[s_i]) for s_i in range(n_syllables)]
+            for q in quantiles
+        ])
+
+    return moments
+
+
+def ztest_moments(mu1, std1, mu2, std2):
+    """
+    Performs a z-test on the means and standard deviations of a pair of bootstrapped syllable statistics.
+
+    Parameters
+    ----------
+    mu1 (np.array): mean of the bootstrapped syllable stat from group 1; len == n_syllables
+    std1 (np.array): standard deviation of the bootstrapped syllable stat from group 1; len == n_syllables
+    mu2 (np.array): mean of the bootstrapped syllable stat from group 2; len == n_syllables
+    std2 (np.array): standard deviation of the bootstrapped syllable stat from group 2; len == n_syllables
+
+    Returns
+    -------
+    p-values (np.array): array of computed p-values of len == n_syllables.
+    """
+
+    std = np.sqrt(std1 ** 2 + std2 ** 2)
+    return np.minimum(1.0, 2 * stats.norm.cdf(-np.abs(mu1 - mu2) / std))
 
 
 def ztest_vect(d1, d2):
@@ -66,15 +370,10 @@ def ztest_vect(d1, d2):
     p-values (np.array): array of computed p-values of len == n_syllables.
     """
 
-    mu1 = d1.mean(0)
-    mu2 = d2.mean(0)
-    std1 = d1.std(0)
-    std2 = d2.std(0)
-    std = np.sqrt(std1 ** 2 + std2 ** 2)
-    return np.minimum(1.0, 2 * stats.norm.cdf(-np.abs(mu1 - mu2) / std))
+    return ztest_moments(d1.mean(0), d1.std(0), d2.mean(0), d2.std(0))
 
 
-def bootstrap_group_means(df, group1, group2, statistic="usage", max_syllable=40):
+def bootstrap_group_means(df, group1, group2, statistic="usage", max_syllable=40, seed=None, cache_dir=None):
     """
 
     Parameters
@@ -86,6 +385,10 @@ def bootstrap_group_means(df, group1, group2, statistic="usage", max_syllable=40
     group2 (str): Name of group 2 to compare.
     statistic (str): Syllable statistic to compute bootstrap means for.
     max_syllable (int): Maximum syllables to compute mean statistic for.
+    seed (int): Random seed; each group is bootstrapped from its own sub-stream. If None, the global numpy
+     random state is used.
+    cache_dir (str): optional directory to cache the bootstrap distributions in (see `_cached_stats_result`).
+     Only used with a fixed seed.
 
     Returns
     -------
@@ -97,9 +400,15 @@ def bootstrap_group_means(df, group1, group2, statistic="usage", max_syllable=40
 
     groups = (group1, group2)
     usages = {k: group_stat.loc[k].values for k in groups}
-    boots = {k: bootstrap_me(v) for k, v in usages.items()}
 
-    return boots
+    def compute():
+        seed_seq = None if seed is None else as_seed_sequence(seed)
+        return {k: bootstrap_me(v, seed=seed_seq, stream=i) for i, (k, v) in enumerate(usages.items())}
+
+    if seed is None:
+        return compute()
+    return _cached_stats_result(cache_dir, "bootstrap_group_means", group_stat,
+                                {"groups": groups, "seed": seed}, compute)
 
 
 def get_tie_correction(x, N_m):
@@ -114,89 +423,613 @@ def get_tie_correction(x, N_m):
 
     Returns
     -------
-    corrected_rank (float): average of the inputted tied rank
+    corrected_rank (float): average of the inputted tied rank
+    """
+
+    vc = x.value_counts()
+    tie_sum = 0
+    if (vc > 1).any():
+        tie_sum += np.sum(vc[vc != 1] ** 3 - vc[vc != 1])
+    return tie_sum / (12.0 * (N_m - 1))
+
+
+def rank_columns(x):
+    """
+    Ranks each column of an array at once, assigning tied values the average of their ranks, and computes the size
+    of the groups of tied values. Ranks match `np.apply_along_axis(stats.rankdata, 0, x)`.
+
+    Parameters
+    ----------
+    x (np.array): data array; shape = (n_samples, n_columns)
+
+    Returns
+    -------
+    ranks (np.array): average ranks of each column; shape = (n_samples, n_columns)
+    tie_term (np.array): sum of (t^3 - t) over the groups of tied values in each column, where t is the
+     number of values in a group of ties; len == n_columns
+    """
+
+    x = np.asarray(x)
+    n, n_cols = x.shape
+
+    order = np.argsort(x, axis=0, kind="mergesort")
+    x_sorted = np.take_along_axis(x, order, axis=0)
+    new_value = np.ones(x.shape, dtype=bool)
+    new_value[1:] = x_sorted[1:] != x_sorted[:-1]
+
+    # size of each run of tied values, indexed by (column, run)
+    run_id = np.cumsum(new_value, axis=0) - 1 + n * np.arange(n_cols)
+    t = np.bincount(run_id.ravel(), minlength=n * n_cols).reshape(n_cols, n).astype("float")
+
+    # a run of t values starting after `first` smaller values gets the average rank first + (t + 1) / 2
+    first = np.cumsum(t, axis=1) - t
+    run_ranks = (first + (t + 1) / 2.0).ravel()
+
+    ranks = np.empty(x.shape)
+    np.put_along_axis(ranks, order, run_ranks[run_id], axis=0)
+
+    return ranks, (t ** 3 - t).sum(1)
+
+
+def get_rank_stats(x):
+    """
+    Ranks each column of the sessions x syllables matrix and computes the tie corrections used by the
+    Kruskal-Wallis and Dunn's tests, for all syllables at once.
+
+    Parameters
+    ----------
+    x (np.array): syllable stat array; shape = (N_m, N_s)
+
+    Returns
+    -------
+    real_ranks (np.array): Array of syllable ranks, shape = (N_m, N_s)
+    KW_tie_correct (np.array): Kruskal-Wallis tie correction factor of each syllable, as `stats.tiecorrect`.
+    X_ties (np.array): Dunn's tie correction of each syllable, as `get_tie_correction`. len(X_ties) = N_s
+    """
+
+    N_m = len(x)
+    real_ranks, tie_term = rank_columns(x)
+
+    if N_m < 2:
+        return real_ranks, np.ones(len(tie_term)), np.zeros(len(tie_term))
+
+    KW_tie_correct = 1.0 - tie_term / float(N_m ** 3 - N_m)
+    X_ties = tie_term / (12.0 * (N_m - 1))
+
+    return real_ranks, KW_tie_correct, X_ties
+
+
+def _get_h_stats(real_ranks, n_per_group, KW_tie_correct):
+    """
+    Computes the Kruskal-Wallis H-statistic of each column of a rank array whose rows are sorted by group.
+
+    Parameters
+    ----------
+    real_ranks (np.array): Array of ranks, shape = (N_m, n_columns)
+    n_per_group (list): list of value counts for sessions per group. len == num_groups.
+    KW_tie_correct (np.array): tie correction factor of each column.
+
+    Returns
+    -------
+    h_real (np.array): H-statistics; NaN for columns whose values are all identical. len == n_columns
+    """
+
+    N_m = len(real_ranks)
+    cum_group_idx = np.insert(np.cumsum(n_per_group), 0, 0)
+    ssbn = sum(
+        real_ranks[cum_group_idx[i]: cum_group_idx[i + 1]].sum(0) ** 2 / n_per_group[i]
+        for i in range(len(n_per_group))
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (12.0 / (N_m * (N_m + 1)) * ssbn - 3 * (N_m + 1)) / KW_tie_correct
+
+
+def kruskal_columns(x, n_per_group):
+    """
+    Runs the Kruskal-Wallis H-test on every syllable at once, matching
+    `stats.kruskal(*np.array_split(x[:, s_i], np.cumsum(n_per_group[:-1])))` for each syllable s_i.
+    Unlike scipy, syllables whose values are all identical get a NaN statistic instead of raising an error.
+
+    Parameters
+    ----------
+    x (np.array): syllable stat array with sessions sorted by group; shape = (N_m, N_s)
+    n_per_group (list): list of value counts for sessions per group. len == num_groups.
+
+    Returns
+    -------
+    h_real (np.array): H-statistic of each syllable. len == N_s
+    pvalues (np.array): chi-squared p-value of each syllable. len == N_s
+    """
+
+    real_ranks, KW_tie_correct, _ = get_rank_stats(x)
+    h_real = _get_h_stats(real_ranks, n_per_group, KW_tie_correct)
+
+    return h_real, stats.chi2.sf(h_real, len(n_per_group) - 1)
+
+
+def _get_permutation_chunk_size(N_m, N_s, num_groups, max_memory_mb=256, n_jobs=1):
+    """
+    Computes the number of permutations processed per chunk so that the working memory of all
+    workers stays below the memory cap.
+
+    Parameters
+    ----------
+    N_m (int): Number of sessions.
+    N_s (int): Number of syllables.
+    num_groups (int): Number of unique groups
+    max_memory_mb (float): Memory cap (in MB) shared by all workers.
+    n_jobs (int): Number of parallel workers.
+
+    Returns
+    -------
+    chunk_size (int): Number of permutations per chunk.
+    """
+
+    # uniforms, permutation indices and group labels per session, plus the group rank sums and H-stats
+    bytes_per_perm = 8 * (3 * N_m + (num_groups + 2) * N_s)
+    n_workers = max(1, n_jobs if n_jobs > 0 else cpu_count())
+    return int(max(1, max_memory_mb * 2 ** 20 // (bytes_per_perm * n_workers)))
+
+
+def _iter_permutation_chunks(rnd, n_perm, N_m, chunk_size):
+    """
+    Generates random permutations of the session indices in chunks. The uniforms are drawn from
+    `rnd` in order, so the concatenated chunks equal `rnd.rand(n_perm, N_m).argsort(-1)` for any chunk size.
+
+    Parameters
+    ----------
+    rnd (np.random.RandomState): Pseudo-random number generator.
+    n_perm (int): Number of permuted samples to generate.
+    N_m (int): Number of sessions.
+    chunk_size (int): Number of permutations per chunk.
+
+    Yields
+    ------
+    perm (np.array): Array of permuted session indices; shape = (chunk_size, N_m)
+    """
+
+    for start in range(0, n_perm, chunk_size):
+        yield rnd.rand(min(chunk_size, n_perm - start), N_m).argsort(-1)
+
+
+def _permuted_h_stats(perm, real_ranks, n_per_group, cum_group_idx, KW_tie_correct):
+    """
+    Computes the Kruskal-Wallis H-statistics of a chunk of permutations. Group rank sums are computed with a
+    group indicator matrix product instead of indexing a dense (n_perm, N_m, N_s) array of permuted ranks.
+
+    Parameters
+    ----------
+    perm (np.array): Array of permuted session indices; shape = (n_perm, N_m)
+    real_ranks (np.array): Array of syllable ranks, shape = (N_m, n_syllables)
+    n_per_group (list): list of value counts for sessions per group. len == num_groups.
+    cum_group_idx (list): list of indices for different groups. len == num_groups + 1.
+    KW_tie_correct (np.array): tie correction factor of each syllable.
+
+    Returns
+    -------
+    h_all (np.array): Array of H-stats; shape = (n_perm, N_s)
+    """
+
+    n_perm, N_m = perm.shape
+
+    # group of each session in each permutation
+    position_group = np.repeat(np.arange(len(n_per_group)), n_per_group)
+    session_group = np.empty_like(perm)
+    session_group[np.arange(n_perm)[:, None], perm] = position_group
+
+    # get square of sums for each group
+    ssbn = np.zeros((n_perm, real_ranks.shape[1]))
+    for i in range(len(n_per_group)):
+        ssbn += (session_group == i).astype(real_ranks.dtype).dot(real_ranks) ** 2 / n_per_group[i]
+
+    # h-statistic
+    h_all = 12.0 / (N_m * (N_m + 1)) * ssbn - 3 * (N_m + 1)
+    # syllables whose values are all identical get NaN H-stats
+    with np.errstate(divide="ignore", invalid="ignore"):
+        h_all /= KW_tie_correct
+
+    return h_all
+
+
+def run_manual_KW_test(
+        df_usage,
+        merged_usages_all,
+        num_groups,
+        n_per_group,
+        cum_group_idx,
+        n_perm=10000,
+        seed=0,
+        n_jobs=1,
+        max_memory_mb=256,
+):
+    """
+
+    Runs a manual KW test: ranks the syllables, computes the square sums for each group, computes the H-statistic,
+    and finally ensures that the results agree with the scipy.stats implementation.
+    Permutations are generated and evaluated in chunks whose size is set by `max_memory_mb`, optionally across
+    worker processes. The permutations only depend on the seed, so results do not depend on the chunking.
+
+    Parameters
+    ----------
+    df_usage (pd.DataFrame): DataFrame containing only pre-computed syllable stats. shape = (N_m, n_syllables)
+    merged_usages_all (np.array): numpy array format of the df_usage DataFrame.
+    num_groups (int): Number of unique groups
+    n_per_group (list): list of value counts for sessions per group. len == num_groups.
+    cum_group_idx (list): list of indices for different groups. len == num_groups + 1.
+    n_perm (int): Number of permuted samples to generate.
+    seed (int): Random seed used to initialize the pseudo-random number generator.
+    n_jobs (int): Number of worker processes used to evaluate the permutation chunks.
+    max_memory_mb (float): Approximate cap (in MB) on the working memory of all workers.
+
+    Returns
+    -------
+    h_all (np.array): Array of H-stats computed for given n_syllables; shape = (n_perms, N_s)
+    real_ranks (np.array): Array of syllable ranks, shape = (N_m, n_syllables)
+    X_ties (np.array): 1-D list of tied ranks, where if value > 0, then rank is tied. len(X_ties) = n_syllables
+    """
+
+    N_m, N_s = merged_usages_all.shape
+
+    # create random index array n_perm times
+    rnd = np.random.RandomState(seed=seed)
+
+    # get degrees of freedom
+    dof = num_groups - 1
+
+    real_ranks, KW_tie_correct, X_ties = get_rank_stats(merged_usages_all)
+
+    chunk_size = _get_permutation_chunk_size(N_m, N_s, num_groups, max_memory_mb, n_jobs)
+    perm_chunks = _iter_permutation_chunks(rnd, n_perm, N_m, chunk_size)
+
+    # keep the first chunk of permutations to check the results against scipy
+    first_perm = next(perm_chunks)
+    h_all = Parallel(n_jobs=n_jobs)(
+        delayed(_permuted_h_stats)(perm, real_ranks, n_per_group, cum_group_idx, KW_tie_correct)
+        for perm in chain([first_perm], perm_chunks)
+    )
+    h_all = np.concatenate(h_all)
+
+    # check that results agree, on a syllable that scipy can test (not all values identical)
+    testable = np.where(KW_tie_correct > 0)[0]
+    if len(testable) > 0:
+        p_i = np.random.randint(len(first_perm))
+        s_i = testable[np.random.randint(len(testable))]
+        kr = stats.kruskal(
+            *np.array_split(
+                merged_usages_all[first_perm[p_i, :], s_i], np.cumsum(n_per_group[:-1])
+            )
+        )
+        assert np.isclose(kr.statistic, h_all[p_i, s_i]) & np.isclose(
+            kr.pvalue, stats.chi2.sf(h_all[p_i, s_i], df=dof)
+        ), "manual KW is incorrect"
+
+    return h_all, real_ranks, X_ties
+
+
+def get_session_mean_array(df, statistics=("usage",), max_syllable=40):
+    """
+    Compute several mean syllable statistics grouped by groups and UUIDs, sharing one factorization of the
+    DataFrame (see `get_session_mean_df`), stacked into one 3D array.
+
+    Parameters
+    ----------
+    df (pd.DataFrame): Output of moseq2_viz.model.compute_behavioral_statistics().
+    statistics (list): statistics to compute means for (any of the columns in input df).
+    max_syllable (int): Maximum number of syllables to include
+
+    Returns
+    -------
+    sessions (pd.DataFrame): group and uuid of each session (row of the array), sorted by group.
+    stat_array (np.array): Mean syllable statistics; shape = (n_sessions, max_syllable, n_statistics)
+    """
+
+    statistics = list(statistics)
+    sessions, syllables, means = _get_session_means(df, statistics, max_syllable)
+
+    # like pivot_table, drop sessions without any values
+    keep_sessions = (~np.isnan(means)).any((1, 2))
+    in_range = (syllables.values >= 0) & (syllables.values < max_syllable)
+    stat_array = np.zeros((keep_sessions.sum(), max_syllable, len(statistics)))
+    stat_array[:, syllables.values[in_range].astype("int")] = np.nan_to_num(means[keep_sessions][:, in_range],
+                                                                              nan=0.0)
+
+    return sessions[keep_sessions].to_frame(index=False), stat_array
+
+
+def _permuted_h_exceedances(perm, real_ranks, n_per_group, cum_group_idx, KW_tie_correct, h_real):
+    """
+    Counts how often the H-statistics of a chunk of permutations exceed the real H-statistics.
+
+    Parameters
+    ----------
+    perm (np.array): Array of permuted session indices; shape = (n_perm, N_m)
+    real_ranks (np.array): Array of ranks, shape = (N_m, n_columns)
+    n_per_group (list): list of value counts for sessions per group. len == num_groups.
+    cum_group_idx (list): list of indices for different groups. len == num_groups + 1.
+    KW_tie_correct (np.array): tie correction factor of each column.
+    h_real (np.array): H-statistics of the real data; len == n_columns
+
+    Returns
+    -------
+    n_exceed (np.array): number of permutations with larger H-statistics; len == n_columns
+    """
+
+    return (_permuted_h_stats(perm, real_ranks, n_per_group, cum_group_idx, KW_tie_correct) > h_real).sum(0)
+
+
+def _permutation_rounds(n_perm, min_perm=1000, step=1):
+    """
+    Computes the cumulative numbers of permutations after which the sequential stopping rule is checked.
+    Rounds double in size, starting from `min_perm`.
+
+    Parameters
+    ----------
+    n_perm (int): Maximum number of permutations.
+    min_perm (int): Number of permutations in the first round.
+    step (int): Round boundaries (except the last one) are rounded up to multiples of `step`.
+
+    Returns
+    -------
+    rounds (list): increasing cumulative permutation counts; the last one is n_perm.
+    """
+
+    rounds = []
+    n = int(np.ceil(max(1, min_perm) / step) * step)
+    while n < n_perm:
+        rounds.append(n)
+        n *= 2
+    rounds.append(n_perm)
+    return rounds
+
+
+def _clopper_pearson(n_exceed, n, risk):
+    """
+    Computes exact (Clopper-Pearson) confidence bounds of the exceedance probability, i.e. the permutation p-value.
+
+    Parameters
+    ----------
+    n_exceed (np.array): Number of permutations exceeding the real statistic.
+    n (int): Number of permutations.
+    risk (float): Probability that the true p-value lies outside the bounds.
+
+    Returns
+    -------
+    lower (np.array): Lower confidence bounds.
+    upper (np.array): Upper confidence bounds.
+    """
+
+    n_exceed = np.asarray(n_exceed)
+    lower = np.where(n_exceed > 0, stats.beta.ppf(risk / 2, np.maximum(n_exceed, 1), n - n_exceed + 1), 0)
+    upper = np.where(n_exceed < n, stats.beta.ppf(1 - risk / 2, n_exceed + 1, np.maximum(n - n_exceed, 1)), 1)
+    return lower, upper
+
+
+def sequential_permutation_test(count_exceedances, n_tests, n_perm, alpha_low, alpha_high, min_perm=1000,
+                                risk=1e-3, step=1):
+    """
+    Runs permutations in rounds of doubling size and stops each test once its permutation p-value is confidently
+    below `alpha_low` or above `alpha_high`, so only borderline tests run all n_perm permutations. After each round,
+    a Clopper-Pearson interval of the p-value of each test is computed at level `risk / (n_rounds * n_tests)`, so by
+    a union bound over rounds and tests, the probability that any stopped test is on the wrong side of its threshold
+    is at most `risk`. Tests that are never stopped get the same exceedance counts as a full run.
+
+    Parameters
+    ----------
+    count_exceedances (function): called as count_exceedances(idx, start, stop); returns the number of permutations
+     start, ..., stop - 1 whose statistics exceed the real ones, for the tests indexed by idx.
+     Must be called with consecutive ranges.
+    n_tests (int): Number of tests (e.g. syllables).
+    n_perm (int): Maximum number of permutations per test.
+    alpha_low (float): Tests whose p-value is confidently below this threshold are stopped,
+     e.g. the Bonferroni threshold thresh / n_tests, which implies significance after any correction.
+    alpha_high (float): Tests whose p-value is confidently above this threshold are stopped.
+    min_perm (int): Number of permutations in the first round.
+    risk (float): Probability of stopping any test on the wrong side of its threshold.
+    step (int): Round boundaries are rounded up to multiples of `step`.
+
+    Returns
+    -------
+    n_exceed (np.array): Number of permutations exceeding the real statistics; len == n_tests
+    n_done (np.array): Number of permutations run for each test; len == n_tests
     """
 
-    vc = x.value_counts()
-    tie_sum = 0
-    if (vc > 1).any():
-        tie_sum += np.sum(vc[vc != 1] ** 3 - vc[vc != 1])
-    return tie_sum / (12.0 * (N_m - 1))
+    n_exceed = np.zeros(n_tests, dtype="int64")
+    n_done = np.zeros(n_tests, dtype="int64")
+    active = np.ones(n_tests, dtype=bool)
 
+    rounds = _permutation_rounds(n_perm, min_perm, step)
+    round_risk = risk / (len(rounds) * max(1, n_tests))
 
-def run_manual_KW_test(
-        df_usage,
+    start = 0
+    for stop in rounds:
+        idx = np.where(active)[0]
+        if len(idx) == 0:
+            break
+        n_exceed[idx] += count_exceedances(idx, start, stop)
+        n_done[idx] = stop
+
+        if stop < n_perm:
+            lower, upper = _clopper_pearson(n_exceed[idx], stop, round_risk)
+            active[idx[(upper < alpha_low) | (lower > alpha_high)]] = False
+        start = stop
+
+    return n_exceed, n_done
+
+
+def run_sequential_KW_test(
         merged_usages_all,
         num_groups,
         n_per_group,
         cum_group_idx,
         n_perm=10000,
         seed=0,
+        thresh=0.05,
+        min_perm=1000,
+        risk=1e-3,
+        n_jobs=1,
+        max_memory_mb=256,
 ):
     """
-
-    Runs a manual KW test: ranks the syllables, computes the square sums for each group, computes the H-statistic,
-    and finally ensures that the results agree with the scipy.stats implementation.
+    Adaptive version of `run_manual_KW_test`: permutations are run in rounds (see `sequential_permutation_test`) and
+    each syllable stops once its permutation p-value is confidently above `thresh` or below the Bonferroni threshold
+    `thresh / N_s`. Only exceedance counts are kept. Permutations are drawn in the same order as in
+    `run_manual_KW_test`, so syllables that run all n_perm permutations get the same p-values.
 
     Parameters
     ----------
-    df_usage (pd.DataFrame): DataFrame containing only pre-computed syllable stats. shape = (N_m, n_syllables)
-    merged_usages_all (np.array): numpy array format of the df_usage DataFrame.
+    merged_usages_all (np.array): syllable stat array with sessions sorted by group; shape = (N_m, n_syllables)
     num_groups (int): Number of unique groups
     n_per_group (list): list of value counts for sessions per group. len == num_groups.
     cum_group_idx (list): list of indices for different groups. len == num_groups + 1.
-    n_perm (int): Number of permuted samples to generate.
+    n_perm (int): Maximum number of permuted samples to generate.
     seed (int): Random seed used to initialize the pseudo-random number generator.
+    thresh (float): Alpha threshold to consider syllable significant.
+    min_perm (int): Number of permutations in the first round.
+    risk (float): Probability of stopping any syllable on the wrong side of its threshold.
+    n_jobs (int): Number of worker processes used to evaluate the permutation chunks.
+    max_memory_mb (float): Approximate cap (in MB) on the working memory of all workers.
 
     Returns
     -------
-    h_all (np.array): Array of H-stats computed for given n_syllables; shape = (n_perms, N_s)
+    n_exceed (np.array): Number of permuted H-stats exceeding the real ones; len == N_s
+    n_done (np.array): Number of permutations run for each syllable; len == N_s
     real_ranks (np.array): Array of syllable ranks, shape = (N_m, n_syllables)
     X_ties (np.array): 1-D list of tied ranks, where if value > 0, then rank is tied. len(X_ties) = n_syllables
     """
 
     N_m, N_s = merged_usages_all.shape
-
-    # create random index array n_perm times
     rnd = np.random.RandomState(seed=seed)
-    perm = rnd.rand(n_perm, N_m).argsort(-1)
 
-    # get degrees of freedom
-    dof = num_groups - 1
+    real_ranks, KW_tie_correct, X_ties = get_rank_stats(merged_usages_all)
+    h_real = _get_h_stats(real_ranks, n_per_group, KW_tie_correct)
 
-    real_ranks = np.apply_along_axis(stats.rankdata, 0, merged_usages_all)
-    X_ties = df_usage.apply(get_tie_correction, 0, N_m=N_m).values
-    KW_tie_correct = np.apply_along_axis(stats.tiecorrect, 0, real_ranks)
+    def count_exceedances(idx, start, stop):
+        chunk_size = _get_permutation_chunk_size(N_m, len(idx), num_groups, max_memory_mb, n_jobs)
+        return sum(Parallel(n_jobs=n_jobs)(
+            delayed(_permuted_h_exceedances)(perm, real_ranks[:, idx], n_per_group, cum_group_idx,
+                                             KW_tie_correct[idx], h_real[idx])
+            for perm in _iter_permutation_chunks(rnd, stop - start, N_m, chunk_size)
+        ))
 
-    # rank data
-    perm_ranks = real_ranks[perm]
+    n_exceed, n_done = sequential_permutation_test(count_exceedances, N_s, n_perm, thresh / N_s, thresh,
+                                                   min_perm=min_perm, risk=risk)
 
-    # get square of sums for each group
-    ssbn = np.zeros((n_perm, N_s))
-    for i in range(num_groups):
-        ssbn += (
-                perm_ranks[:, cum_group_idx[i]: cum_group_idx[i + 1]].sum(1) ** 2
-                / n_per_group[i]
-        )
+    return n_exceed, n_done, real_ranks, X_ties
 
-    # h-statistic
-    h_all = 12.0 / (N_m * (N_m + 1)) * ssbn - 3 * (N_m + 1)
-    h_all /= KW_tie_correct
-    p_vals = stats.chi2.sf(h_all, df=dof)
-
-    # check that results agree
-    p_i = np.random.randint(n_perm)
-    s_i = np.random.randint(N_s)
-    kr = stats.kruskal(
-        *np.array_split(
-            merged_usages_all[perm[p_i, :], s_i], np.cumsum(n_per_group[:-1])
+
+def run_batch_kruskal(
+        df,
+        statistics=("usage",),
+        max_syllable=40,
+        n_perm=10000,
+        seed=42,
+        thresh=0.05,
+        mc_method="fdr_bh",
+        n_jobs=1,
+        max_memory_mb=256,
+        cache_dir=None,
+):
+    """
+    Runs the Kruskal-Wallis and Dunn's permutation tests of `run_kruskal` for several syllable statistics at once.
+    All statistics are pivoted into one (sessions x syllables x statistics) array and ranked once; a single set of
+    permutations is shared by all statistics for the KW test, and one set per group pair for Dunn's test.
+    Only permutation exceedance counts are kept (see `run_manual_KW_test` and `dunns_z_test_streaming`).
+    p-values are corrected for multiple comparisons separately for each statistic.
+
+    Parameters
+    ----------
+    df (pd.DataFrame): Output of moseq2_viz.model.compute_behavioral_statistics().
+    statistics (list): statistics to test (any of the columns in input df);
+     for example: ['usage', 'duration', 'velocity_2d_mm_mean'].
+    max_syllable (int): Maximum number of syllables to include.
+    n_perm (int): Number of permuted samples to generate.
+    seed (int): Random seed used to initialize the pseudo-random number generators.
+    thresh (float): Alpha threshold to consider syllable significant.
+    mc_method (str): Multiple Corrections method to use.
+    n_jobs (int): Number of worker processes.
+    max_memory_mb (float): Approximate cap (in MB) on the working memory of the KW permutations.
+    cache_dir (str): optional directory to cache the results in, keyed by the session means, groups and test
+     parameters (see `_cached_stats_result`).
+
+    Returns
+    -------
+    df_kw (pd.DataFrame): KW test results with one row per statistic and syllable.
+     columns = ['stat', 'syllable', 'statistic', 'pvalue', 'p_perm', 'p_adj', 'is_sig'], where 'statistic' is the
+     H-statistic, 'pvalue' its chi-squared p-value and 'p_perm' the permutation p-value that is corrected.
+    df_dunn (pd.DataFrame): Dunn's test results with one row per statistic, syllable and group pair.
+     columns = ['stat', 'syllable', 'group1', 'group2', 'z', 'p_perm', 'p_adj', 'is_sig'], where 'is_sig' also
+     requires the syllable to be significant in the KW test.
+    """
+
+    statistics = list(statistics)
+    sessions, stat_array = get_session_mean_array(df, statistics, max_syllable)
+
+    if cache_dir is not None:
+        params = {"statistics": statistics, "max_syllable": max_syllable, "n_perm": n_perm, "seed": seed,
+                  "thresh": thresh, "mc_method": mc_method}
+        return _cached_stats_result(
+            cache_dir, "batch_kruskal", (sessions.values.tolist(), stat_array), params,
+            lambda: run_batch_kruskal(df, n_jobs=n_jobs, max_memory_mb=max_memory_mb, **params)
         )
+
+    # KW Constants
+    vc = sessions.group.value_counts().loc[sessions.group.unique()]
+    n_per_group = vc.values
+    group_names = vc.index
+    cum_group_idx = np.insert(np.cumsum(n_per_group), 0, 0)
+    num_groups = len(group_names)
+
+    N_m, N_s, N_k = stat_array.shape
+    values = stat_array.reshape(N_m, N_s * N_k)
+
+    # rank all syllables and statistics once
+    real_ranks, KW_tie_correct, X_ties = get_rank_stats(values)
+    h_real = _get_h_stats(real_ranks, n_per_group, KW_tie_correct)
+
+    # one set of permutations shared by all statistics
+    rnd = np.random.RandomState(seed=seed)
+    chunk_size = _get_permutation_chunk_size(N_m, N_s * N_k, num_groups, max_memory_mb, n_jobs)
+    n_exceed = sum(Parallel(n_jobs=n_jobs)(
+        delayed(_permuted_h_exceedances)(perm, real_ranks, n_per_group, cum_group_idx, KW_tie_correct, h_real)
+        for perm in _iter_permutation_chunks(rnd, n_perm, N_m, chunk_size)
+    ))
+    # syllables without any variance cannot be different
+    p_perm = np.where(np.isnan(h_real), 1, (n_exceed + 1) / n_perm)
+
+    df_kw = pd.DataFrame({
+        "stat": np.tile(statistics, N_s),
+        "syllable": np.repeat(np.arange(N_s), N_k),
+        "statistic": h_real,
+        "pvalue": stats.chi2.sf(h_real, df=num_groups - 1),
+        "p_perm": p_perm,
+    })
+    df_kw["p_adj"] = df_kw.groupby("stat")["p_perm"].transform(
+        lambda x: multipletests(x, alpha=thresh, method=mc_method)[1]
     )
-    assert (kr.statistic == h_all[p_i, s_i]) & (
-            kr.pvalue == p_vals[p_i, s_i]
-    ), "manual KW is incorrect"
+    df_kw["is_sig"] = df_kw["p_adj"] <= thresh
 
-    return h_all, real_ranks, X_ties
+    # Dunn's tests for all statistics at once
+    exceedances, real_zs = dunns_z_test_streaming(
+        sessions, vc, real_ranks, X_ties, N_m, group_names, n_perm, seed=seed, n_jobs=n_jobs
+    )
+    pairs = list(exceedances)
+    dunn_p = np.array([(exceedances[pair] + 1) / n_perm for pair in pairs]).T
+    dunn_p[np.isnan(h_real)] = 1
+    # correct across group pairs for each syllable, as in compute_pvalues_for_group_pairs
+    dunn_p_adj = np.array([multipletests(p, alpha=thresh, method=mc_method)[1] for p in dunn_p])
+
+    df_dunn = pd.DataFrame({
+        "stat": np.tile(np.repeat(statistics, len(pairs)), N_s),
+        "syllable": np.repeat(np.arange(N_s), N_k * len(pairs)),
+        "group1": np.tile([pair[0] for pair in pairs], N_s * N_k),
+        "group2": np.tile([pair[1] for pair in pairs], N_s * N_k),
+        "z": np.array([real_zs[pair] for pair in pairs]).T.ravel(),
+        "p_perm": dunn_p.ravel(),
+        "p_adj": dunn_p_adj.ravel(),
+    })
+    df_dunn["is_sig"] = (df_dunn["p_adj"] < thresh) & np.repeat(df_kw["is_sig"].values, len(pairs))
+
+    return df_kw, df_dunn
 
 
 def plot_H_stat_significance(df_k_real, h_all, N_s):
@@ -250,6 +1083,13 @@ def run_kruskal(
         thresh=0.05,
         mc_method="fdr_bh",
         verbose=False,
+        n_jobs=1,
+        max_memory_mb=256,
+        streaming_dunn=False,
+        adaptive=False,
+        min_perm=1000,
+        adaptive_risk=1e-3,
+        cache_dir=None,
 ):
     """
     Runs Kruskal-Wallis Hypothesis test and Dunn's posthoc multiple comparisons test for a
@@ -270,21 +1110,44 @@ def run_kruskal(
     mc_method (str): Multiple Corrections method to use.
      Options can be found here: https://www.statsmodels.org/dev/generated/statsmodels.stats.multitest.multipletests.html
     verbose (bool): indicates whether to print out the significant syllable results
+    n_jobs (int): Number of worker processes used to evaluate the KW permutations.
+    max_memory_mb (float): Approximate cap (in MB) on the working memory of the KW permutations.
+    streaming_dunn (bool): use the streaming Dunn's test permutations (see `dunns_z_test_streaming`),
+     which keep memory bounded for many groups. Permutations are drawn from per-pair seeds spawned from `seed`.
+    adaptive (bool): run the KW and Dunn's permutations in rounds and stop each syllable once its permutation
+     p-value is confidently significant or not significant (see `run_sequential_KW_test` and
+     `dunns_z_test_sequential`), so only borderline syllables run all n_perm permutations.
+    min_perm (int): Number of permutations in the first adaptive round.
+    adaptive_risk (float): Probability of stopping any syllable on the wrong side of the threshold, bounded across
+     all syllables of the KW test and, separately, across all syllables and group pairs of Dunn's test.
+    cache_dir (str): optional directory to cache the results in, keyed by the session means, groups and test
+     parameters (see `_cached_stats_result`), so re-running the same test loads the previous results.
 
     Returns
     -------
     df_k_real (pd.DataFrame): DataFrame of KW test results.
-     n_rows=max_syllable, n_cols=['statistic', 'pvalue', 'emp_fdr', 'is_sig']
+     n_rows=max_syllable, n_cols=['statistic', 'pvalue', 'emp_fdr', 'is_sig'], plus 'n_perm' (number of
+     permutations run for each syllable) in adaptive mode.
     dunn_results_df (pd.DataFrame): DataFrame of Dunn's test results for permuted group pairs.
      n_rows=(max_syllable*n_group_pairs), n_cols=['syllable', 'variable_0', 'variable_1', 'value']
     intersect_sig_syllables (dict): dictionary containing intersecting significant syllables between
      KW and Dunn's tests. Keys = ('group1', 'group2') -> Value: array of significant syllables.
     """
 
-    rnd = np.random.RandomState(seed=seed)
-
     # get mean grouped data
-    grouped_data = get_session_mean_df(df, statistic, max_syllable).reset_index()
+    grouped_data = get_session_mean_df(df, statistic, max_syllable)
+
+    if cache_dir is not None:
+        params = {"statistic": statistic, "max_syllable": max_syllable, "n_perm": n_perm, "seed": seed,
+                  "thresh": thresh, "mc_method": mc_method, "streaming_dunn": streaming_dunn,
+                  "adaptive": adaptive, "min_perm": min_perm, "adaptive_risk": adaptive_risk}
+        return _cached_stats_result(
+            cache_dir, "kruskal", grouped_data, params,
+            lambda: run_kruskal(df, verbose=verbose, n_jobs=n_jobs, max_memory_mb=max_memory_mb, **params)
+        )
+
+    rnd = np.random.RandomState(seed=seed)
+    grouped_data = grouped_data.reset_index()
 
     # KW Constants
     vc = grouped_data.group.value_counts().loc[grouped_data.group.unique()]
@@ -299,28 +1162,45 @@ def run_kruskal(
 
     N_m, N_s = merged_usages_all.shape
 
-    # Run KW and return H-stats
-    h_all, real_ranks, X_ties = run_manual_KW_test(
-        df_usage=df_only_usage,
-        merged_usages_all=merged_usages_all,
-        num_groups=num_groups,
-        n_per_group=n_per_group,
-        cum_group_idx=cum_group_idx,
-        n_perm=n_perm,
-        seed=seed,
-    )
-
-    df_k_real = pd.DataFrame(
-        [
-            stats.kruskal(
-                *np.array_split(merged_usages_all[:, s_i], np.cumsum(n_per_group[:-1]))
-            )
-            for s_i in range(N_s)
-        ]
-    )
+    h_real, pvalues = kruskal_columns(merged_usages_all, n_per_group)
+    df_k_real = pd.DataFrame({"statistic": h_real, "pvalue": pvalues})
+
+    if adaptive:
+        # Run KW permutations until each syllable's p-value is decided
+        n_exceed, n_done, real_ranks, X_ties = run_sequential_KW_test(
+            merged_usages_all=merged_usages_all,
+            num_groups=num_groups,
+            n_per_group=n_per_group,
+            cum_group_idx=cum_group_idx,
+            n_perm=n_perm,
+            seed=seed,
+            thresh=thresh,
+            min_perm=min_perm,
+            risk=adaptive_risk,
+            n_jobs=n_jobs,
+            max_memory_mb=max_memory_mb,
+        )
+        df_k_real["n_perm"] = n_done
+        p_perm = (n_exceed + 1) / n_done
+    else:
+        # Run KW and return H-stats
+        h_all, real_ranks, X_ties = run_manual_KW_test(
+            df_usage=df_only_usage,
+            merged_usages_all=merged_usages_all,
+            num_groups=num_groups,
+            n_per_group=n_per_group,
+            cum_group_idx=cum_group_idx,
+            n_perm=n_perm,
+            seed=seed,
+            n_jobs=n_jobs,
+            max_memory_mb=max_memory_mb,
+        )
+        p_perm = ((h_all > df_k_real.statistic.values).sum(0) + 1) / n_perm
+    # syllables without any variance cannot be different
+    p_perm = np.where(np.isnan(h_real), 1, p_perm)
 
     df_k_real["p_adj"] = multipletests(
-        ((h_all > df_k_real.statistic.values).sum(0) + 1) / n_perm,
+        p_perm,
         alpha=thresh,
         method=mc_method,
     )[1]
@@ -331,12 +1211,26 @@ def run_kruskal(
         print(f"Found {df_k_real['is_sig'].sum()} syllables that pass threshold {thresh} with {mc_method}")
 
     # Run Dunn's z-test statistics
-    (
-        null_zs_within_group,
-        real_zs_within_group,
-    ) = dunns_z_test_permute_within_group_pairs(
-        grouped_data, vc, real_ranks, X_ties, N_m, group_names, rnd, n_perm
-    )
+    n_perm_done = None
+    if adaptive:
+        exceedances, n_perm_done, real_zs_within_group = dunns_z_test_sequential(
+            grouped_data, vc, real_ranks, X_ties, N_m, group_names, n_perm, seed=seed, thresh=thresh,
+            min_perm=min_perm, risk=adaptive_risk, n_jobs=n_jobs
+        )
+        null_zs_within_group = None
+    elif streaming_dunn:
+        exceedances, real_zs_within_group = dunns_z_test_streaming(
+            grouped_data, vc, real_ranks, X_ties, N_m, group_names, n_perm, seed=seed, n_jobs=n_jobs
+        )
+        null_zs_within_group = None
+    else:
+        exceedances = None
+        (
+            null_zs_within_group,
+            real_zs_within_group,
+        ) = dunns_z_test_permute_within_group_pairs(
+            grouped_data, vc, real_ranks, X_ties, N_m, group_names, rnd, n_perm
+        )
 
     # Compute p-values from Dunn's z-score statistics
     df_pair_corrected_pvalues, _ = compute_pvalues_for_group_pairs(
@@ -347,6 +1241,8 @@ def run_kruskal(
         n_perm,
         thresh,
         mc_method,
+        exceedances=exceedances,
+        n_perm_done=n_perm_done,
     )
 
     # combine Dunn's test results into single DataFrame
@@ -380,7 +1276,9 @@ def compute_pvalues_for_group_pairs(
         n_perm=10000,
         thresh=0.05,
         mc_method="fdr_bh",
-        verbose=False
+        verbose=False,
+        exceedances=None,
+        n_perm_done=None,
 ):
     """
     Adjusts the p-values from Dunn's z-test statistics and computes the resulting significant syllables with the
@@ -397,6 +1295,10 @@ def compute_pvalues_for_group_pairs(
     thresh (float): Alpha threshold to consider syllable significant.
     mc_method (str): Multiple Corrections method to use.
     verbose (bool): indicates whether to print out the significant syllable results
+    exceedances (dict): optional dict of group pair keys paired with the number of null z-statistics exceeding the
+     real ones (see `dunns_z_test_streaming`); used instead of `null_zs`.
+    n_perm_done (dict): optional dict of group pair keys paired with the number of permutations run for each
+     syllable (see `dunns_z_test_sequential`); used instead of `n_perm`.
 
     Returns
     -------
@@ -411,9 +1313,12 @@ def compute_pvalues_for_group_pairs(
 
     p_vals_allperm = {}
     for pair in combinations(group_names, 2):
-        p_vals_allperm[pair] = (
-                                       (null_zs[pair] > real_zs_within_group[pair]).sum(0) + 1
-                               ) / n_perm
+        if exceedances is not None:
+            n_exceed = exceedances[pair]
+        else:
+            n_exceed = (null_zs[pair] > real_zs_within_group[pair]).sum(0)
+        pair_n_perm = n_perm_done[pair] if n_perm_done is not None else n_perm
+        p_vals_allperm[pair] = (n_exceed + 1) / pair_n_perm
 
     # summarize into df
     df_pval = pd.DataFrame(p_vals_allperm)
@@ -479,6 +1384,241 @@ def dunns_z_test_permute_within_group_pairs(
     return null_zs_within_group, real_zs_within_group
 
 
+def _dunns_chunk_exceedances(pair_ranks, n_i, real_z, scale, blocks):
+    """
+    Counts how often the permuted Dunn's z-statistics of one group pair exceed the real ones, for a chunk of
+    permutations. Each permutation only needs the random subset of sessions assigned to the first group, which is
+    drawn with an O(n) partition of uniforms; group rank sums follow from an indicator matrix product.
+
+    Parameters
+    ----------
+    pair_ranks (np.array): Array of syllable ranks of the sessions in both groups; shape = (n_mice, N_s)
+    n_i (int): Number of sessions in the first group.
+    real_z (np.array): Dunn's z-statistics of the real data; shape = (N_s,)
+    scale (np.array): z-statistic denominator of each syllable; shape = (N_s,)
+    blocks (list): seeded blocks of permutations in this chunk (see `moseq2_viz.util.get_rng_blocks`).
+
+    Returns
+    -------
+    n_exceed (np.array): Number of permutations whose z-statistic exceeds the real one; shape = (N_s,)
+    """
+
+    n_mice = len(pair_ranks)
+    n_j = n_mice - n_i
+    total = pair_ranks.sum(0)
+
+    uniforms = draw_rng_blocks(blocks, lambda rng, n: rng.random((n, n_mice)))
+    n_chunk = len(uniforms)
+
+    # random subset of n_i sessions assigned to the first group
+    subset = np.argpartition(uniforms, n_i - 1, axis=1)[:, :n_i]
+    in_i = np.zeros((n_chunk, n_mice))
+    in_i[np.arange(n_chunk)[:, None], subset] = 1
+
+    sum_i = in_i.dot(pair_ranks)
+    diff = np.abs(sum_i / n_i - (total - sum_i) / n_j)
+    return (diff / scale > real_z).sum(0)
+
+
+def _dunns_pair_exceedances(pair_ranks, n_i, real_z, scale, n_perm, seed, chunk_size):
+    """
+    Counts how often the permuted Dunn's z-statistics of one group pair exceed the real ones, processing the
+    permutations in chunks (see `_dunns_chunk_exceedances`).
+
+    Parameters
+    ----------
+    pair_ranks (np.array): Array of syllable ranks of the sessions in both groups; shape = (n_mice, N_s)
+    n_i (int): Number of sessions in the first group.
+    real_z (np.array): Dunn's z-statistics of the real data; shape = (N_s,)
+    scale (np.array): z-statistic denominator of each syllable; shape = (N_s,)
+    n_perm (int): Number of permuted samples to generate.
+    seed (np.random.SeedSequence): seed of this group pair.
+    chunk_size (int): Approximate number of permutations processed at once.
+
+    Returns
+    -------
+    n_exceed (np.array): Number of permutations whose z-statistic exceeds the real one; shape = (N_s,)
+    """
+
+    n_exceed = np.zeros(pair_ranks.shape[1], dtype="int64")
+    for blocks in get_rng_blocks(seed, n_perm, chunk_size):
+        n_exceed += _dunns_chunk_exceedances(pair_ranks, n_i, real_z, scale, blocks)
+
+    return n_exceed
+
+
+def _dunns_pair_exceedances_sequential(pair_ranks, n_i, real_z, scale, n_perm, seed, chunk_size, alpha_low,
+                                       alpha_high, min_perm, risk):
+    """
+    Adaptive version of `_dunns_pair_exceedances`: permutations run in rounds and each syllable stops once its
+    p-value is confidently outside [alpha_low, alpha_high] (see `sequential_permutation_test`). Permutations are
+    drawn from the same seeded blocks, so syllables that run all n_perm permutations get the same counts.
+
+    Parameters
+    ----------
+    pair_ranks (np.array): Array of syllable ranks of the sessions in both groups; shape = (n_mice, N_s)
+    n_i (int): Number of sessions in the first group.
+    real_z (np.array): Dunn's z-statistics of the real data; shape = (N_s,)
+    scale (np.array): z-statistic denominator of each syllable; shape = (N_s,)
+    n_perm (int): Maximum number of permuted samples to generate.
+    seed (np.random.SeedSequence): seed of this group pair.
+    chunk_size (int): Approximate number of permutations processed at once.
+    alpha_low (float): syllables with p-values confidently below this threshold are stopped.
+    alpha_high (float): syllables with p-values confidently above this threshold are stopped.
+    min_perm (int): Number of permutations in the first round.
+    risk (float): Probability of stopping any syllable on the wrong side of its threshold.
+
+    Returns
+    -------
+    n_exceed (np.array): Number of permutations whose z-statistic exceeds the real one; shape = (N_s,)
+    n_done (np.array): Number of permutations run for each syllable; shape = (N_s,)
+    """
+
+    blocks = list(chain.from_iterable(get_rng_blocks(seed, n_perm)))
+    blocks_per_chunk = max(1, chunk_size // RNG_BLOCK_SIZE)
+
+    def count_exceedances(idx, start, stop):
+        round_blocks = blocks[start // RNG_BLOCK_SIZE: int(np.ceil(stop / RNG_BLOCK_SIZE))]
+        return sum(
+            _dunns_chunk_exceedances(pair_ranks[:, idx], n_i, real_z[idx], scale[idx],
+                                     round_blocks[i:i + blocks_per_chunk])
+            for i in range(0, len(round_blocks), blocks_per_chunk)
+        )
+
+    return sequential_permutation_test(count_exceedances, len(real_z), n_perm, alpha_low, alpha_high,
+                                       min_perm=min_perm, risk=risk, step=RNG_BLOCK_SIZE)
+
+
+def _get_dunns_pairs(df_usage, vc, real_ranks, X_ties, N_m, group_names):
+    """
+    Collects the ranks and real Dunn's z-statistics of each group pair.
+
+    Parameters
+    ----------
+    df_usage (pd.DataFrame): DataFrame containing the group of each session.
+    vc (pd.Series): value counts of sessions in each group.
+    real_ranks (np.array): Array of syllable ranks, shape = (N_m, n_syllables)
+    X_ties (np.array): 1-D list of tied ranks, where if value > 0, then rank is tied. len(X_ties) = n_syllables
+    N_m (int): Number of sessions.
+    group_names (pd.Index): Index list of unique group names.
+
+    Returns
+    -------
+    pairs (list): list of (pair, group_ranks, n_i, scale, real_z) tuples, where group_ranks holds the ranks of the
+     sessions of the first group followed by those of the second group.
+    """
+
+    A = N_m * (N_m + 1.0) / 12.0
+
+    pairs = []
+    for i_n, j_n in combinations(group_names, 2):
+        is_i = (df_usage.group == i_n).values
+        is_j = (df_usage.group == j_n).values
+
+        # sessions of group i first
+        group_ranks = np.concatenate([real_ranks[is_i], real_ranks[is_j]])
+        n_i = is_i.sum()
+        B = 1.0 / vc.loc[i_n] + 1.0 / vc.loc[j_n]
+        scale = np.sqrt((A - X_ties) * B)
+
+        real_diff = np.abs(group_ranks[:n_i].mean(0) - group_ranks[n_i:].mean(0))
+        pairs.append(((i_n, j_n), group_ranks, n_i, scale, real_diff / scale))
+
+    return pairs
+
+
+def dunns_z_test_streaming(
+        df_usage, vc, real_ranks, X_ties, N_m, group_names, n_perm, seed=0, chunk_size=1000, n_jobs=1
+):
+    """
+    Streaming version of `dunns_z_test_permute_within_group_pairs`: permutations are processed in chunks and only
+    the running number of null z-statistics exceeding the real ones is kept for each group pair, so memory does not
+    grow with n_perm or the number of pairs. Group pairs run in parallel, each with its own seed spawned from
+    `seed`, so results are reproducible for any n_jobs or chunk_size.
+
+    Parameters
+    ----------
+    df_usage (pd.DataFrame): DataFrame containing only pre-computed syllable stats. shape = (N_m, n_syllables)
+    vc (pd.Series): value counts of sessions in each group.
+    real_ranks (np.array): Array of syllable ranks, shape = (N_m, n_syllables)
+    X_ties (np.array): 1-D list of tied ranks, where if value > 0, then rank is tied. len(X_ties) = n_syllables
+    N_m (int): Number of sessions.
+    group_names (pd.Index): Index list of unique group names.
+    n_perm (int): Number of permuted samples to generate.
+    seed (int): Random seed used to initialize the pseudo-random number generators.
+    chunk_size (int): Number of permutations processed at once per group pair.
+    n_jobs (int): Number of group pairs processed in parallel.
+
+    Returns
+    -------
+    exceedances (dict): dict of group pair keys paired with the number of null z-statistics exceeding the real ones.
+    real_zs_within_group (dict): dict of group pair keys paired with vector of Dunn's z-test statistics
+    """
+
+    pairs = _get_dunns_pairs(df_usage, vc, real_ranks, X_ties, N_m, group_names)
+    seeds = spawn_seeds(seed, len(pairs))
+
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(_dunns_pair_exceedances)(group_ranks, n_i, real_z, scale, n_perm, pair_seed, chunk_size)
+        for (_, group_ranks, n_i, scale, real_z), pair_seed in zip(pairs, seeds)
+    )
+
+    exceedances = {pair[0]: n_exceed for pair, n_exceed in zip(pairs, results)}
+    real_zs_within_group = {pair[0]: pair[4] for pair in pairs}
+
+    return exceedances, real_zs_within_group
+
+
+def dunns_z_test_sequential(
+        df_usage, vc, real_ranks, X_ties, N_m, group_names, n_perm, seed=0, thresh=0.05, min_perm=1000,
+        risk=1e-3, chunk_size=1000, n_jobs=1
+):
+    """
+    Adaptive version of `dunns_z_test_streaming`: permutations are run in rounds and each syllable of each group
+    pair stops once its p-value is confidently above `thresh` or below the Bonferroni threshold across group pairs,
+    `thresh / n_pairs` (see `sequential_permutation_test`). Syllables that run all n_perm permutations get the same
+    exceedance counts as `dunns_z_test_streaming` with the same seed.
+
+    Parameters
+    ----------
+    df_usage (pd.DataFrame): DataFrame containing only pre-computed syllable stats. shape = (N_m, n_syllables)
+    vc (pd.Series): value counts of sessions in each group.
+    real_ranks (np.array): Array of syllable ranks, shape = (N_m, n_syllables)
+    X_ties (np.array): 1-D list of tied ranks, where if value > 0, then rank is tied. len(X_ties) = n_syllables
+    N_m (int): Number of sessions.
+    group_names (pd.Index): Index list of unique group names.
+    n_perm (int): Maximum number of permuted samples to generate.
+    seed (int): Random seed used to initialize the pseudo-random number generators.
+    thresh (float): Alpha threshold to consider syllable significant.
+    min_perm (int): Number of permutations in the first round.
+    risk (float): Probability of stopping any syllable of any group pair on the wrong side of its threshold.
+    chunk_size (int): Number of permutations processed at once per group pair.
+    n_jobs (int): Number of group pairs processed in parallel.
+
+    Returns
+    -------
+    exceedances (dict): dict of group pair keys paired with the number of null z-statistics exceeding the real ones.
+    n_done (dict): dict of group pair keys paired with the number of permutations run for each syllable.
+    real_zs_within_group (dict): dict of group pair keys paired with vector of Dunn's z-test statistics
+    """
+
+    pairs = _get_dunns_pairs(df_usage, vc, real_ranks, X_ties, N_m, group_names)
+    seeds = spawn_seeds(seed, len(pairs))
+    alpha_low = thresh / max(1, len(pairs))
+
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(_dunns_pair_exceedances_sequential)(group_ranks, n_i, real_z, scale, n_perm, pair_seed, chunk_size,
+                                                    alpha_low, thresh, min_perm, risk / max(1, len(pairs)))
+        for (_, group_ranks, n_i, scale, real_z), pair_seed in zip(pairs, seeds)
+    )
+
+    exceedances = {pair[0]: res[0] for pair, res in zip(pairs, results)}
+    n_done = {pair[0]: res[1] for pair, res in zip(pairs, results)}
+    real_zs_within_group = {pair[0]: pair[4] for pair in pairs}
+
+    return exceedances, n_done, real_zs_within_group
+
+
 def run_pairwise_stats(df, group1, group2, test_type="mw", verbose=False, **kwargs):
     """
     Wrapper for hypothesis testing functions: MannWhitney, Z-Test and T-Test.
@@ -549,7 +1689,8 @@ def mann_whitney(df, group1, group2, statistic="usage", max_syllable=40, verbose
     return get_sig_syllables(df_mw_real, verbose=verbose, **kwargs)
 
 
-def ztest(df, group1, group2, statistic="usage", max_syllable=40, verbose=False, **kwargs):
+def ztest(df, group1, group2, statistic="usage", max_syllable=40, verbose=False, streaming=False, n_iters=10000,
+          seed=None, n_jobs=1, **kwargs):
     """
     Computes a z hypothesis test on 2 (bootstrapped) selected groups.
     Also runs multiple corrections test to find syllables to exclude.
@@ -564,6 +1705,10 @@ def ztest(df, group1, group2, statistic="usage", max_syllable=40, verbose=False,
     statistic (str): Name of statistic to compute z-test on.
     max_syllable (int): Maximum number of syllables to include
     verbose (bool): indicates whether to print out the significant syllable results
+    streaming (bool): bootstrap with `bootstrap_moments`, keeping only running moments instead of all samples.
+    n_iters (int): Number of bootstrap samples when streaming.
+    seed (int): Random seed of the bootstrap; each group is resampled from its own sub-stream.
+    n_jobs (int): Number of parallel workers of the streaming bootstrap.
     thresh (float): Alpha threshold to consider syllable significant.
     mc_method (str): Multiple Corrections method to use.
 
@@ -572,9 +1717,18 @@ def ztest(df, group1, group2, statistic="usage", max_syllable=40, verbose=False,
     pvals_ztest_boots (np.array): Computed array of p-values
     syllables_to_include (list): List of significant syllables after multiple corrections.
     """
-    boots = bootstrap_group_means(df, group1, group2, statistic, max_syllable)
-    # do a ztest on the bootstrap distributions of your 2 conditions
-    pvals_ztest_boots = ztest_vect(boots[group1], boots[group2])
+    if streaming:
+        group_stat = get_session_mean_df(df, statistic, max_syllable)
+        seed = as_seed_sequence(seed)
+        moments = {k: bootstrap_moments(group_stat.loc[k].values, n_iters=n_iters, seed=seed, n_jobs=n_jobs,
+                                        stream=i)
+                   for i, k in enumerate((group1, group2))}
+        pvals_ztest_boots = ztest_moments(moments[group1]["mean"], moments[group1]["std"],
+                                          moments[group2]["mean"], moments[group2]["std"])
+    else:
+        boots = bootstrap_group_means(df, group1, group2, statistic, max_syllable, seed=seed)
+        # do a ztest on the bootstrap distributions of your 2 conditions
+        pvals_ztest_boots = ztest_vect(boots[group1], boots[group2])
     df_z = pd.DataFrame(pvals_ztest_boots, columns=["pvalue"])
     return get_sig_syllables(df_z, verbose=verbose, **kwargs)
 
@@ -613,6 +1767,171 @@ def ttest(df, group1, group2, statistic="usage", max_syllable=40, verbose=False,
     return get_sig_syllables(df_t, verbose=verbose, **kwargs)
 
 
+def mann_whitney_vect(x, y, use_continuity=True, alternative="two-sided"):
+    """
+    Performs Mann-Whitney U tests on all syllables at once using the normal approximation with tie correction,
+    matching scipy.stats.mannwhitneyu(x, y, alternative=alternative, method="asymptotic").
+
+    Parameters
+    ----------
+    x (np.array): syllable stat array from group 1; shape = (n_mice_1, n_syllables)
+    y (np.array): syllable stat array from group 2; shape = (n_mice_2, n_syllables)
+    use_continuity (bool): apply a continuity correction of 1/2.
+    alternative (str): one of ["two-sided", "less", "greater"].
+
+    Returns
+    -------
+    u (np.array): U statistic of group 1 for each syllable.
+    p-values (np.array): array of computed p-values of len == n_syllables.
+    """
+
+    if alternative not in ("two-sided", "less", "greater"):
+        raise ValueError("`alternative` must be one of ['two-sided', 'less', 'greater']")
+
+    n1, n2 = len(x), len(y)
+    n = n1 + n2
+    data = np.concatenate([x, y])
+
+    ranks, tie_term = rank_columns(data)
+    u1 = ranks[:n1].sum(0) - n1 * (n1 + 1) / 2.0
+    u2 = n1 * n2 - u1
+
+    if alternative == "two-sided":
+        u = np.maximum(u1, u2)
+    elif alternative == "greater":
+        u = u1
+    else:
+        u = u2
+
+    mu = n1 * n2 / 2.0
+    sigma = np.sqrt(n1 * n2 / 12.0 * ((n + 1) - tie_term / (n * (n - 1))))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = (u - mu - (0.5 if use_continuity else 0)) / sigma
+    p = stats.norm.sf(z)
+    if alternative == "two-sided":
+        p *= 2
+
+    return u1, np.clip(p, 0, 1)
+
+
+def ttest_vect(x, y, equal_var=True):
+    """
+    Performs independent two-sample t-tests on all syllables at once, matching scipy.stats.ttest_ind.
+
+    Parameters
+    ----------
+    x (np.array): syllable stat array from group 1; shape = (n_mice_1, n_syllables)
+    y (np.array): syllable stat array from group 2; shape = (n_mice_2, n_syllables)
+    equal_var (bool): if True, perform Student's t-test assuming equal variances, otherwise Welch's t-test.
+
+    Returns
+    -------
+    t (np.array): t statistic for each syllable.
+    p-values (np.array): array of computed p-values of len == n_syllables.
+    """
+
+    n1, n2 = len(x), len(y)
+    v1, v2 = x.var(0, ddof=1), y.var(0, ddof=1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if equal_var:
+            dof = n1 + n2 - 2.0
+            se = np.sqrt(((n1 - 1) * v1 + (n2 - 1) * v2) / dof * (1.0 / n1 + 1.0 / n2))
+        else:
+            vn1, vn2 = v1 / n1, v2 / n2
+            dof = (vn1 + vn2) ** 2 / (vn1 ** 2 / (n1 - 1) + vn2 ** 2 / (n2 - 1))
+            se = np.sqrt(vn1 + vn2)
+        t = (x.mean(0) - y.mean(0)) / se
+
+    return t, 2 * stats.t.sf(np.abs(t), dof)
+
+
+def run_all_pairwise_stats(df, test_type="mw", statistic="usage", max_syllable=40, groups=None, thresh=0.05,
+                           mc_method="fdr_bh", equal_var=True, n_iters=10000, seed=None, verbose=False,
+                           cache_dir=None):
+    """
+    Runs a pairwise hypothesis test (see `run_pairwise_stats`) for all syllables and all pairs of groups at once,
+    on a single pivot of the data. p-values are corrected for multiple comparisons across syllables within each
+    group pair, as in `get_sig_syllables`.
+
+    Parameters
+    ----------
+    df (pd.DataFrame): Output of moseq2_viz.model.compute_behavioral_statistics().
+    test_type (str): one of ["mw", "z_test", "t_test"]. "mw" uses the asymptotic two-sided Mann-Whitney U test
+     (see `mann_whitney_vect`), "t_test" a Student's or Welch's t-test (see `ttest_vect`) and "z_test" the z-test
+     on streamed bootstrap moments of the group means (see `bootstrap_moments`).
+    statistic (str): Name of statistic to test.
+    max_syllable (int): Maximum number of syllables to include
+    groups (list): groups to compare; defaults to all groups.
+    thresh (float): Alpha threshold to consider syllable significant.
+    mc_method (str): Multiple Corrections method to use.
+    equal_var (bool): t-test only; assume equal variances (Student) or not (Welch).
+    n_iters (int): z-test only; number of bootstrap samples.
+    seed (int): z-test only; random seed of the bootstrap.
+    verbose (bool): indicates whether to print out the number of significant syllables per group pair.
+    cache_dir (str): optional directory to cache the results in (see `_cached_stats_result`). z-tests are only
+     cached with a fixed seed.
+
+    Returns
+    -------
+    df_pvals (pd.DataFrame): tidy DataFrame with one row per group pair and syllable.
+     columns = ['group1', 'group2', 'syllable', 'statistic', 'pvalue', 'p_adj', 'is_sig']
+    """
+
+    test_types = ["mw", "z_test", "t_test"]
+    if test_type not in test_types:
+        raise ValueError(f"`test_type` must one of {test_types}")
+
+    group_stat = get_session_mean_df(df, statistic, max_syllable)
+    if groups is None:
+        groups = group_stat.index.get_level_values("group").unique()
+
+    if cache_dir is not None and (test_type != "z_test" or seed is not None):
+        params = {"test_type": test_type, "statistic": statistic, "max_syllable": max_syllable,
+                  "groups": list(groups), "thresh": thresh, "mc_method": mc_method, "equal_var": equal_var,
+                  "n_iters": n_iters, "seed": seed}
+        return _cached_stats_result(
+            cache_dir, "pairwise_stats", group_stat, params,
+            lambda: run_all_pairwise_stats(df, verbose=verbose, **params)
+        )
+
+    values = {k: group_stat.loc[k].values for k in groups}
+
+    if test_type == "z_test":
+        seed = as_seed_sequence(seed)
+        moments = {k: bootstrap_moments(v, n_iters=n_iters, seed=seed, stream=i)
+                   for i, (k, v) in enumerate(values.items())}
+
+    results = []
+    for group1, group2 in combinations(groups, 2):
+        if test_type == "mw":
+            stat, pvals = mann_whitney_vect(values[group1], values[group2])
+        elif test_type == "t_test":
+            stat, pvals = ttest_vect(values[group1], values[group2], equal_var=equal_var)
+        else:
+            m1, m2 = moments[group1], moments[group2]
+            stat = m1["mean"] - m2["mean"]
+            pvals = ztest_moments(m1["mean"], m1["std"], m2["mean"], m2["std"])
+
+        p_adj = multipletests(pvals, alpha=thresh, method=mc_method)[1]
+        results.append(pd.DataFrame({
+            "group1": group1,
+            "group2": group2,
+            "syllable": np.arange(len(pvals)),
+            "statistic": stat,
+            "pvalue": pvals,
+            "p_adj": p_adj,
+            "is_sig": p_adj <= thresh,
+        }))
+
+        if verbose:
+            print(f"{group1} vs {group2}: found {(p_adj <= thresh).sum()} syllables that pass threshold {thresh} "
+                  f"with {mc_method}")
+
+    return pd.concat(results, ignore_index=True)
+
+
 def get_sig_syllables(df_pvals, thresh=0.05, mc_method="fdr_bh", verbose=False):
     """
     Runs multiple p-value comparisons test given a set alpha Threshold, and multiple corrections method.
@@ -3,16 +3,21 @@
 Syllable transition graph creation and utility functions.
 
 '''
+import os
+import re
+import joblib
 import warnings
 import numpy as np
 import pandas as pd
 import networkx as nx
+import multiprocessing as mp
 from copy import deepcopy
 from tqdm.auto import tqdm
 import matplotlib.pyplot as plt
 from collections import OrderedDict
-from cytoolz import sliding_window, complement
 from matplotlib.lines import Line2D
+from scipy.sparse import csr_matrix, diags, issparse
+from moseq2_viz.util import as_seed_sequence, get_rng_blocks, draw_rng_blocks
 
 def get_trans_graph_groups(model_fit):
     '''
@@ -54,26 +59,124 @@ def get_group_trans_mats(labels, label_group, group, max_sylls, normalize='bigra
     # Importing within function to avoid import loops
     from moseq2_viz.model.util import get_syllable_statistics
 
-    trans_mats = []
+    group = list(group)
+
+    # Computing transition matrices for all groups at once
+    trans_mats = list(get_transition_tensor(labels, max_syllable=max_sylls, normalize=normalize,
+                                            groups=label_group, group_order=group, dtype='float64'))
     usages = []
 
-    # Computing transition matrices for each given group
     for plt_group in group:
-        # Get sessions to include in trans_mat
+        # Get sessions to include in usages
         use_labels = [lbl for lbl, grp in zip(labels, label_group) if grp == plt_group]
-        trans_mats.append(get_transition_matrix(use_labels,
-                                                normalize=normalize,
-                                                combine=True,
-                                                max_syllable=max_sylls))
 
         # Getting usage information for node scaling
         usages.append(get_syllable_statistics(use_labels, max_syllable=max_sylls)[0])
     return trans_mats, usages
 
-def compute_and_graph_grouped_TMs(config_data, labels, label_group, group):
+
+def bootstrap_transition_differences(labels, label_group, group, max_syllable=40, normalize='bigram',
+                                     n_bootstrap=1000, chunk_size=100, alpha=0.05, seed=0):
+    '''
+    Estimates the variability of group transition matrix differences by resampling sessions with
+    replacement. Per-session transition counts are computed once; each bootstrap draw pools the counts
+    of the resampled sessions with a matrix product, and draws are processed in chunks so memory stays
+    bounded by `chunk_size`. Each group is resampled from its own random stream of fixed seeded blocks
+    (see `moseq2_viz.util.get_rng_blocks`), so results do not depend on `chunk_size`.
+
+    Parameters
+    ----------
+    labels (list of np.ndarray): list of frame labels for each included session
+    label_group (list): list of groups for each included session
+    group (list): list of unique groups included
+    max_syllable (int): maximum number of syllables to include in transition matrix.
+    normalize (str): how to normalize the pooled transition matrices, 'bigram' or 'rows' or 'columns'
+    n_bootstrap (int): number of bootstrap draws.
+    chunk_size (int): number of bootstrap draws to process at once.
+    alpha (float): significance level used for the confidence intervals and the `significant` masks.
+    seed (int): random seed for the session resampling.
+
+    Returns
+    -------
+    differences (dict): keyed by (group_i, group_j) for every pair of groups, in the same order as
+     `make_difference_graphs`. Each value is a dict of (max_syllable, max_syllable) arrays:
+     'difference' (group_j - group_i), 'std' (bootstrap standard error), 'ci_low' and 'ci_high' (normal
+     bootstrap confidence interval), 'pvalue' (two-sided empirical p-value) and 'significant' (pvalue < alpha).
+     Bootstrap draws where the difference is undefined (e.g. a syllable missing from the resampled sessions
+     with row or column normalization) are left out of the statistics of that edge, and edges whose observed
+     difference is undefined are never significant.
+    '''
+    from scipy.stats import norm
+
+    group = list(group)
+    label_group = np.asarray(label_group)
+    counts = get_transition_tensor(labels, max_syllable=max_syllable, normalize=None, dtype='float64')
+    counts = counts.reshape(len(counts), -1)
+
+    group_counts = [counts[label_group == g] for g in group]
+    observed = [normalize_transition_matrix(c.sum(axis=0).reshape(max_syllable, max_syllable), normalize)
+                for c in group_counts]
+    pairs = [(i, j) for i in range(len(group)) for j in range(i + 1, len(group))]
+
+    # running sums over bootstrap draws for each pair of groups
+    n_edges = max_syllable ** 2
+    sums = np.zeros((len(pairs), n_edges))
+    sq_sums = np.zeros((len(pairs), n_edges))
+    n_below = np.zeros((len(pairs), n_edges))
+    n_above = np.zeros((len(pairs), n_edges))
+    n_valid = np.zeros((len(pairs), n_edges))
+
+    seed = as_seed_sequence(seed)
+    group_chunks = [get_rng_blocks(seed, n_bootstrap, chunk_size, stream=g) for g in range(len(group))]
+    for chunk_blocks in zip(*group_chunks):
+        boot_mats = []
+        for c, blocks in zip(group_counts, chunk_blocks):
+            # number of times each session is drawn in each bootstrap sample
+            draws = draw_rng_blocks(blocks, lambda rng, n: rng.integers(0, len(c), size=(n, len(c))))
+            n_draws = len(draws)
+            session_weights = np.zeros((n_draws, len(c)))
+            np.add.at(session_weights, (np.arange(n_draws)[:, None], draws), 1)
+            pooled = (session_weights @ c).reshape(n_draws, max_syllable, max_syllable)
+            boot_mats.append(normalize_transition_matrix(pooled, normalize).reshape(n_draws, n_edges))
+
+        for k, (i, j) in enumerate(pairs):
+            diff = boot_mats[j] - boot_mats[i]
+            sums[k] += np.nansum(diff, axis=0)
+            sq_sums[k] += np.nansum(diff ** 2, axis=0)
+            n_below[k] += (diff <= 0).sum(axis=0)
+            n_above[k] += (diff >= 0).sum(axis=0)
+            n_valid[k] += (~np.isnan(diff)).sum(axis=0)
+
+    z = norm.ppf(1 - alpha / 2)
+    differences = {}
+    for k, (i, j) in enumerate(pairs):
+        difference = observed[j] - observed[i]
+        undefined = np.isnan(difference) | (n_valid[k] == 0).reshape(max_syllable, max_syllable)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = sums[k] / n_valid[k]
+            std = np.sqrt(np.maximum(sq_sums[k] / n_valid[k] - mean ** 2, 0)).reshape(max_syllable, max_syllable)
+        pvalue = np.minimum(1, 2 * (np.minimum(n_below[k], n_above[k]) + 1) / (n_valid[k] + 1))
+        pvalue = pvalue.reshape(max_syllable, max_syllable)
+        std[undefined] = np.nan
+        pvalue[undefined] = np.nan
+        differences[(group[i], group[j])] = {
+            'difference': difference,
+            'std': std,
+            'ci_low': difference - z * std,
+            'ci_high': difference + z * std,
+            'pvalue': pvalue,
+            'significant': ~undefined & (pvalue < alpha),
+        }
+
+    return differences
+
+
+def compute_and_graph_grouped_TMs(config_data, labels, label_group, group, output_file=None):
     '''
     Convenience function to compute a transition matrix for each given group.
     Function will also graph the computed transition matrices, then return the open figure object to be saved.
+    If config_data['separate_figures'] is set, each graph is also rendered to its own file in parallel
+    (see `write_transition_graphs`).
 
     Parameters
     ----------
@@ -81,10 +184,12 @@ def compute_and_graph_grouped_TMs(config_data, labels, label_group, group):
     labels (list): list of 1D numpy arrays containing syllable labels per frame for every included session
     label_group (list): list of corresponding group names to plot transition aggregated transition plots
     group (list): unique list of groups to plot.
+    output_file (str): path prefix for the separate graph figures.
 
     Returns
     -------
-    plt (pyplot.Figure): open transition graph figure to save
+    plt (pyplot.Figure): open transition graph figure to save, or None if config_data['skip_summary'] is set
+     and the graphs were rendered to separate figures.
     '''
 
     trans_mats, usages = get_group_trans_mats(labels, label_group, sorted(group), config_data['max_syllable'], config_data['normalize'])
@@ -93,12 +198,34 @@ def compute_and_graph_grouped_TMs(config_data, labels, label_group, group):
     if not config_data['scale_node_by_usage']:
         usages = None
 
+    # Optionally only draw difference edges that are significant across bootstrapped sessions
+    difference_edge_filter = None
+    if config_data.get('n_bootstrap', 0) > 0 and len(group) > 1:
+        print('Bootstrapping transition differences...')
+        differences = bootstrap_transition_differences(labels, label_group, sorted(group),
+                                                       max_syllable=config_data['max_syllable'],
+                                                       normalize=config_data['normalize'],
+                                                       n_bootstrap=config_data['n_bootstrap'],
+                                                       alpha=config_data.get('bootstrap_alpha', 0.05))
+        difference_edge_filter = {k: v['significant'] for k, v in differences.items()}
+
+    if config_data.get('separate_figures', False) and output_file is not None:
+        print('Rendering separate graph figures...')
+        write_transition_graphs(trans_mats, output_file,
+                                **config_data,
+                                usages=usages,
+                                groups=sorted(group),
+                                difference_edge_filter=difference_edge_filter)
+        if config_data.get('skip_summary', False):
+            return None
+
     print('Creating plot...')
     plt, _, _ = graph_transition_matrix(trans_mats,
                                         **config_data,
                                         usages=usages,
                                         groups=sorted(group),
-                                        headless=True)
+                                        headless=True,
+                                        difference_edge_filter=difference_edge_filter)
     # manually add legend for the difference graph
     if len(group) >1:
         legend_elements = [Line2D([0], [0], color='r', lw=2, label= f'Up-regulated transistion'),
@@ -139,30 +266,66 @@ def normalize_transition_matrix(init_matrix, normalize):
 
     Parameters
     ----------
-    init_matrix (2D np.array): transition matrix to normalize.
+    init_matrix (np.array or scipy.sparse matrix): transition matrix to normalize, or a stack of transition
+     matrices with shape (..., n_syllables, n_syllables); each matrix in the stack is normalized separately.
     normalize (str): normalization criteria; ['bigram', 'rows', 'columns', or None]
 
     Returns
     -------
-    init_matrix (2D np.array): normalized transition matrix
+    init_matrix (np.array): normalized transition matrix
     '''
     if normalize is None or normalize not in ('bigram', 'rows', 'columns'):
         return init_matrix
 
+    if issparse(init_matrix):
+        return _normalize_sparse_transition_matrix(init_matrix, normalize)
+
     with warnings.catch_warnings():
         warnings.filterwarnings('ignore')
 
         if normalize == 'bigram':
-            init_matrix /= init_matrix.sum()
+            if init_matrix.ndim > 2:
+                init_matrix /= init_matrix.sum(axis=(-2, -1), keepdims=True)
+            else:
+                init_matrix /= init_matrix.sum()
         elif normalize == 'rows':
-            init_matrix /= init_matrix.sum(axis=1, keepdims=True)
+            init_matrix /= init_matrix.sum(axis=-1, keepdims=True)
         elif normalize == 'columns':
-            init_matrix /= init_matrix.sum(axis=0, keepdims=True)
+            init_matrix /= init_matrix.sum(axis=-2, keepdims=True)
 
     return init_matrix
 
 
-def n_gram_transition_matrix(labels, n=2, max_label=99):
+def _normalize_sparse_transition_matrix(init_matrix, normalize):
+    '''
+    Normalizes a sparse transition matrix without densifying it. Rows (or columns) without any
+    transitions stay zero instead of becoming NaN.
+
+    Parameters
+    ----------
+    init_matrix (scipy.sparse matrix): transition count matrix to normalize.
+    normalize (str): normalization criteria; ['bigram', 'rows', 'columns']
+
+    Returns
+    -------
+    norm_matrix (scipy.sparse.csr_matrix): normalized transition matrix
+    '''
+
+    init_matrix = csr_matrix(init_matrix, dtype='float')
+
+    if normalize == 'bigram':
+        return init_matrix / init_matrix.sum()
+
+    axis = 1 if normalize == 'rows' else 0
+    totals = np.asarray(init_matrix.sum(axis=axis)).ravel()
+    scale = np.divide(1, totals, out=np.zeros_like(totals), where=totals > 0)
+
+    if normalize == 'rows':
+        return csr_matrix(diags(scale) @ init_matrix)
+    return csr_matrix(init_matrix @ diags(scale))
+
+
+def n_gram_transition_matrix(labels, n=2, max_label=99, sparse=False):
     '''
     Computes the transition count for a fixed syllable sequence length 'n'. For n=2, the outputted transition counts
      will represent the number of bigram transition from syllable x->y.
@@ -172,23 +335,38 @@ def n_gram_transition_matrix(labels, n=2, max_label=99):
     labels (list of np.array of ints): labels loaded from a model fit.
     n (int): length of transition chain to compute transition probability for.
     max_label (int): max number of syllables to scan for in transition matrix.
+    sparse (bool): if True, return a sparse matrix with shape (max_label ** (n - 1), max_label), where
+     each row is an (n - 1)-syllable prefix (in C order) and each column the syllable that follows it.
 
     Returns
     -------
-    trans_mat (np.ndarray): array of n-transition counts for given max_label.
+    trans_mat (np.ndarray or scipy.sparse.csr_matrix): array of n-transition counts for given max_label.
     '''
 
-    trans_mat = np.zeros((max_label, ) * n, dtype='float')
-    for loc in sliding_window(n, labels):
-        if any(l >= max_label for l in loc):
-            continue
-        trans_mat[loc] += 1
-    return trans_mat
+    labels = np.asarray(labels)
+    n_windows = max(len(labels) - n + 1, 0)
+
+    # column i holds the i-th label of every length-n window
+    windows = np.stack([labels[i:i + n_windows] for i in range(n)], axis=1).astype('int64')
+    # skip windows containing labels outside of [0, max_label)
+    in_range = np.all((windows >= 0) & (windows < max_label), axis=1)
+
+    flat_idx = np.ravel_multi_index(tuple(windows[in_range].T), (max_label, ) * n)
+
+    if sparse:
+        flat_idx, counts = np.unique(flat_idx, return_counts=True)
+        prefix, last = np.divmod(flat_idx, max_label)
+        return csr_matrix((counts.astype('float'), (prefix, last)), shape=(max_label ** (n - 1), max_label))
+
+    trans_mat = np.bincount(flat_idx, minlength=max_label ** n).astype('float')
+
+    return trans_mat.reshape((max_label, ) * n)
 
 
 # per https://gist.github.com/tg12/d7efa579ceee4afbeaec97eb442a6b72
 def get_transition_matrix(labels, max_syllable=100, normalize='bigram',
-                          smoothing=0.0, combine=False, disable_output=False) -> list:
+                          smoothing=0.0, combine=False, disable_output=False, as_tensor=False,
+                          n=2, sparse=None) -> list:
     '''
     Compute the transition matrix from a set of model labels.
 
@@ -201,6 +379,12 @@ def get_transition_matrix(labels, max_syllable=100, normalize='bigram',
     combine (bool): compute a separate transition matrix for each element (False)
      or combine across all arrays in the list (True)
     disable_output (bool): if True, displays a TQDM progress bar for transition matrix computation process.
+    as_tensor (bool): if True and combine is False, return the per-session matrices as a single
+     float32 array with shape (n_sessions, max_syllable, max_syllable) (see `get_transition_tensor`).
+     Only used for dense bigram matrices.
+    n (int): length of the syllable sequences to count, e.g. 3 for trigram transitions.
+    sparse (bool): return scipy.sparse matrices with shape (max_syllable ** (n - 1), max_syllable)
+     (see `n_gram_transition_matrix`). Defaults to True for n > 2, so dense arrays are opt-in.
 
     Returns
     -------
@@ -211,6 +395,21 @@ def get_transition_matrix(labels, max_syllable=100, normalize='bigram',
     if not isinstance(labels[0], (list, np.ndarray, pd.Series)):
         labels = [labels]
 
+    if sparse is None:
+        sparse = n > 2
+    if sparse and smoothing != 0:
+        raise ValueError('smoothing is not supported for sparse transition matrices')
+
+    if as_tensor and not combine and n == 2 and not sparse:
+        return get_transition_tensor(labels, max_syllable=max_syllable, normalize=normalize, smoothing=smoothing)
+
+    def _normalize(trans_mat):
+        if n > 2 and not sparse:
+            # normalize the dense n-gram array as (prefix, next syllable) matrix; the reshape is a view
+            normalize_transition_matrix(trans_mat.reshape(-1, max_syllable), normalize)
+            return trans_mat
+        return normalize_transition_matrix(trans_mat, normalize)
+
     # Compute a singular transition matrix
     if combine:
         init_matrix = []
@@ -219,11 +418,14 @@ def get_transition_matrix(labels, max_syllable=100, normalize='bigram',
             # Get syllable transitions
             transitions = get_transitions(v)[0]
 
-            trans_mat = n_gram_transition_matrix(transitions, n=2, max_label=max_syllable)
+            trans_mat = n_gram_transition_matrix(transitions, n=n, max_label=max_syllable, sparse=sparse)
             init_matrix.append(trans_mat)
 
-        init_matrix = np.sum(init_matrix, axis=0) + smoothing
-        all_mats = normalize_transition_matrix(init_matrix, normalize)
+        if sparse:
+            init_matrix = sum(init_matrix[1:], init_matrix[0])
+        else:
+            init_matrix = np.sum(init_matrix, axis=0) + smoothing
+        all_mats = _normalize(init_matrix)
     else:
         # Compute a transition matrix for each session label list
         all_mats = []
@@ -231,15 +433,73 @@ def get_transition_matrix(labels, max_syllable=100, normalize='bigram',
             # Get syllable transitions
             transitions = get_transitions(v)[0]
 
-            trans_mat = n_gram_transition_matrix(transitions, n=2, max_label=max_syllable) + smoothing
+            trans_mat = n_gram_transition_matrix(transitions, n=n, max_label=max_syllable, sparse=sparse)
+            if not sparse:
+                trans_mat = trans_mat + smoothing
 
             # Normalize matrix
-            init_matrix = normalize_transition_matrix(trans_mat, normalize)
+            init_matrix = _normalize(trans_mat)
             all_mats.append(init_matrix)
 
     return all_mats
 
 
+def get_transition_tensor(labels, max_syllable=100, normalize='bigram', smoothing=0.0,
+                          groups=None, group_order=None, dtype='float32'):
+    '''
+    Compute the bigram transition matrices of many sessions at once. The transitions of all sessions
+    are concatenated and counted in a single pass, keyed by session (or group) offset.
+
+    Parameters
+    ----------
+    labels (list of np.array of ints): labels loaded from a model fit
+    max_syllable (int): maximum syllable number to consider
+    normalize (str): how to normalize each transition matrix, 'bigram' or 'rows' or 'columns'
+    smoothing (float): constant to add to each transition matrix pre-normalization to smooth counts
+    groups (list or np.ndarray): optional group label of each session. If given, transition counts are
+     summed within each group before smoothing and normalization.
+    group_order (list): order of the groups in the output tensor. Defaults to the sorted unique groups.
+    dtype (str): data type of the output tensor.
+
+    Returns
+    -------
+    trans_tensor (np.ndarray): transition matrices with shape (n_sessions, max_syllable, max_syllable),
+     or (n_groups, max_syllable, max_syllable) if groups are given.
+    '''
+    if not isinstance(labels[0], (list, np.ndarray, pd.Series)):
+        labels = [labels]
+
+    transitions = [get_transitions(np.asarray(v))[0] for v in labels]
+    lengths = np.array([len(t) for t in transitions])
+
+    if groups is not None:
+        if group_order is None:
+            group_order = np.unique(groups)
+        group_index = {g: i for i, g in enumerate(group_order)}
+        # sessions whose group is not in group_order are left out
+        offsets = np.array([group_index.get(g, -1) for g in groups], dtype='int64')
+        n_mats = len(group_order)
+    else:
+        offsets = np.arange(len(labels), dtype='int64')
+        n_mats = len(labels)
+
+    transitions = np.concatenate(transitions).astype('int64') if len(transitions) > 0 else np.zeros(0, 'int64')
+    offsets = np.repeat(offsets, lengths)
+
+    # consecutive transitions form a bigram only within the same session
+    same_session = np.repeat(np.arange(len(lengths)), lengths)
+    same_session = same_session[1:] == same_session[:-1]
+    src, dst, offsets = transitions[:-1], transitions[1:], offsets[:-1]
+    valid = (same_session & (offsets >= 0) & (src >= 0) & (src < max_syllable)
+             & (dst >= 0) & (dst < max_syllable))
+
+    flat_idx = np.ravel_multi_index((offsets[valid], src[valid], dst[valid]), (n_mats, max_syllable, max_syllable))
+    counts = np.bincount(flat_idx, minlength=n_mats * max_syllable ** 2)
+
+    trans_tensor = counts.reshape(n_mats, max_syllable, max_syllable).astype(dtype) + smoothing
+    return normalize_transition_matrix(trans_tensor, normalize)
+
+
 def convert_ebunch_to_graph(ebunch):
     '''
     Convert transition matrices to transition DAGs.
@@ -270,7 +530,7 @@ def convert_transition_matrix_to_ebunch(weights, transition_matrix,
 
     Parameters
     ----------
-    weights (np.ndarray): syllable transition edge weights
+    weights (np.ndarray or scipy.sparse matrix): syllable transition edge weights
     transition_matrix (np.ndarray): syllable transition matrix
     usages (list): list of syllable usages
     usage_threshold (float): threshold syllable usage to include a syllable in list of orphans
@@ -292,40 +552,59 @@ def convert_transition_matrix_to_ebunch(weights, transition_matrix,
         weights = weights[:max_syllable, :max_syllable]
         transition_matrix = transition_matrix[:max_syllable, :max_syllable]
 
-    def _filter_ebunch(arg):
-        _, _, w = arg
-        w = abs(w)
-        if isinstance(edge_threshold, (list, tuple)):
-            return (w > edge_threshold[0]) and (w < edge_threshold[1])
-        return w > edge_threshold
+    # bigram graphs are small; edges are enumerated from the dense matrix
+    if issparse(weights):
+        weights = weights.toarray()
 
-    orphans = []
+    weights = np.asarray(weights)
+
+    def _edge_list(mask):
+        # (u, v, w) triples in row-major order, like np.ndenumerate
+        rows, cols = np.nonzero(mask)
+        return list(zip(rows.tolist(), cols.tolist(), weights[rows, cols]))
 
-    # u, v, w where w is the weights
-    ebunch = list(filter(_filter_ebunch, ((*inds, w) for inds, w in np.ndenumerate(weights))))
+    abs_weights = np.abs(weights)
+    if isinstance(edge_threshold, (list, tuple)):
+        is_edge = (abs_weights > edge_threshold[0]) & (abs_weights < edge_threshold[1])
+    else:
+        is_edge = abs_weights > edge_threshold
+
+    orphans = []
     if keep_orphans:
-        orphans = list(filter(complement(_filter_ebunch), ((*inds, w) for inds, w in np.ndenumerate(weights))))
+        orphans = _edge_list(~is_edge)
 
     if indices is not None:
+        in_indices = np.zeros(weights.shape, dtype='bool')
+        for u, v in indices:
+            if 0 <= u < weights.shape[0] and 0 <= v < weights.shape[1]:
+                in_indices[u, v] = True
         if keep_orphans:
-            orphans += list(filter(lambda e: e[:-1] not in indices, ebunch))
-        ebunch = list(filter(lambda e: e[:-1] in indices, ebunch))
+            orphans += _edge_list(is_edge & ~in_indices)
+        is_edge &= in_indices
 
-    def _filter_by_stat(arg, stat, stat_threshold):
+    def _filter_by_stat(stat, stat_threshold):
         from math import ceil, floor
-        _in, _out, _ = arg
-        _in = stat[_in]
-        _out = stat[_out]
-        if isinstance(stat_threshold, (list, tuple)):
-            # round down the lower bound and round up the upper bound to 1000th decimal
-            return ((_in > floor(stat_threshold[0]*1000)/1000. and _in <= ceil(stat_threshold[1]*1000)/1000.)
-                    and (_out >= floor(stat_threshold[0]*1000)/1000. and _out <= ceil(stat_threshold[1]*1000)/1000.))
-        return _in > stat_threshold and _out > stat_threshold
+        # look up the stat of every node that is still part of an edge
+        rows, cols = np.nonzero(is_edge)
+        nodes = np.union1d(rows, cols)
+        node_stat = np.full(max(weights.shape), np.nan)
+        node_stat[nodes] = [stat[n] for n in nodes.tolist()]
+        _in = node_stat[:weights.shape[0], None]
+        _out = node_stat[None, :weights.shape[1]]
+        with np.errstate(invalid='ignore'):
+            if isinstance(stat_threshold, (list, tuple)):
+                # round down the lower bound and round up the upper bound to 1000th decimal
+                lower = floor(stat_threshold[0] * 1000) / 1000.
+                upper = ceil(stat_threshold[1] * 1000) / 1000.
+                return ((_in > lower) & (_in <= upper)) & ((_out >= lower) & (_out <= upper))
+            return (_in > stat_threshold) & (_out > stat_threshold)
 
     if usages is not None:
-        ebunch = list(filter(lambda e: _filter_by_stat(e, usages, usage_threshold), ebunch))
+        is_edge &= _filter_by_stat(usages, usage_threshold)
     if speeds is not None:
-        ebunch = list(filter(lambda e: _filter_by_stat(e, speeds, speed_threshold), ebunch))
+        is_edge &= _filter_by_stat(speeds, speed_threshold)
+
+    ebunch = _edge_list(is_edge)
 
     return ebunch, [o[:-1] for o in orphans]
 
@@ -333,13 +612,14 @@ def convert_transition_matrix_to_ebunch(weights, transition_matrix,
 def make_difference_graphs(trans_mats, usages, group, group_names, usage_kwargs,
                            widths, pos, node_edge_colors, ax=None, node_sizes=[], indices=None,
                            difference_threshold=0.0005, difference_edge_width_scale=500, font_size=12,
-                           usage_scale=5e4, difference_graphs=[], scalars=None, arrows=False, speed_kwargs={}):
+                           usage_scale=5e4, difference_graphs=[], scalars=None, arrows=False, speed_kwargs={},
+                           edge_filter=None):
     '''
     Helper function that computes transition graph differences.
 
     Parameters
     ----------
-    trans_mats (np.ndarray): syllable transition matrix.
+    trans_mats (list): syllable transition matrices (np.ndarray or scipy.sparse matrices).
     usages (list): list of syllable usage probabilities.
     group (list): list groups to graph transition graphs for.
     group_names (list): list groups names to display with transition graphs.
@@ -358,6 +638,8 @@ def make_difference_graphs(trans_mats, usages, group, group_names, usage_kwargs,
     scalars (dict): dict of syllable scalar data per transition graph
     arrows (bool): indicates whether to display arrows between node transitions
     speed_kwargs (dict): kwargs for graph threshold settings using usage. Keys can be 'speeds', and 'speed_threshold'
+    edge_filter (dict): optional boolean edge masks keyed by (group_i, group_j), e.g. the 'significant' masks
+     returned by `bootstrap_transition_differences`. Edges outside the mask are dropped from the difference graph.
 
     Returns
     -------
@@ -371,15 +653,20 @@ def make_difference_graphs(trans_mats, usages, group, group_names, usage_kwargs,
 
     for i, tm in enumerate(trans_mats):
         for j, tm2 in enumerate(trans_mats[i + 1:]):
-            if len(tm2) == 0:
+            if (tm2.shape[0] if issparse(tm2) else len(tm2)) == 0:
                 continue
             # get graph difference
             df = tm2 - tm
 
+            # only keep edges passing the provided filter (e.g. bootstrap significance)
+            if edge_filter is not None and (group[i], group[i + j + 1]) in edge_filter:
+                mask = edge_filter[(group[i], group[i + j + 1])]
+                df = csr_matrix(df.multiply(mask)) if issparse(df) else np.where(mask, df, 0)
+
             if isinstance(scalars, dict):
                 for key, _scalar_list in scalars.items():
                     if len(_scalar_list) > 0:
-                        df_scalar = {k: _scalar_list[j + i + 1][k] - _scalar_list[i][k] for k in range(len(df))}
+                        df_scalar = {k: _scalar_list[j + i + 1][k] - _scalar_list[i][k] for k in range(df.shape[0])}
                         scalars[key].append(df_scalar)
 
             # make difference graph
@@ -401,7 +688,7 @@ def make_difference_graphs(trans_mats, usages, group, group_names, usage_kwargs,
             # Handle node size and coloring
             if usages is not None:
                 # get usage difference
-                df_usage = {k: usages[j + i + 1][k] - usages[i][k] for k in range(len(df))}
+                df_usage = {k: usages[j + i + 1][k] - usages[i][k] for k in range(df.shape[0])}
                 usages.append(df_usage)
 
                 # get node sizes and colors based on usage differences
@@ -434,7 +721,7 @@ def make_transition_graphs(trans_mats, usages, group, group_names, usage_kwargs,
                            difference_threshold=.0005, orphan_weight=0,
                            ax=None, edge_width_scale=100, usage_scale=1e5,
                            difference_edge_width_scale=500, speed_kwargs={},
-                           indices=None, font_size=12, scalars=None, arrows=False):
+                           indices=None, font_size=12, scalars=None, arrows=False, edge_filter=None):
     '''
 
     Helper function to create transition matrices for all included groups, as well as their
@@ -461,6 +748,7 @@ def make_transition_graphs(trans_mats, usages, group, group_names, usage_kwargs,
     font_size (int): indicates the size of the numbers drawn on the transition graph nodes.
     scalars (dict): dict of syllable scalar data per transition graph
     arrows (bool): indicates whether to display arrows between node transitions
+    edge_filter (dict): optional boolean edge masks for the difference graphs keyed by (group_i, group_j).
 
     Returns
     -------
@@ -524,41 +812,77 @@ def make_transition_graphs(trans_mats, usages, group, group_names, usage_kwargs,
             indices=indices, 
             font_size=font_size,
             usage_kwargs=usage_kwargs,
-            speed_kwargs=speed_kwargs)
+            speed_kwargs=speed_kwargs,
+            edge_filter=edge_filter)
 
     return usages, group_names, widths, node_sizes, node_edge_colors, graphs, scalars
 
 
-def get_pos(graph_anchor, layout, nnodes):
+# node layouts computed by get_pos, keyed by (sorted nodes, layout, seed, nnodes)
+_LAYOUT_CACHE = {}
+
+
+def clear_layout_cache():
+    '''
+    Empties the in-memory cache of node layouts used by `get_pos`.
+
+    Returns
+    -------
+    '''
+
+    _LAYOUT_CACHE.clear()
+
+
+def get_pos(graph_anchor, layout, nnodes, seed=0, cache_file=None):
     '''
     Get node positions in the graph based on the graph anchor
-    and a user selected layout.
+    and a user selected layout. Computed layouts are cached in memory, keyed by the sorted node set,
+    layout algorithm and seed, so re-rendering the same graph reuses the same node positions.
 
     Parameters
     ----------
     graph_anchor (nx.Digraph): graph to get node layout for
     layout (str): layout type; ['spring', 'circular', 'spectral', 'graphviz']
     nnodes (int): number of nodes in the graph
+    seed (int): random seed for the spring layout.
+    cache_file (str): optional path to a file to persist the layout cache to, so that it can be
+     reused across sessions.
 
     Returns
     -------
     pos (nx layout): computed node position layout
     '''
 
-    if isinstance(layout, str) and layout.lower() == 'spring':
-        k = 1.5 / np.sqrt(nnodes)
-        pos = nx.spring_layout(sorted(graph_anchor.nodes()), k=k, seed=0)
-    elif isinstance(layout, str) and layout.lower() == 'circular':
-        pos = nx.circular_layout(sorted(graph_anchor.nodes()))
-    elif isinstance(layout, str) and layout.lower() == 'spectral':
-        pos = nx.spectral_layout(sorted(graph_anchor.nodes()))
-    elif isinstance(layout, (dict, OrderedDict)):
+    if isinstance(layout, (dict, OrderedDict)):
         # user passed pos directly
-        pos = layout
-    else:
+        return layout
+
+    if not isinstance(layout, str) or layout.lower() not in ('spring', 'circular', 'spectral'):
         raise RuntimeError('Did not understand layout type')
 
-    return pos
+    nodes = sorted(graph_anchor.nodes())
+    key = (tuple(nodes), layout.lower(), seed, nnodes)
+
+    if key not in _LAYOUT_CACHE and cache_file is not None and os.path.exists(cache_file):
+        _LAYOUT_CACHE.update(joblib.load(cache_file))
+
+    if key not in _LAYOUT_CACHE:
+        if layout.lower() == 'spring':
+            k = 1.5 / np.sqrt(nnodes)
+            pos = nx.spring_layout(nodes, k=k, seed=seed)
+        elif layout.lower() == 'circular':
+            pos = nx.circular_layout(nodes)
+        elif layout.lower() == 'spectral':
+            pos = nx.spectral_layout(nodes)
+        _LAYOUT_CACHE[key] = pos
+
+        if cache_file is not None:
+            saved = joblib.load(cache_file) if os.path.exists(cache_file) else {}
+            saved[key] = pos
+            joblib.dump(saved, cache_file)
+
+    # copy so callers can't modify the cached layout
+    return {node: np.array(xy) for node, xy in _LAYOUT_CACHE[key].items()}
 
 
 def draw_graph(graph, width, pos, node_color,
@@ -605,51 +929,37 @@ def draw_graph(graph, width, pos, node_color,
     ax.set_title(title)
 
 
-def graph_transition_matrix(trans_mats, usages=None, groups=None,
-                            edge_threshold=.0025, anchor=0, usage_threshold=0,
-                            layout='spring', edge_width_scale=100, fig=None, ax=None,
-                            width_per_group=8, headless=False, difference_threshold=.0005,
-                            weights=None, usage_scale=1e4, keep_orphans=False,
-                            max_syllable=None, orphan_weight=0, arrows=False, font_size=12,
-                            difference_edge_width_scale=500, **kwargs):
+def _layout_transition_graphs(trans_mats, usages, weights, anchor, edge_threshold=.0025, usage_threshold=0,
+                              keep_orphans=False, max_syllable=None, layout='spring', layout_seed=0,
+                              layout_cache_file=None):
     '''
-    Creates transition graph plot given a transition matrix and some metadata.
+    Helper function that builds the anchor graph shared by all transition graphs and computes its node layout.
 
     Parameters
     ----------
-    trans_mats (np.ndarray): syllable transition matrix
+    trans_mats (np.ndarray or list): syllable transition matrix or list of transition matrices.
     usages (list): list of syllable usage probabilities
-    groups (list): list groups to graph transition graphs for.
-    edge_threshold (float): threshold to include edge in graph
+    weights (list): list of edge weights; defaults to the transition matrices.
     anchor (int): syllable index as the base syllable
+    edge_threshold (float): threshold to include edge in graph
     usage_threshold (int): threshold to include syllable usages
-    layout (str): layout format
-    edge_width_scale (int): edge line width scaling factor
-    fig (pyplot figure): figure to plot to
-    ax (pyplot Axes): axes object
-    width_per_group (int): graph width scaling factor per group
-    headless (bool): exclude first node.
-    difference_threshold (float): threshold to consider 2 graph elements different
-    weights (list): list of edge weights
-    usage_scale (float): syllable usage scaling factor
     keep_orphans (bool): plot orphans.
     max_syllable (int): number of syllables (nodes) to plot
-    orphan_weight (int): scaling factor to plot orphan node sizes
-    arrows (bool): indicate whether to plot arrows as transitions.
-    difference_edge_width_scale (float): difference graph edge line width scaling factor
-    kwargs (dict): extra keyword arguments
+    layout (str): layout format
+    layout_seed (int): random seed for the spring layout.
+    layout_cache_file (str): optional path to persist computed node layouts to (see `get_pos`).
 
     Returns
     -------
-    fig (pyplot figure): figure containing transition graphs.
-    ax (pyplot axis): figure axis object.
-    pos (dict): dict figure information.
+    trans_mats (list): list of transition matrices.
+    usages (list): normalized copies of the syllable usages (or None).
+    usages_anchor (dict): usages of the anchor graph (or None).
+    ebunch_anchor (list): edges of the anchor graph.
+    orphans (list): orphaned edges of the anchor graph.
+    pos (dict): node positions.
     '''
     from moseq2_viz.model.util import normalize_usages
 
-    if headless:
-        plt.switch_backend('agg')
-
     if usages is not None:
         usages = deepcopy(usages)
 
@@ -666,7 +976,6 @@ def graph_transition_matrix(trans_mats, usages=None, groups=None,
         trans_mats = [trans_mats]
 
     # Get shared node anchors based on usages
-    ngraphs = len(trans_mats)
     if usages is not None:
         usages = [normalize_usages(u) for u in usages]
     anchor = anchor if anchor < len(trans_mats) else 0
@@ -686,7 +995,63 @@ def graph_transition_matrix(trans_mats, usages=None, groups=None,
     nnodes = len(graph_anchor.nodes())
 
     # Get node position layout
-    pos = get_pos(graph_anchor, layout, nnodes)
+    pos = get_pos(graph_anchor, layout, nnodes, seed=layout_seed, cache_file=layout_cache_file)
+
+    return trans_mats, usages, usages_anchor, ebunch_anchor, orphans, pos
+
+
+def graph_transition_matrix(trans_mats, usages=None, groups=None,
+                            edge_threshold=.0025, anchor=0, usage_threshold=0,
+                            layout='spring', edge_width_scale=100, fig=None, ax=None,
+                            width_per_group=8, headless=False, difference_threshold=.0005,
+                            weights=None, usage_scale=1e4, keep_orphans=False,
+                            max_syllable=None, orphan_weight=0, arrows=False, font_size=12,
+                            difference_edge_width_scale=500, layout_seed=0, layout_cache_file=None,
+                            difference_edge_filter=None, **kwargs):
+    '''
+    Creates transition graph plot given a transition matrix and some metadata.
+
+    Parameters
+    ----------
+    trans_mats (np.ndarray): syllable transition matrix
+    usages (list): list of syllable usage probabilities
+    groups (list): list groups to graph transition graphs for.
+    edge_threshold (float): threshold to include edge in graph
+    anchor (int): syllable index as the base syllable
+    usage_threshold (int): threshold to include syllable usages
+    layout (str): layout format
+    edge_width_scale (int): edge line width scaling factor
+    fig (pyplot figure): figure to plot to
+    ax (pyplot Axes): axes object
+    width_per_group (int): graph width scaling factor per group
+    headless (bool): exclude first node.
+    difference_threshold (float): threshold to consider 2 graph elements different
+    weights (list): list of edge weights
+    usage_scale (float): syllable usage scaling factor
+    keep_orphans (bool): plot orphans.
+    max_syllable (int): number of syllables (nodes) to plot
+    orphan_weight (int): scaling factor to plot orphan node sizes
+    arrows (bool): indicate whether to plot arrows as transitions.
+    difference_edge_width_scale (float): difference graph edge line width scaling factor
+    layout_seed (int): random seed for the spring layout.
+    layout_cache_file (str): optional path to persist computed node layouts to (see `get_pos`).
+    difference_edge_filter (dict): optional boolean edge masks for the difference graphs keyed by (group_i, group_j).
+    kwargs (dict): extra keyword arguments
+
+    Returns
+    -------
+    fig (pyplot figure): figure containing transition graphs.
+    ax (pyplot axis): figure axis object.
+    pos (dict): dict figure information.
+    '''
+    if headless:
+        plt.switch_backend('agg')
+
+    trans_mats, usages, usages_anchor, ebunch_anchor, orphans, pos = _layout_transition_graphs(
+        trans_mats, usages, weights, anchor, edge_threshold=edge_threshold, usage_threshold=usage_threshold,
+        keep_orphans=keep_orphans, max_syllable=max_syllable, layout=layout, layout_seed=layout_seed,
+        layout_cache_file=layout_cache_file)
+    ngraphs = len(trans_mats)
 
     # Create figure to plot
     if fig is None or ax is None:
@@ -711,9 +1076,137 @@ def graph_transition_matrix(trans_mats, usages=None, groups=None,
         difference_edge_width_scale=difference_edge_width_scale,
         difference_threshold=difference_threshold, orphan_weight=orphan_weight,
         ax=ax, edge_width_scale=edge_width_scale, usage_scale=usage_scale,
-        arrows=arrows, font_size=font_size)
+        arrows=arrows, font_size=font_size, edge_filter=difference_edge_filter)
 
     for a in np.array(ax).flat:
         a.axis('off')
 
-    return fig, ax, pos
\ No newline at end of file
+    return fig, ax, pos
+
+
+def _write_graph_figure(graph_kwargs, output_file, figsize=(8, 8)):
+    '''
+    Helper function to draw a single transition graph to its own figure and save it; used by the process pool
+     in `write_transition_graphs`.
+
+    Parameters
+    ----------
+    graph_kwargs (dict): keyword arguments passed to `draw_graph` (without the axis).
+    output_file (str): path to save the figure to (without extension).
+    figsize (tuple): size of the figure in inches.
+
+    Returns
+    -------
+    output_file (str): path the figure was saved to (without extension).
+    '''
+    from moseq2_viz.viz import save_fig
+
+    plt.switch_backend('agg')
+    fig, ax = plt.subplots(1, 1, figsize=figsize)
+    draw_graph(ax=ax, **graph_kwargs)
+    ax.axis('off')
+    save_fig(fig, output_file)
+    plt.close(fig)
+
+    return output_file
+
+
+def write_transition_graphs(trans_mats, output_file, usages=None, groups=None, edge_threshold=.0025, anchor=0,
+                            usage_threshold=0, layout='spring', edge_width_scale=100, width_per_group=8,
+                            difference_threshold=.0005, weights=None, usage_scale=1e4, keep_orphans=False,
+                            max_syllable=None, orphan_weight=0, arrows=False, font_size=12,
+                            difference_edge_width_scale=500, layout_seed=0, layout_cache_file=None,
+                            difference_edge_filter=None, processes=None, summary=False, **kwargs):
+    '''
+    Renders each group transition graph and each pairwise difference graph to its own file. The node layout
+     and graphs are computed once, then the figures are drawn in a process pool, so rendering scales with
+     the number of processes rather than with the number of graphs. Graphs are drawn exactly as in
+     `graph_transition_matrix`, which can optionally still be used to save the combined summary figure.
+
+    Parameters
+    ----------
+    trans_mats (np.ndarray or list): syllable transition matrix or list of transition matrices (one per group).
+    output_file (str): path prefix of the saved figures (without extension). Each graph is saved to
+     `{output_file}_{graph name}` and the summary figure to `output_file`.
+    usages (list): list of syllable usage probabilities
+    groups (list): list groups to graph transition graphs for.
+    edge_threshold (float): threshold to include edge in graph
+    anchor (int): syllable index as the base syllable
+    usage_threshold (int): threshold to include syllable usages
+    layout (str): layout format
+    edge_width_scale (int): edge line width scaling factor
+    width_per_group (int): width (in inches) of each graph figure
+    difference_threshold (float): threshold to consider 2 graph elements different
+    weights (list): list of edge weights
+    usage_scale (float): syllable usage scaling factor
+    keep_orphans (bool): plot orphans.
+    max_syllable (int): number of syllables (nodes) to plot
+    orphan_weight (int): scaling factor to plot orphan node sizes
+    arrows (bool): indicate whether to plot arrows as transitions.
+    font_size (int): Node label font size
+    difference_edge_width_scale (float): difference graph edge line width scaling factor
+    layout_seed (int): random seed for the spring layout.
+    layout_cache_file (str): optional path to persist computed node layouts to (see `get_pos`).
+    difference_edge_filter (dict): optional boolean edge masks for the difference graphs keyed by (group_i, group_j).
+    processes (int): number of processes used to render the figures. Defaults to the number of cores.
+    summary (bool): also save the combined figure with all graphs (see `graph_transition_matrix`).
+    kwargs (dict): extra keyword arguments
+
+    Returns
+    -------
+    output_files (list): paths (without extension) of the saved graph figures, followed by the summary figure
+     if `summary` is True.
+    '''
+
+    trans_mats, graph_usages, usages_anchor, ebunch_anchor, orphans, pos = _layout_transition_graphs(
+        trans_mats, usages, weights, anchor, edge_threshold=edge_threshold, usage_threshold=usage_threshold,
+        keep_orphans=keep_orphans, max_syllable=max_syllable, layout=layout, layout_seed=layout_seed,
+        layout_cache_file=layout_cache_file)
+
+    if isinstance(groups, str):
+        groups = [groups]
+    group_names = deepcopy(groups)
+
+    # compute all graphs without drawing them
+    _, group_names, widths, node_sizes, node_edge_colors, graphs, _ = make_transition_graphs(
+        trans_mats, graph_usages, groups, group_names,
+        pos=pos, orphans=orphans, indices=[e[:-1] for e in ebunch_anchor],
+        usage_kwargs={'usages': usages_anchor}, edge_threshold=edge_threshold,
+        difference_edge_width_scale=difference_edge_width_scale,
+        difference_threshold=difference_threshold, orphan_weight=orphan_weight,
+        ax=None, edge_width_scale=edge_width_scale, usage_scale=usage_scale,
+        arrows=arrows, font_size=font_size, edge_filter=difference_edge_filter)
+
+    jobs = []
+    for i, (graph, name) in enumerate(zip(graphs, group_names)):
+        if i < len(trans_mats):
+            edge_colors = 'k'
+        else:
+            edge_colors = ['b' if (graph[u][v]['weight'] * difference_edge_width_scale > 0) else 'r'
+                           for u, v in graph.edges()]
+        graph_kwargs = dict(graph=graph, width=widths[i], pos=pos, node_color='w', node_size=node_sizes[i],
+                            node_edge_colors=node_edge_colors[i], arrows=arrows, font_size=font_size,
+                            edge_colors=edge_colors, title=name)
+        graph_file = f'{output_file}_{re.sub(r"[^A-Za-z0-9_.-]+", "_", str(name).replace(" ", ""))}'
+        jobs.append((graph_kwargs, graph_file, (width_per_group, width_per_group)))
+
+    with mp.Pool(processes) as pool:
+        output_files = pool.starmap(_write_graph_figure, jobs)
+
+    if summary:
+        from moseq2_viz.viz import save_fig
+
+        fig, _, _ = graph_transition_matrix(trans_mats, usages=usages, groups=groups, edge_threshold=edge_threshold,
+                                            anchor=anchor, usage_threshold=usage_threshold, layout=layout,
+                                            edge_width_scale=edge_width_scale, width_per_group=width_per_group,
+                                            headless=True, difference_threshold=difference_threshold,
+                                            weights=weights, usage_scale=usage_scale, keep_orphans=keep_orphans,
+                                            max_syllable=max_syllable, orphan_weight=orphan_weight, arrows=arrows,
+                                            font_size=font_size, difference_edge_width_scale=difference_edge_width_scale,
+                                            layout_seed=layout_seed, layout_cache_file=layout_cache_file,
+                                            difference_edge_filter=difference_edge_filter)
+        save_fig(fig, output_file)
+        plt.close(fig)
+        output_files.append(output_file)
+
+    return output_files
@@ -243,22 +243,160 @@ def get_best_fit(cp_path, model_results):
     return info, pca_cps
 
 
-def _whiten_all(pca_scores: Dict[str, np.ndarray], center=True):
+def _open_pc_scores(pca_scores):
+    '''
+    Returns a dict-like view of PC scores. If `pca_scores` is a path, the scores are read lazily
+    from the "scores" group of the pca_scores.h5 file.
+
+    Parameters
+    ----------
+    pca_scores (dict or str): dictionary of uuid to PC score key-value pairs, or path to pca_scores.h5.
+
+    Returns
+    -------
+    scores (dict or h5py.Group): uuid to PC score mapping.
+    h5 (h5py.File or None): open file handle to close when done, if one was opened.
+    '''
+
+    if isinstance(pca_scores, str):
+        h5 = h5py.File(pca_scores, 'r')
+        return h5['scores'], h5
+    return pca_scores, None
+
+
+def _iter_pc_chunks(scores, chunk_size=None):
+    '''
+    Iterates over the PC scores of each session in chunks of rows.
+
+    Parameters
+    ----------
+    scores (dict or h5py.Group): uuid to PC score mapping.
+    chunk_size (int): number of rows per chunk. If None, each session is read in one chunk.
+
+    Returns
+    -------
+    chunks (generator): yields (uuid, first row of the chunk, chunk of PC scores as float64).
+    '''
+
+    for k, v in scores.items():
+        step = max(len(v) if chunk_size is None else chunk_size, 1)
+        for start in range(0, len(v), step):
+            yield k, start, np.asarray(v[start:start + step], dtype='float64')
+
+
+def _streaming_pc_moments(scores, chunk_size=None, complete_rows=True):
+    '''
+    Accumulates the mean and (co)variance of PC scores chunk by chunk, merging the count, mean and
+    sum of squared deviations of each chunk with the parallel update of Chan et al.
+
+    Parameters
+    ----------
+    scores (dict or h5py.Group): uuid to PC score mapping.
+    chunk_size (int): number of rows per chunk. If None, each session is read in one chunk.
+    complete_rows (bool): if True, drop rows containing NaNs and return the full covariance matrix;
+     otherwise ignore NaNs per column and return the variance of each column.
+
+    Returns
+    -------
+    n (int or np.ndarray): number of values used (per column if complete_rows is False).
+    mu (np.ndarray): mean of each column.
+    cov (np.ndarray): biased (ddof=0) covariance matrix, or column variances if complete_rows is False.
+    '''
+
+    n, mu, m2 = 0, 0, 0
+    for _, _, chunk in _iter_pc_chunks(scores, chunk_size):
+        if complete_rows:
+            chunk = chunk[~np.isnan(chunk).any(axis=1)]
+            n_chunk = len(chunk)
+            if n_chunk == 0:
+                continue
+            mu_chunk = chunk.mean(axis=0)
+            resid = chunk - mu_chunk
+            m2_chunk = resid.T @ resid
+        else:
+            n_chunk = (~np.isnan(chunk)).sum(axis=0)
+            mu_chunk = np.nansum(chunk, axis=0) / np.maximum(n_chunk, 1)
+            m2_chunk = np.nansum((chunk - mu_chunk) ** 2, axis=0)
+
+        total = n + n_chunk
+        delta = mu_chunk - mu
+        weight = n_chunk / np.maximum(total, 1)
+        mu = mu + delta * weight
+        if complete_rows:
+            m2 = m2 + m2_chunk + np.outer(delta, delta) * n * weight
+        else:
+            m2 = m2 + m2_chunk + delta ** 2 * n * weight
+        n = total
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return n, mu, m2 / n
+
+
+def _transform_pc_chunks(scores, transform, chunk_size=None, output_file=None):
+    '''
+    Applies a transform to the PC scores chunk by chunk.
+
+    Parameters
+    ----------
+    scores (dict or h5py.Group): uuid to PC score mapping.
+    transform (callable): function of (uuid, chunk) returning the transformed chunk.
+    chunk_size (int): number of rows per chunk. If None, each session is transformed in one chunk.
+    output_file (str): optional path to an h5 file to write the transformed scores to, under "scores/<uuid>".
+
+    Returns
+    -------
+    transformed_scores (dict or str): dictionary of transformed pc scores, or output_file if it was given.
+    '''
+
+    if output_file is None:
+        transformed_scores = {k: np.empty(v.shape, dtype='float64') for k, v in scores.items()}
+        for k, start, chunk in _iter_pc_chunks(scores, chunk_size):
+            transformed_scores[k][start:start + len(chunk)] = transform(k, chunk)
+        return transformed_scores
+
+    with h5py.File(output_file, 'a') as f:
+        for k, v in scores.items():
+            if f'scores/{k}' in f:
+                del f[f'scores/{k}']
+            f.create_dataset(f'scores/{k}', shape=v.shape, dtype='float64')
+        for k, start, chunk in _iter_pc_chunks(scores, chunk_size):
+            f[f'scores/{k}'][start:start + len(chunk)] = transform(k, chunk)
+
+    return output_file
+
+
+def _whiten_all(pca_scores: Dict[str, np.ndarray], center=True, chunk_size=None, output_file=None):
     '''
     Whitens all PC scores at once.
 
     Parameters
     ----------
-    pca_scores (dict): dictionary of uuid to PC score key-value pairs
+    pca_scores (dict or str): dictionary of uuid to PC score key-value pairs, or path to pca_scores.h5.
     center (bool): flag to subtract the mean of the data.
+    chunk_size (int): if set, stream the scores in chunks of this many rows instead of concatenating
+     all sessions in memory.
+    output_file (str): optional path to a scratch h5 file to write the whitened scores to.
 
     Returns
     -------
-    whitened_scores (dict): whitened pca_scores dict
+    whitened_scores (dict or str): whitened pca_scores dict, or output_file if it was given.
     '''
 
-    valid_scores = np.concatenate([x[~np.isnan(x).any(axis=1), :] for x in pca_scores.values()])
-    mu, cov = valid_scores.mean(axis=0), np.cov(valid_scores, rowvar=False, bias=1)
+    if isinstance(pca_scores, dict) and chunk_size is None and output_file is None:
+        valid_scores = np.concatenate([x[~np.isnan(x).any(axis=1), :] for x in pca_scores.values()])
+        mu, cov = valid_scores.mean(axis=0), np.cov(valid_scores, rowvar=False, bias=1)
+    else:
+        scores, h5 = _open_pc_scores(pca_scores)
+        try:
+            # first pass: moments; second pass: apply the whitening transform
+            _, mu, cov = _streaming_pc_moments(scores, chunk_size=chunk_size)
+            L = np.linalg.cholesky(cov)
+            offset = 0 if center else mu
+            return _transform_pc_chunks(scores, lambda k, v: np.linalg.solve(L, (v - mu).T).T + offset,
+                                        chunk_size=chunk_size, output_file=output_file)
+        finally:
+            if h5 is not None:
+                h5.close()
 
     L = np.linalg.cholesky(cov)
 
@@ -461,6 +599,102 @@ def get_syllable_slices(syllable, labels, label_uuids, index, trim_nans: bool =
     return syllable_slices
 
 
+def get_syllable_instance_table(labels, label_uuids, index, trim_nans: bool = True) -> pd.DataFrame:
+    '''
+    Get a table of every syllable instance for each animal in a modeling run. For each syllable,
+    the rows contain the same instances, in the same order, as `get_syllable_slices`.
+
+    Parameters
+    ----------
+    labels (np.ndarrary): list of label predictions for each session.
+    label_uuids (list): list of uuid keys corresponding to each session.
+    index (dict): index file contents contained in a dict.
+    trim_nans (bool): flag to use the pca scores file for removing time points that contain NaNs.
+     Only use if you have not already trimmed NaNs previously and need to.
+
+    Returns
+    -------
+    instance_table (pd.DataFrame): DataFrame with columns ['syllable', 'start', 'end', 'uuid', 'h5'],
+     where start and end are the frame indices bounding each syllable instance.
+    '''
+
+    if isinstance(index['files'], (dict, OrderedDict)):
+        h5s = {k: v['path'][0] for k, v in index['files'].items()}
+    elif isinstance(index['files'], (tuple, list, np.ndarray)):
+        h5s = {v['uuid']: v['path'][0] for v in index['files']}
+    else:
+        raise TypeError('"files" key in index not readable')
+
+    if trim_nans:
+        try:
+            score_idx = h5_to_dict(index['pca_path'], 'scores_idx')
+        except OSError:
+            raise OSError('pca_path in index file is incorrectly set. '
+                          'Ensure the pca_path is pointing to the pca_scores.h5 file.')
+
+    tables = []
+    for label_arr, label_uuid in zip(labels, label_uuids):
+        h5 = h5s[label_uuid]
+
+        if trim_nans:
+            idx = score_idx[label_uuid]
+
+            if len(idx) > len(label_arr):
+                warnings.warn(f'Index length {len(idx)} and label array length {len(label_arr)} in {h5}.'
+                              ' Setting index length to label array length.')
+                idx = idx[:len(label_arr)]
+            elif len(idx) < len(label_arr):
+                warnings.warn(f'Index length {len(idx)} and label array length {len(label_arr)} in {h5}.'
+                              ' Skipping trim for this session.')
+                continue
+
+            missing_frames = np.where(np.isnan(idx))[0]
+            trim_idx = idx[~np.isnan(idx)].astype('int32')
+            label_arr = np.asarray(label_arr)[~np.isnan(idx)]
+        else:
+            missing_frames = np.array([], dtype='int64')
+            trim_idx = np.arange(len(label_arr))
+            label_arr = np.asarray(label_arr)
+
+        # group frames by syllable, keeping their temporal order within each syllable
+        order = np.argsort(label_arr, kind='stable')
+        sorted_labels = label_arr[order]
+        match_idx = trim_idx[order]
+        # position of each frame within its syllable's list of matching frames
+        group_start = np.r_[0, np.where(np.diff(sorted_labels) != 0)[0] + 1]
+        group_sizes = np.diff(np.r_[group_start, len(sorted_labels)])
+        position = np.arange(len(sorted_labels)) - np.repeat(group_start, group_sizes)
+
+        # an instance starts at a new syllable or at a gap in the matching frame indices
+        is_start = np.ones(len(sorted_labels), dtype='bool')
+        is_start[1:] = (np.diff(sorted_labels) != 0) | (np.diff(match_idx) > 1)
+        run_start = np.where(is_start)[0]
+        run_end = np.r_[run_start[1:], len(sorted_labels)] - 1
+
+        # strike out instances that have missing frames
+        i, j = position[run_start], position[run_end]
+        has_missing = (np.searchsorted(missing_frames, j, side='right') -
+                       np.searchsorted(missing_frames, i, side='left')) > 0
+        keep = ~has_missing
+
+        tables.append(pd.DataFrame({
+            'syllable': sorted_labels[run_start][keep],
+            'start': match_idx[run_start][keep],
+            'end': match_idx[run_end][keep] + 1,
+            'uuid': label_uuid,
+            'h5': h5
+        }))
+
+    if len(tables) == 0:
+        return pd.DataFrame(columns=['syllable', 'start', 'end', 'uuid', 'h5'])
+
+    instance_table = pd.concat(tables, ignore_index=True)
+    # order by syllable, keeping session order within each syllable
+    instance_table = instance_table.iloc[np.argsort(instance_table['syllable'].to_numpy(), kind='stable')]
+
+    return instance_table.reset_index(drop=True)
+
+
 def add_duration_column(scalar_df):
     '''
     Adds syllable duration column to scalar dataframe if it also contains syllable labels.
@@ -568,7 +802,7 @@ def get_syllable_usages(data, max_syllable=100, count='usage'):
 
 
 def compute_behavioral_statistics(scalar_df, groupby=['group', 'uuid'], count='usage', fps=30,
-                                  usage_normalization=True, syllable_key='labels (usage sort)'):
+                                  usage_normalization=True, syllable_key='labels (usage sort)', engine='pandas'):
     '''
     Computes syllable statistics merged with the inputted scalar features.
 
@@ -581,6 +815,9 @@ def compute_behavioral_statistics(scalar_df, groupby=['group', 'uuid'], count='u
     fps (int): frames per second that the data was acquired in.
     usage_normalization (bool): indicates whether to normalize syllable usages by the value counts.
     syllable_key (str): column to rename to "syllable" for convenient referencing later on.
+    engine (str): 'pandas' (default) to compute the statistics with pandas groupby operations, or 'numpy'
+     to compute them from a single sort of the grouping keys. Both return the same DataFrame; the numpy engine
+     is much faster on large DataFrames.
 
     Returns
     -------
@@ -589,17 +826,24 @@ def compute_behavioral_statistics(scalar_df, groupby=['group', 'uuid'], count='u
 
     if count not in ('usage', 'frames'):
         raise ValueError('`count` must be either "usage" or "frames"')
+    if engine not in ('pandas', 'numpy'):
+        raise ValueError('`engine` must be either "pandas" or "numpy"')
 
     if isinstance(groupby, str):
         groupby = [groupby]
     groupby_with_syllable = groupby + [syllable_key]
 
-    scalar_df = scalar_df.query('`labels (original)` >= 0')
-
     # get list of numerical scalar features to include in output df.
     feature_cols = (scalar_df.dtypes == 'float32') | (scalar_df.dtypes == 'float')
     feature_cols = feature_cols[feature_cols].index
 
+    if engine == 'numpy':
+        return _compute_behavioral_statistics_numpy(scalar_df, groupby, feature_cols, count=count, fps=fps,
+                                                    usage_normalization=usage_normalization,
+                                                    syllable_key=syllable_key)
+
+    scalar_df = scalar_df.query('`labels (original)` >= 0')
+
     # get syllable usages
     if count == "usage":
         usages = (
@@ -648,6 +892,163 @@ def compute_behavioral_statistics(scalar_df, groupby=['group', 'uuid'], count='u
     return features.rename(columns={syllable_key: 'syllable'})
 
 
+def _factorize_runs(values):
+    '''
+    Sorted factorization of an array made of long runs of repeated values (e.g. session or group
+    columns). Only the first value of each run is hashed.
+
+    Parameters
+    ----------
+    values (1D np.ndarray): values to factorize.
+
+    Returns
+    -------
+    codes (1D np.ndarray): integer code of each value; -1 for missing values.
+    uniques (np.ndarray): sorted unique values.
+    '''
+
+    if len(values) == 0:
+        return pd.factorize(values, sort=True)
+
+    run_starts = np.flatnonzero(np.r_[True, values[1:] != values[:-1]])
+    run_codes, uniques = pd.factorize(values[run_starts], sort=True)
+    return np.repeat(run_codes, np.diff(np.r_[run_starts, len(values)])), uniques
+
+
+def _compute_behavioral_statistics_numpy(scalar_df, groupby, feature_cols, count='usage', fps=30,
+                                         usage_normalization=True, syllable_key='labels (usage sort)'):
+    '''
+    NumPy implementation of `compute_behavioral_statistics`. Rows are sorted once by a combined
+    (groupby..., syllable) integer key, and every statistic is computed over the resulting contiguous
+    blocks with ufunc reductions.
+
+    Parameters
+    ----------
+    scalar_df (pd.DataFrame): scalar DataFrame; rows with negative original labels are excluded.
+    groupby (list of strings): list of columns to group the scalar_df by.
+    feature_cols (pd.Index): numerical scalar columns to compute the mean, std, min and max of.
+    count (str): indicates how to determine mean usage calculation. either 'usage' (default), or 'frames'
+    fps (int): frames per second that the data was acquired in.
+    usage_normalization (bool): indicates whether to normalize syllable usages by the value counts.
+    syllable_key (str): column to rename to "syllable" for convenient referencing later on.
+
+    Returns
+    -------
+    features (pd.DataFrame): full feature Dataframe with scalars, metadata, and syllable statistics.
+    '''
+
+    key_cols = groupby + [syllable_key]
+
+    # factorize each key column (sorted, like groupby); rows with missing keys are dropped, like groupby
+    codes, uniques = [], []
+    for col in key_cols:
+        col_codes, col_uniques = _factorize_runs(scalar_df[col].to_numpy())
+        codes.append(col_codes)
+        uniques.append(col_uniques)
+    is_labeled = scalar_df['labels (original)'].to_numpy() >= 0
+    keep = np.all([c >= 0 for c in codes], axis=0) & is_labeled
+    codes = [c[keep] for c in codes]
+
+    n_groups = [len(u) for u in uniques[:-1]]
+    n_sylls = len(uniques[-1])
+    group_code = np.ravel_multi_index(codes[:-1], n_groups) if len(groupby) > 0 else np.zeros(keep.sum(), 'int64')
+    syll_code = codes[-1]
+    key = group_code * n_sylls + syll_code
+
+    onset = scalar_df['onset'].to_numpy().astype('bool') & is_labeled
+    # each run of a syllable is numbered by the onsets that precede it
+    trials = np.cumsum(onset)[keep]
+    onset = onset[keep]
+
+    # single sort; stable so rows stay in their original order within each block.
+    # numpy uses a radix sort for stable sorts of 16-bit keys
+    sort_key = key.astype('uint16') if n_sylls * int(np.prod(n_groups)) <= 2 ** 16 else key
+    order = np.argsort(sort_key, kind='stable')
+    key = key[order]
+    trials = trials[order]
+    # original row of each sorted row
+    rows = np.flatnonzero(keep)[order]
+    starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+    block_key = key[starts]
+    block_size = np.diff(np.r_[starts, len(key)])
+
+    # the usage table covers every (group, syllable) pair seen in the counted rows
+    count_key = key[onset[order]] if count == 'usage' else key
+    counts = np.bincount(count_key, minlength=n_sylls * int(np.prod(n_groups)))
+    counted_groups = np.flatnonzero(counts.reshape(-1, n_sylls).sum(axis=1) > 0)
+    counted_sylls = np.flatnonzero(counts.reshape(-1, n_sylls).sum(axis=0) > 0)
+
+    # output rows are ordered by syllable, then group, matching the unstacked/melted pandas usages
+    grid_key = (counted_groups[None, :] * n_sylls + counted_sylls[:, None]).ravel()
+    usage = counts[grid_key]
+    if usage_normalization:
+        group_totals = counts.reshape(-1, n_sylls).sum(axis=1)
+        usage = usage / group_totals[grid_key // n_sylls]
+
+    # position of each block in the output grid (blocks not in the usage table are dropped)
+    grid_pos = np.full(n_sylls * int(np.prod(n_groups)), -1, dtype='int64')
+    grid_pos[grid_key] = np.arange(len(grid_key))
+    block_pos = grid_pos[block_key]
+    in_grid = block_pos >= 0
+    block_pos = block_pos[in_grid]
+
+    def _to_grid(block_values):
+        out = np.full(len(grid_key), np.nan)
+        out[block_pos] = block_values[in_grid]
+        return out
+
+    features = {}
+    group_idx = np.unravel_index(grid_key // n_sylls, n_groups) if len(groupby) > 0 else []
+    for col, idx, col_uniques in zip(groupby, group_idx, uniques):
+        features[col] = np.asarray(col_uniques)[idx]
+    features[syllable_key] = np.asarray(uniques[-1])[grid_key % n_sylls]
+    features['usage'] = usage
+
+    # average duration in seconds: rows in each block divided by the number of runs in the block
+    new_trial = np.r_[True, trials[1:] != trials[:-1]]
+    new_trial[starts] = True
+    n_trials = np.add.reduceat(new_trial, starts)
+    features['duration'] = _to_grid(block_size / n_trials / fps)
+
+    for col in feature_cols:
+        values = scalar_df[col].to_numpy()
+        out_dtype = values.dtype
+        values = values[rows].astype('float64')
+
+        # fmin/fmax skip NaNs, like pandas
+        col_min = np.fmin.reduceat(values, starts)
+        col_max = np.fmax.reduceat(values, starts)
+
+        is_nan = np.isnan(values)
+        has_nan = is_nan.any()
+        if has_nan:
+            values[is_nan] = 0
+            n_valid = block_size - np.add.reduceat(is_nan, starts, dtype='int64')
+        else:
+            n_valid = block_size
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.add.reduceat(values, starts) / n_valid
+            # two-pass sample standard deviation (ddof=1), computed in place
+            values -= np.repeat(mean, block_size)
+            if has_nan:
+                values[is_nan] = 0
+            values *= values
+            std = np.sqrt(np.add.reduceat(values, starts) / (n_valid - 1))
+        std[n_valid < 2] = np.nan
+
+        features[f'{col}_mean'] = _to_grid(mean).astype(out_dtype)
+        features[f'{col}_std'] = _to_grid(std).astype(out_dtype)
+        features[f'{col}_min'] = _to_grid(col_min).astype(out_dtype)
+        features[f'{col}_max'] = _to_grid(col_max).astype(out_dtype)
+
+    features = pd.DataFrame(features)
+    features['syllable key'] = syllable_key
+
+    # rename inputted column name to "syllable" for simpler column referencing.
+    return features.rename(columns={syllable_key: 'syllable'})
+
+
 def get_syllable_statistics(data, fill_value=-5, max_syllable=100, count='usage'):
     '''
     Compute the usage and duration statistics from a set of model labels
@@ -913,15 +1314,13 @@ def prepare_model_dataframe(model_path, pca_path):
 
     Returns
     -------
-    _df (pd.DataFrame): DataFrame object of timestamp aligned syllable label information.
+    _df (pd.DataFrame): DataFrame object of timestamp aligned syllable label information,
+     with categorical uuid and group columns.
     '''
 
     mdl = parse_model_results(model_path, map_uuid_to_keys=True)
     labels = mdl['labels']
 
-    usage, _ = relabel_by_usage(labels, count='usage')
-    frames, _ = relabel_by_usage(labels, count='frames')
-
     if not os.path.isfile(pca_path):
         raise AssertionError('The pca_path variable in the index file is not pointing to the correct file.\n'
                              'Update the path in the index file to match the correct location of the '
@@ -933,16 +1332,44 @@ def prepare_model_dataframe(model_path, pca_path):
     if not all(k in scores_idx and len(scores_idx[k]) == len(v) for k, v in labels.items()):
         raise ValueError('PC scores don\'t align with labels or label UUID not found in PC scores')
 
-    _df = pd.concat((pd.DataFrame({
-        'uuid': k,
-        'labels (original)': v,
-        'labels (usage sort)': usage[k],
-        'labels (frames sort)': frames[k],
-        'onset': compute_syllable_onset(v),
-        'frame index': scores_idx[k],
-        'syllable index': np.arange(len(v)),
-        'group': mdl['metadata']['groups'][k]
-    }) for k, v in labels.items()), ignore_index=True)
+    uuids = list(labels)
+    lengths = np.array([len(v) for v in labels.values()])
+    session_starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    session_codes = np.repeat(np.arange(len(uuids)), lengths)
+
+    all_labels = np.concatenate(list(labels.values()))
+    onset = np.ones(len(all_labels), dtype='bool')
+    onset[1:] = np.diff(all_labels) != 0
+    onset[session_starts] = True
+
+    # count usages and frames once, then derive both sortings (same as relabel_by_usage)
+    max_syllable = 100
+    in_range = (all_labels >= 0) & (all_labels < max_syllable)
+    frames = np.bincount(all_labels[in_range].astype('int64'), minlength=max_syllable)
+    usages = np.bincount(all_labels[in_range & onset].astype('int64'), minlength=max_syllable)
+
+    def _relabel(counts):
+        # stable sort keeps ties in syllable order, like sorted(..., reverse=True)
+        lut = np.empty(max_syllable, dtype='int64')
+        lut[np.argsort(-counts, kind='stable')] = np.arange(max_syllable)
+        relabeled = all_labels.copy()
+        relabeled[in_range] = lut[all_labels[in_range].astype('int64')]
+        return relabeled
+
+    groups = [mdl['metadata']['groups'][k] for k in uuids]
+    group_categories = list(pd.unique(np.array(groups, dtype='object')))
+    group_codes = np.array([group_categories.index(g) for g in groups], dtype='int64')
+
+    _df = pd.DataFrame({
+        'uuid': pd.Categorical.from_codes(session_codes, categories=uuids),
+        'labels (original)': all_labels,
+        'labels (usage sort)': _relabel(usages),
+        'labels (frames sort)': _relabel(frames),
+        'onset': onset,
+        'frame index': np.concatenate([scores_idx[k] for k in uuids]),
+        'syllable index': np.arange(len(all_labels)) - np.repeat(session_starts, lengths),
+        'group': pd.Categorical.from_codes(group_codes[session_codes], categories=group_categories)
+    })
 
     return _df
 
@@ -996,6 +1423,68 @@ def simulate_ar_trajectory(ar_mat, init_points=None, sim_points=100):
     return sim_mat[nlags:]
 
 
+def simulate_ar_trajectories(ar_mats, init_points=None, sim_points=100):
+    '''
+    Simulate auto-regressive trajectories for a batch of model states at once.
+    Produces the same trajectories as calling `simulate_ar_trajectory` on each state,
+    but advances every state (and every initial point) together at each time step.
+
+    Parameters
+    ----------
+    ar_mats (3D np.ndarray or list): stacked autoregressive matrices with shape (nstates, npcs, npcs * nlags + 1)
+    init_points (np.ndarray or list): initial points for each state with shape (nlags, npcs), or (ninit, nlags, npcs)
+     to simulate multiple initial conditions per state. Only the first nlags rows are used. Entries can be None
+     to start from zeros.
+    sim_points (int): number of time points to simulate.
+
+    Returns
+    -------
+    sim_mat (np.ndarray): simulated AR trajectories excluding lagged values.
+     shape = (nstates, sim_points, npcs), or (nstates, ninit, sim_points, npcs) if multiple initial points are given.
+    '''
+
+    ar_mats = np.asarray(ar_mats)
+    nstates, npcs = ar_mats.shape[:2]
+
+    if ar_mats.shape[2] % npcs == 1:
+        affine_term = ar_mats[:, :, -1]
+        ar_mats = ar_mats[:, :, :-1]
+    else:
+        affine_term = np.zeros((nstates, npcs), dtype='float32')
+
+    nlags = ar_mats.shape[2] // npcs
+
+    # stack of per-lag matrices; shape = (nstates, nlags, npcs, npcs)
+    use_mats = ar_mats.reshape(nstates, npcs, nlags, npcs).transpose(0, 2, 1, 3).astype('float64')
+
+    if init_points is None:
+        init_points = [None] * nstates
+
+    init_points = np.stack([np.zeros((nlags, npcs), dtype='float32') if p is None else np.asarray(p)[..., :nlags, :]
+                            for p in init_points])
+    multiple_inits = init_points.ndim == 4
+    if not multiple_inits:
+        init_points = init_points[:, None]
+
+    sim_mat = np.zeros((nstates, init_points.shape[1], sim_points + nlags, npcs), dtype='float32')
+    sim_mat[:, :, :nlags] = init_points
+
+    for i in range(sim_points):
+        sim_idx = i + nlags
+        result = 0
+        for j in range(1, nlags + 1):
+            result = result + np.einsum('sni,sij->snj', sim_mat[:, :, sim_idx - j], use_mats[:, nlags - j])
+        result += affine_term[:, None, :]
+
+        sim_mat[:, :, sim_idx] = result
+
+    sim_mat = sim_mat[:, :, nlags:]
+    if not multiple_inits:
+        sim_mat = sim_mat[:, 0]
+
+    return sim_mat
+
+
 def sort_batch_results(data, averaging=True, filenames=None, **kwargs):
     '''
     Sort modeling results from batch/parameter scan.
@@ -1086,33 +1575,47 @@ def sort_batch_results(data, averaging=True, filenames=None, **kwargs):
     return new_matrix, param_dict, filename_index
 
 
-def whiten_pcs(pca_scores, method='all', center=True):
+def whiten_pcs(pca_scores, method='all', center=True, chunk_size=None, output_file=None):
     '''
 
     Whiten PC scores using Cholesky whitening.
 
     Parameters
     ----------
-    pca_scores (dict): dictionary where values are pca_scores (2d np arrays)
+    pca_scores (dict or str): dictionary where values are pca_scores (2d np arrays), or path to pca_scores.h5
     method (str): 'all' to whiten using the covariance estimated from all keys, or 'each' to whiten each separately
     center (bool): whether or not to center the data
+    chunk_size (int): if set, stream the scores in chunks of this many rows so that the scores never
+     need to fit in memory at once.
+    output_file (str): optional path to a scratch h5 file to write the whitened scores to.
 
     Returns
     -------
-    whitened_scores (dict): dictionary of whitened pc scores
+    whitened_scores (dict or str): dictionary of whitened pc scores, or output_file if it was given
     '''
 
     if method[0].lower() == 'a':
-        whitened_scores = _whiten_all(pca_scores, center=center)
+        whitened_scores = _whiten_all(pca_scores, center=center, chunk_size=chunk_size, output_file=output_file)
     else:
         whitened_scores = {}
-        for k, v in pca_scores.items():
-            whitened_scores[k] = _whiten_all({k: v}, center=center)[k]
+        scores, h5 = _open_pc_scores(pca_scores)
+        try:
+            for k, v in scores.items():
+                if chunk_size is None and output_file is None:
+                    v = np.asarray(v)
+                whitened = _whiten_all({k: v}, center=center, chunk_size=chunk_size, output_file=output_file)
+                if output_file is None:
+                    whitened_scores[k] = whitened[k]
+        finally:
+            if h5 is not None:
+                h5.close()
+        if output_file is not None:
+            whitened_scores = output_file
 
     return whitened_scores
 
 
-def normalize_pcs(pca_scores: dict, method: str = 'zscore') -> dict:
+def normalize_pcs(pca_scores: dict, method: str = 'zscore', chunk_size=None, output_file=None) -> dict:
     '''
     Normalize PC scores. Options are: demean, zscore, ind-zscore.
     zscore: standardize pc scores using all data
@@ -1121,16 +1624,22 @@ def normalize_pcs(pca_scores: dict, method: str = 'zscore') -> dict:
 
     Parameters
     ----------
-    pca_scores (dict): dict of uuid to PC-scores key-value pairs.
+    pca_scores (dict or str): dict of uuid to PC-scores key-value pairs, or path to pca_scores.h5.
     method (str): the type of normalization to perform (demean, zscore, ind-zscore)
+    chunk_size (int): if set, stream the scores in chunks of this many rows so that the scores never
+     need to fit in memory at once.
+    output_file (str): optional path to a scratch h5 file to write the normalized scores to.
 
     Returns
     -------
-    norm_scores (dict): a dictionary of normalized PC scores.
+    norm_scores (dict or str): a dictionary of normalized PC scores, or output_file if it was given.
     '''
     if method not in ('zscore', 'demean', 'ind-zscore'):
         raise ValueError(f'normalization {method} not supported. Please use: "zscore", "demean", or "ind-zscore"')
 
+    if not isinstance(pca_scores, dict) or chunk_size is not None or output_file is not None:
+        return _normalize_pcs_streaming(pca_scores, method, chunk_size=chunk_size, output_file=output_file)
+
     norm_scores = deepcopy(pca_scores)
     if method.lower() == 'zscore':
         all_values = np.concatenate(list(norm_scores.values()), axis=0)
@@ -1149,6 +1658,47 @@ def normalize_pcs(pca_scores: dict, method: str = 'zscore') -> dict:
     return norm_scores
 
 
+def _normalize_pcs_streaming(pca_scores, method='zscore', chunk_size=None, output_file=None):
+    '''
+    Streaming version of `normalize_pcs`. Column means and standard deviations are accumulated chunk
+    by chunk, then the scores are normalized in a second pass.
+
+    Parameters
+    ----------
+    pca_scores (dict or str): dict of uuid to PC-scores key-value pairs, or path to pca_scores.h5.
+    method (str): the type of normalization to perform (demean, zscore, ind-zscore)
+    chunk_size (int): number of rows per chunk. If None, each session is read in one chunk.
+    output_file (str): optional path to a scratch h5 file to write the normalized scores to.
+
+    Returns
+    -------
+    norm_scores (dict or str): a dictionary of normalized PC scores, or output_file if it was given.
+    '''
+
+    scores, h5 = _open_pc_scores(pca_scores)
+    try:
+        if method == 'ind-zscore':
+            moments = {k: _streaming_pc_moments({k: v}, chunk_size, complete_rows=False) for k, v in scores.items()}
+
+            def _transform(k, v):
+                _, mu, var = moments[k]
+                return (v - mu) / np.sqrt(var)
+        else:
+            _, mu, var = _streaming_pc_moments(scores, chunk_size, complete_rows=False)
+            sig = np.sqrt(var)
+
+            def _transform(k, v):
+                if method == 'demean':
+                    return v - mu
+                # normalize_pcs standardizes the in-memory scores twice; keep both paths consistent
+                return ((v - mu) / sig - mu) / sig
+
+        return _transform_pc_chunks(scores, _transform, chunk_size=chunk_size, output_file=output_file)
+    finally:
+        if h5 is not None:
+            h5.close()
+
+
 def _gen_to_arr(generator: Iterator[Any]) -> np.ndarray:
     '''
     Cast a generator object into a numpy array.
@@ -1165,6 +1715,60 @@ def _gen_to_arr(generator: Iterator[Any]) -> np.ndarray:
     return np.array(list(generator))
 
 
+def gather_pc_windows(starts, ends, uuids, pca_scores, max_dur=60, npcs=10):
+    '''
+    Fills a zero-padded matrix with the PC scores of each syllable instance. Instances are grouped by
+    session, and each session's windows are gathered with a single indexing operation.
+
+    Parameters
+    ----------
+    starts (1D np.ndarray): first frame index of each syllable instance.
+    ends (1D np.ndarray): last frame index (exclusive) of each syllable instance.
+    uuids (1D np.ndarray): session uuid of each syllable instance.
+    pca_scores (dict or str): dict of uuid to PC score key-value pairs, or path to the pca_scores.h5 file
+     to read the PC scores from directly.
+    max_dur (int): maximum syllable length; shorter instances are padded with zeros.
+    npcs (int): number of pcs to use.
+
+    Returns
+    -------
+    syllable_matrix (np.ndarray): 3D matrix of PC projected syllable instances; shape = (n_instances, max_dur, npcs)
+    '''
+
+    starts = np.asarray(starts, dtype='int64')
+    ends = np.asarray(ends, dtype='int64')
+    uuids = np.asarray(uuids)
+
+    syllable_matrix = np.zeros((len(starts), max_dur, npcs), 'float32')
+    if len(starts) == 0:
+        return syllable_matrix
+
+    offsets = np.arange(max_dur)
+    session_uuids, session_idx = np.unique(uuids, return_inverse=True)
+
+    h5 = h5py.File(pca_scores, 'r') if isinstance(pca_scores, str) else None
+    try:
+        for i, uuid in enumerate(session_uuids):
+            rows = np.where(session_idx == i)[0]
+            # only read the frames spanned by this session's instances
+            first_frame = starts[rows].min()
+            if h5 is not None:
+                scores = h5['scores'][uuid][first_frame:ends[rows].max(), :npcs]
+            else:
+                scores = pca_scores[uuid][first_frame:ends[rows].max(), :npcs]
+
+            frame_idx = starts[rows, None] - first_frame + offsets[None, :]
+            is_valid = offsets[None, :] < (ends[rows] - starts[rows])[:, None]
+            windows = scores[np.where(is_valid, frame_idx, 0)]
+            windows[~is_valid] = 0
+            syllable_matrix[rows] = windows
+    finally:
+        if h5 is not None:
+            h5.close()
+
+    return syllable_matrix
+
+
 def retrieve_pcs_from_slices(slices, pca_scores, max_dur=60, min_dur=3,
                              max_samples=100, npcs=10, subsampling=None,
                              remove_offset=False, **kwargs):
@@ -1173,11 +1777,12 @@ def retrieve_pcs_from_slices(slices, pca_scores, max_dur=60, min_dur=3,
 
     Parameters
     ----------
-    slices (np.ndarray): syllable slices or subarrays
-    pca_scores (np.ndarray): PC scores for respective session.
+    slices (list or pd.DataFrame): syllable slices (output of `get_syllable_slices`), or a syllable instance
+     table with 'start', 'end' and 'uuid' columns (see `get_syllable_instance_table`).
+    pca_scores (dict or str): PC scores for each session, or path to the pca_scores.h5 file.
     max_dur (int): maximum syllable length.
     min_dur (int): minimum syllable length.
-    max_samples (int): maximum number of samples to retrieve.
+    max_samples (int): maximum number of samples to retrieve. If None, all instances are used.
     npcs (int): number of pcs to use.
     subsampling (int): number of syllable subsamples (defined through KMeans clustering).
     remove_offset (bool): indicate whether to remove initial offset from each PC score.
@@ -1190,19 +1795,25 @@ def retrieve_pcs_from_slices(slices, pca_scores, max_dur=60, min_dur=3,
 
     # pad using zeros, get dtw distances...
 
-    # make function to filter syll durations
-    filter_dur = compose(lambda dur: (dur < max_dur) & (dur > min_dur),
-                         lambda inds: inds[1] - inds[0],
-                         get(0))
-    filtered_slices = _gen_to_arr(filter(filter_dur, slices))
+    if isinstance(slices, pd.DataFrame):
+        starts = slices['start'].to_numpy()
+        ends = slices['end'].to_numpy()
+        uuids = slices['uuid'].to_numpy()
+    else:
+        slices = list(slices)
+        starts = np.array([idx[0] for idx, _, _ in slices], dtype='int64')
+        ends = np.array([idx[1] for idx, _, _ in slices], dtype='int64')
+        uuids = np.array([uuid for _, uuid, _ in slices], dtype='object')
+
+    # filter syll durations
+    durs = ends - starts
+    is_valid = np.where((durs < max_dur) & (durs > min_dur))[0]
     # select random samples
-    inds = np.random.randint(0, len(filtered_slices), size=max_samples)
-    use_slices = filtered_slices[inds]
-
-    syllable_matrix = np.zeros((len(use_slices), max_dur, npcs), 'float32')
+    if max_samples is not None:
+        is_valid = is_valid[np.random.randint(0, len(is_valid), size=max_samples)]
 
-    for i, (idx, uuid, _) in enumerate(use_slices):
-        syllable_matrix[i, :idx[1]-idx[0], :] = pca_scores[uuid][idx[0]:idx[1], :npcs]
+    syllable_matrix = gather_pc_windows(starts[is_valid], ends[is_valid], uuids[is_valid],
+                                        pca_scores, max_dur=max_dur, npcs=npcs)
 
     if remove_offset:
         syllable_matrix = syllable_matrix - syllable_matrix[:, 0, :][:, None, :]
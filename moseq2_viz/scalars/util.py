@@ -488,7 +488,9 @@ def scalars_to_dataframe(index: dict, include_keys: list = ['SessionName', 'Subj
 
         # make sure we have labels for this UUID before merging
         if has_model and k in labels_df.index:
-            if _tmp_df['group'].unique() != labels_df.loc[k, 'group'].unique():
+            # group is stored as a categorical in labels_df; compare and merge on plain strings
+            session_labels = labels_df.loc[k].astype({'group': 'object'})
+            if _tmp_df['group'].unique() != session_labels['group'].unique():
                 warnings.warn('Group labels from index.yaml and model results do not match! Setting group labels '
                               'to ones used in the model.')
                 _tmp_df = _tmp_df.drop(columns=['group'])
@@ -497,7 +499,7 @@ def scalars_to_dataframe(index: dict, include_keys: list = ['SessionName', 'Subj
             if 'group' in _tmp_df.columns:
                 merge_on += ['group']
 
-            _tmp_df = pd.merge(_tmp_df, labels_df.loc[k], on=merge_on, how='outer')
+            _tmp_df = pd.merge(_tmp_df, session_labels, on=merge_on, how='outer')
             _tmp_df = _tmp_df.sort_values(by='syllable index').reset_index(drop=True)
 
             # filter included keys to only those that exist in the dataset dataframe
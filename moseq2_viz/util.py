@@ -440,4 +440,113 @@ def assert_model_and_index_uuids_match(model, index):
     model_uuids = set(model['metadata']['uuids'])
 
     assert index_uuids == model_uuids, 'Index file UUIDS must match the model UUIDs.'
-    
\ No newline at end of file
+    
+
+# number of random draws (e.g. bootstrap samples or permutations) generated from each seeded block
+RNG_BLOCK_SIZE = 100
+
+
+def as_seed_sequence(seed=None, stream=None):
+    '''
+    Converts a seed to a np.random.SeedSequence, optionally selecting an independent sub-stream.
+
+    Parameters
+    ----------
+    seed (int, np.random.SeedSequence or None): random seed. None draws fresh entropy from the OS.
+    stream (int or tuple): optional sub-stream key; the same (seed, stream) always gives the same sequence,
+     and different streams are statistically independent.
+
+    Returns
+    -------
+    seed_seq (np.random.SeedSequence): seed sequence to initialize generators with.
+    '''
+
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    if stream is None:
+        return seed
+
+    stream = tuple(np.atleast_1d(stream).tolist())
+    return np.random.SeedSequence(seed.entropy, spawn_key=tuple(seed.spawn_key) + stream,
+                                  pool_size=seed.pool_size)
+
+
+def get_rng(seed=None, stream=None):
+    '''
+    Creates a random number generator from a seed (see `as_seed_sequence`).
+
+    Parameters
+    ----------
+    seed (int, np.random.SeedSequence or None): random seed.
+    stream (int or tuple): optional sub-stream key.
+
+    Returns
+    -------
+    rng (np.random.Generator): random number generator.
+    '''
+
+    return np.random.default_rng(as_seed_sequence(seed, stream))
+
+
+def spawn_seeds(seed, n, stream=None):
+    '''
+    Spawns n independent child seeds, e.g. one per group pair or session. Unlike SeedSequence.spawn,
+     the children only depend on the seed and stream, not on earlier spawn calls.
+
+    Parameters
+    ----------
+    seed (int, np.random.SeedSequence or None): random seed.
+    n (int): number of child seeds.
+    stream (int or tuple): optional sub-stream key.
+
+    Returns
+    -------
+    seeds (list): list of n np.random.SeedSequence.
+    '''
+
+    seed = as_seed_sequence(seed, stream)
+    return [as_seed_sequence(seed, i) for i in range(n)]
+
+
+def get_rng_blocks(seed, n_draws, chunk_size=None, stream=None, block_size=RNG_BLOCK_SIZE):
+    '''
+    Splits n_draws random draws into fixed-size blocks, each generated from its own seed, and groups
+     consecutive blocks into chunks of at least `chunk_size` draws. Because the blocks do not depend on the
+     chunking, concatenating the draws of all chunks gives identical results for any chunk size or number of
+     workers the chunks are processed with (see `draw_rng_blocks`).
+
+    Parameters
+    ----------
+    seed (int, np.random.SeedSequence or None): random seed.
+    n_draws (int): total number of draws (e.g. bootstrap samples or permutations).
+    chunk_size (int): approximate number of draws per chunk, rounded up to whole blocks. Defaults to one block.
+    stream (int or tuple): optional sub-stream key.
+    block_size (int): number of draws generated from each seed.
+
+    Returns
+    -------
+    chunks (list): list of chunks; each chunk is a list of (n_block_draws, np.random.SeedSequence) tuples.
+    '''
+
+    block_seeds = spawn_seeds(seed, int(np.ceil(n_draws / block_size)), stream=stream)
+    blocks = [(min(block_size, n_draws - i * block_size), s) for i, s in enumerate(block_seeds)]
+
+    blocks_per_chunk = max(1, int(np.ceil((chunk_size or block_size) / block_size)))
+    return [blocks[i:i + blocks_per_chunk] for i in range(0, len(blocks), blocks_per_chunk)]
+
+
+def draw_rng_blocks(blocks, draw):
+    '''
+    Generates the random draws of a chunk of blocks (see `get_rng_blocks`).
+
+    Parameters
+    ----------
+    blocks (list): list of (n_block_draws, np.random.SeedSequence) tuples.
+    draw (function): function called as draw(rng, n) that returns an array of n draws along the first axis.
+
+    Returns
+    -------
+    draws (np.ndarray): concatenated draws of all blocks.
+    '''
+
+    return np.concatenate([draw(np.random.default_rng(s), n) for n, s in blocks])
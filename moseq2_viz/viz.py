@@ -17,6 +17,7 @@ from os.path import dirname
 from scipy.stats import mode
 import matplotlib.pyplot as plt
 import matplotlib.lines as mlines
+from moseq2_viz.util import get_rng
 from moseq2_viz.model.util import sort_syllables_by_stat, sort_syllables_by_stat_difference
 
 
@@ -157,7 +158,7 @@ def save_fig(fig, output_file, suffix=None, **kwargs):
 def make_crowd_matrix(slices, nexamples=50, pad=30, raw_size=(512, 424), outmovie_size=(300, 300), frame_path='frames',
                       crop_size=(80, 80), max_dur=60, min_dur=0, scale=1,
                       center=False, rotate=False, select_median_duration_instances=False, min_height=10, legacy_jitter_fix=False,
-                      seed=0, **kwargs):
+                      seed=0, stream=None, **kwargs):
     '''
     Creates crowd movie video numpy array.
 
@@ -177,6 +178,9 @@ def make_crowd_matrix(slices, nexamples=50, pad=30, raw_size=(512, 424), outmovi
     select_median_duration_instances (bool): if true, select examples with syallable duration closer to median.
     min_height (int): minimum max height from floor to use.
     legacy_jitter_fix (bool): whether to apply jitter fix for K1 camera.
+    seed (int): random seed used to select the examples.
+    stream (int): random sub-stream of `seed`, e.g. the syllable number, so each crowd movie samples its
+     examples independently of the others and of the order they are rendered in.
     kwargs (dict): extra keyword arguments
 
     Returns
@@ -187,7 +191,7 @@ def make_crowd_matrix(slices, nexamples=50, pad=30, raw_size=(512, 424), outmovi
     if rotate and not center:
         raise NotImplementedError('Rotating without centering not supported')
 
-    rng = np.random.default_rng(seed)
+    rng = get_rng(seed, stream)
 
     # set up x, y value to crop out the mouse with respect to the mouse centriod
     xc0, yc0 = crop_size[1] // 2, crop_size[0] // 2
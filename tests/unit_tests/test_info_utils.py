@@ -2,8 +2,9 @@ import joblib
 import numpy as np
 from unittest import TestCase
 from moseq2_viz.model.util import parse_model_results
-from moseq2_viz.info.util import entropy, entropy_rate
-from moseq2_viz.model.util import get_syllable_statistics
+from moseq2_viz.info.util import entropy, entropy_rate, transition_entropy, get_syllable_counts, \
+    compute_entropy_metrics, bootstrap_entropy
+from moseq2_viz.model.util import get_syllable_statistics, relabel_by_usage
 from moseq2_viz.model.trans_graph import get_transition_matrix
 
 
@@ -95,4 +96,58 @@ class TestInfoUtils(TestCase):
             
             test_er = entropy_rate(labels, normalize=norm, truncate_syllable=truncate_syllable, smoothing=smoothing, tm_smoothing=tm_smoothing)
 
-            assert len(test_er) == len(tmp) == 2
\ No newline at end of file
+            assert len(test_er) == len(tmp) == 2
+
+    def test_get_syllable_counts(self):
+        rng = np.random.RandomState(0)
+        labels = [np.concatenate([[-5] * 3, np.repeat(rng.randint(0, 30, 300), rng.randint(1, 5, 300))])
+                  for _ in range(3)]
+
+        for relabel_by in ('usage', 'frames', None):
+            usages, trans_counts = get_syllable_counts(labels, relabel_by=relabel_by)
+            assert usages.shape == (3, 100)
+            assert trans_counts.shape == (3, 100, 100)
+
+            sorted_labels = labels if relabel_by is None else relabel_by_usage(labels, count=relabel_by)[0]
+            for i, v in enumerate(sorted_labels):
+                expected = get_syllable_statistics([v])[0]
+                np.testing.assert_array_equal(usages[i], [expected[k] for k in range(100)])
+                np.testing.assert_array_equal(trans_counts[i], get_transition_matrix([v], normalize=None,
+                                                                                     combine=True, disable_output=True))
+
+        metrics = compute_entropy_metrics(labels, truncate_syllable=20)
+        np.testing.assert_allclose(metrics['entropy'], entropy(labels, truncate_syllable=20))
+        np.testing.assert_allclose(metrics['entropy_rate'], entropy_rate(labels, truncate_syllable=20))
+        np.testing.assert_allclose(metrics['incoming_transition_entropy'],
+                                   transition_entropy(labels, truncate_syllable=20))
+        np.testing.assert_allclose(metrics['outgoing_transition_entropy'],
+                                   transition_entropy(labels, truncate_syllable=20, transition_type='outgoing'))
+        assert metrics['incoming_transition_entropy'].shape == (3, 20)
+
+    def test_bootstrap_entropy(self):
+        rng = np.random.RandomState(0)
+        labels = [np.concatenate([[-5] * 3, np.repeat(rng.randint(0, 30, 500), rng.randint(1, 5, 500))])
+                  for _ in range(4)]
+        label_group = ['a', 'a', 'b', 'b']
+
+        session_ci, group_ci = bootstrap_entropy(labels, label_group, n_bootstrap=500, chunk_size=200)
+
+        assert session_ci['entropy'].shape == (4, 3)
+        np.testing.assert_allclose(session_ci['entropy'][:, 0], entropy(labels))
+        np.testing.assert_allclose(session_ci['entropy_rate'][:, 0], entropy_rate(labels))
+        for metric in ('entropy', 'entropy_rate'):
+            assert np.all(session_ci[metric][:, 1] < session_ci[metric][:, 2])
+            assert np.all(group_ci[metric][:, 1] < group_ci[metric][:, 2])
+
+        assert group_ci['groups'] == ['a', 'b']
+        np.testing.assert_allclose(group_ci['entropy'][:, 0], [np.mean(entropy(labels[:2])), np.mean(entropy(labels[2:]))])
+
+        # results only depend on the seed
+        rerun, _ = bootstrap_entropy(labels, label_group, n_bootstrap=500, chunk_size=300, n_jobs=2)
+        np.testing.assert_array_equal(session_ci['entropy_rate'], rerun['entropy_rate'])
+
+        # sessions without labeled runs get NaN intervals and are left out of their group
+        empty_ci, empty_group_ci = bootstrap_entropy(labels[:3] + [np.full(100, -5)], label_group,
+                                                     n_bootstrap=500, chunk_size=200)
+        assert np.isnan(empty_ci['entropy'][3, 1:]).all() and np.isnan(empty_ci['entropy_rate'][3, 1:]).all()
+        np.testing.assert_allclose(empty_group_ci['entropy'][1], empty_ci['entropy'][2])
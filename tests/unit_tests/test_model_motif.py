@@ -0,0 +1,61 @@
+import unittest
+import numpy as np
+from unittest import TestCase
+from moseq2_viz.model.trans_graph import get_transitions
+from moseq2_viz.model.motif import build_suffix_array, build_motif_index, count_motif, \
+    find_motif, get_top_n_grams
+
+class TestModelMotif(TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.labels = [np.concatenate([[-5] * 3, np.repeat(rng.randint(0, 5, 200), rng.randint(1, 4, 200)),
+                                       [-5] * 4, np.repeat(rng.randint(0, 5, 50), rng.randint(1, 4, 50))])
+                       for _ in range(4)]
+        self.index = build_motif_index(self.labels, uuids=['a', 'b', 'c', 'd'])
+
+    def test_build_suffix_array(self):
+        sequence = np.array([2, 1, 2, 1, -1, 2, 1, 0, -1])
+        suffix_array = build_suffix_array(sequence)
+        expected = sorted(range(len(sequence)), key=lambda i: tuple(sequence[i:]))
+
+        np.testing.assert_array_equal(suffix_array, expected)
+
+    def test_find_motif(self):
+        for motif in ([1, 2], [0, 3, 4], [4]):
+            expected = []
+            for s, lbl in enumerate(self.labels):
+                transitions, locs = get_transitions(lbl)
+                # position among the labeled transitions
+                positions = np.cumsum(transitions >= 0) - 1
+                for p in range(len(transitions) - len(motif) + 1):
+                    if list(transitions[p:p + len(motif)]) == motif:
+                        expected.append((s, positions[p], locs[p]))
+
+            locations = find_motif(self.index, motif)
+            assert count_motif(self.index, motif) == len(expected)
+            assert list(zip(locations['session'], locations['position'], locations['start'])) == expected
+            assert all(locations['end'] > locations['start'])
+
+        # motifs never match across sessions or unlabeled frames
+        assert count_motif(self.index, [-5, 0]) == 0
+        gap_index = build_motif_index([[1, 1, 2, 2, -5, -5, -5, 3, 3, 4]])
+        assert count_motif(gap_index, [2, 3]) == 0
+        assert count_motif(gap_index, [3, 4]) == 1
+        # a motif before a gap ends where the gap starts
+        assert list(find_motif(gap_index, [2])['end']) == [4]
+        assert find_motif(self.index, [9, 9]).empty
+
+    def test_get_top_n_grams(self):
+        top = get_top_n_grams(self.index, n=2, k=3, label_group=['x', 'x', 'y', 'y'])
+
+        assert list(top['group']) == ['x'] * 3 + ['y'] * 3
+        for g, sessions in (('x', [0, 1]), ('y', [2, 3])):
+            group_top = top[top['group'] == g]
+            assert group_top['count'].is_monotonic_decreasing
+            for motif, count in zip(group_top['motif'], group_top['count']):
+                subset = build_motif_index([self.labels[s] for s in sessions])
+                assert count_motif(subset, motif) == count
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,270 @@
+import os
+import unittest
+import tempfile
+import numpy as np
+import pandas as pd
+from scipy import stats
+from unittest import TestCase
+from moseq2_viz.model.stat import run_manual_KW_test, get_tie_correction, \
+    dunns_z_test_permute_within_group_pairs, dunns_z_test_streaming, bootstrap_me, bootstrap_moments, \
+    run_batch_kruskal, get_session_mean_df, mann_whitney_vect, ttest_vect, run_all_pairwise_stats, \
+    run_sequential_KW_test, dunns_z_test_sequential, get_session_mean_array, rank_columns, get_rank_stats, \
+    kruskal_columns
+
+
+def make_syllable_df(n_per_group=(6, 7, 5), n_syllables=10, seed=0):
+    rng = np.random.RandomState(seed)
+    rows = []
+    for g, n in enumerate(n_per_group):
+        for m in range(n):
+            # the first syllable differs between groups
+            usage = rng.rand(n_syllables)
+            usage[0] += g
+            for s in range(n_syllables):
+                rows.append({'group': f'group{g}', 'uuid': f'{g}-{m}', 'syllable': s, 'usage': usage[s]})
+    return pd.DataFrame(rows)
+
+
+class TestModelStat(TestCase):
+
+    def setUp(self):
+        self.df = make_syllable_df()
+        usages = self.df.pivot_table(index=['group', 'uuid'], columns='syllable', values='usage')
+        self.df_usage = usages.reset_index()[list(range(10))]
+        self.n_per_group = np.array([6, 7, 5])
+        self.cum_group_idx = np.insert(np.cumsum(self.n_per_group), 0, 0)
+
+    def test_get_session_mean_df(self):
+        df = pd.concat([self.df, self.df.assign(usage=self.df.usage * 2)], ignore_index=True)
+        df['duration'] = np.random.RandomState(1).rand(len(df))
+        df.loc[df.index % 7 == 0, 'usage'] = np.nan
+        # syllable without any values, and a session without values for the syllables that are kept
+        df.loc[df.syllable == 3, 'usage'] = np.nan
+        df.loc[(df.uuid == '1-2') & (df.syllable < 8), 'usage'] = np.nan
+
+        for stat in ('usage', 'duration'):
+            expected = df[df.syllable < 8].pivot_table(index=['group', 'uuid'], columns='syllable',
+                                                       values=stat).replace(np.nan, 0)
+            pd.testing.assert_frame_equal(get_session_mean_df(df, stat, max_syllable=8), expected)
+
+        sessions, stat_array = get_session_mean_array(df, ['usage', 'duration'], max_syllable=12)
+        assert stat_array.shape == (18, 12, 2)
+        np.testing.assert_array_equal(sessions.uuid, get_session_mean_df(df, 'duration', 12).reset_index().uuid)
+        np.testing.assert_allclose(stat_array[:, :10, 0], get_session_mean_df(df, 'usage', 12).reindex(
+            index=pd.MultiIndex.from_frame(sessions), columns=range(10), fill_value=0).values)
+        assert np.all(stat_array[:, 10:] == 0)
+
+        # cached factorizations are not reused after the sessions are regrouped in place
+        regroup = {uuid: 'x' if i % 3 else 'y' for i, uuid in enumerate(df.uuid.unique())}
+        df['group'] = df['uuid'].map(regroup)
+        for max_syllable in (8, 12):
+            expected = df[df.syllable < max_syllable].pivot_table(index=['group', 'uuid'], columns='syllable',
+                                                                  values='duration').replace(np.nan, 0)
+            pd.testing.assert_frame_equal(get_session_mean_df(df, 'duration', max_syllable), expected)
+        df.loc[df.uuid == '0-0', 'group'] = 'z'
+        assert 'z' in get_session_mean_df(df, 'duration', 8).index.get_level_values('group')
+
+    def test_kruskal_columns(self):
+        rng = np.random.RandomState(0)
+        # integer values to include ties, and a constant syllable
+        x = rng.randint(0, 5, size=(18, 8)).astype(float)
+        x[:, 3] = rng.rand(18)
+        x[:, 7] = 2
+
+        ranks, tie_term = rank_columns(x)
+        np.testing.assert_allclose(ranks, np.apply_along_axis(stats.rankdata, 0, x))
+
+        real_ranks, KW_tie_correct, X_ties = get_rank_stats(x)
+        np.testing.assert_allclose(KW_tie_correct, np.apply_along_axis(stats.tiecorrect, 0, ranks))
+        np.testing.assert_allclose(X_ties, pd.DataFrame(x).apply(get_tie_correction, 0, N_m=18).values)
+
+        h, p = kruskal_columns(x, self.n_per_group)
+        for s in range(7):
+            res = stats.kruskal(*np.array_split(x[:, s], self.cum_group_idx[1:-1]))
+            np.testing.assert_allclose([h[s], p[s]], [res.statistic, res.pvalue])
+        assert np.isnan(h[7])
+
+    def test_run_manual_KW_test(self):
+        df_usage = self.df_usage.copy()
+        # make the last syllable unused
+        df_usage[9] = 0.0
+        merged = df_usage.values
+        N_m, N_s = merged.shape
+
+        # dense reference computation
+        perm = np.random.RandomState(seed=1).rand(500, N_m).argsort(-1)
+        ranks = np.apply_along_axis(stats.rankdata, 0, merged)
+        perm_ranks = ranks[perm]
+        ssbn = sum(perm_ranks[:, self.cum_group_idx[i]:self.cum_group_idx[i + 1]].sum(1) ** 2 / n
+                   for i, n in enumerate(self.n_per_group))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            expected = (12.0 / (N_m * (N_m + 1)) * ssbn - 3 * (N_m + 1)) / \
+                       np.apply_along_axis(stats.tiecorrect, 0, ranks)
+
+        # results do not depend on the chunk size or number of workers
+        for max_memory_mb, n_jobs in ((256, 1), (0.01, 1), (0.01, 2)):
+            h_all, real_ranks, X_ties = run_manual_KW_test(df_usage, merged, 3, self.n_per_group,
+                                                           self.cum_group_idx, n_perm=500, seed=1,
+                                                           n_jobs=n_jobs, max_memory_mb=max_memory_mb)
+            np.testing.assert_allclose(h_all, expected)
+            np.testing.assert_array_equal(real_ranks, ranks)
+            assert X_ties.shape == (N_s,)
+        assert np.isnan(h_all[:, 9]).all()
+
+        # the scipy check only uses syllables scipy can test
+        mostly_constant = merged.copy()
+        mostly_constant[:, 1:] = 0
+        for _ in range(5):
+            h_all, _, _ = run_manual_KW_test(df_usage, mostly_constant, 3, self.n_per_group, self.cum_group_idx,
+                                             n_perm=50, seed=1)
+            assert np.isfinite(h_all[:, 0]).all() and np.isnan(h_all[:, 1:]).all()
+
+    def test_dunns_z_test_streaming(self):
+        grouped = self.df.pivot_table(index=['group', 'uuid'], columns='syllable', values='usage').reset_index()
+        vc = grouped.group.value_counts().loc[grouped.group.unique()]
+        N_m = len(grouped)
+        ranks = np.apply_along_axis(stats.rankdata, 0, self.df_usage.values)
+        X_ties = self.df_usage.apply(get_tie_correction, 0, N_m=N_m).values
+
+        null_zs, real_zs = dunns_z_test_permute_within_group_pairs(grouped, vc, ranks, X_ties, N_m, vc.index,
+                                                                   np.random.RandomState(0), 2000)
+        exceedances, stream_real_zs = dunns_z_test_streaming(grouped, vc, ranks, X_ties, N_m, vc.index, 2000,
+                                                             seed=0, chunk_size=300)
+
+        assert list(exceedances) == list(real_zs)
+        for pair in real_zs:
+            np.testing.assert_allclose(stream_real_zs[pair], real_zs[pair])
+            # both permutation schemes sample the same null distribution
+            np.testing.assert_allclose(exceedances[pair] / 2000, (null_zs[pair] > real_zs[pair]).mean(0), atol=0.06)
+
+        # results only depend on the seed
+        rerun, _ = dunns_z_test_streaming(grouped, vc, ranks, X_ties, N_m, vc.index, 2000, seed=0, chunk_size=700,
+                                          n_jobs=2)
+        for pair in exceedances:
+            np.testing.assert_array_equal(exceedances[pair], rerun[pair])
+
+    def test_sequential_permutation_tests(self):
+        merged = self.df_usage.values
+        N_m, N_s = merged.shape
+
+        n_exceed, n_done, ranks, X_ties = run_sequential_KW_test(merged, 3, self.n_per_group, self.cum_group_idx,
+                                                                 n_perm=8000, seed=1, min_perm=200)
+        h_all, _, _ = run_manual_KW_test(self.df_usage, merged, 3, self.n_per_group, self.cum_group_idx,
+                                         n_perm=8000, seed=1)
+        real = np.array([stats.kruskal(*np.array_split(merged[:, s], self.cum_group_idx[1:-1])).statistic
+                         for s in range(N_s)])
+
+        # clearly (non-)significant syllables stop early, on the same permutations as the full test
+        assert n_done.min() == 200 and n_done.sum() < 8000 * N_s
+        for s in range(N_s):
+            assert n_exceed[s] == (h_all[:n_done[s], s] > real[s]).sum()
+        assert (n_exceed[0] + 1) / n_done[0] < 0.05 / N_s
+
+        grouped = self.df.pivot_table(index=['group', 'uuid'], columns='syllable', values='usage').reset_index()
+        vc = grouped.group.value_counts().loc[grouped.group.unique()]
+        exceedances, pair_done, real_zs = dunns_z_test_sequential(grouped, vc, ranks, X_ties, N_m, vc.index, 8000,
+                                                                  seed=0, min_perm=200)
+        for pair in exceedances:
+            for n in np.unique(pair_done[pair]):
+                stream_exceed, _ = dunns_z_test_streaming(grouped, vc, ranks, X_ties, N_m, vc.index, n, seed=0)
+                stopped = pair_done[pair] == n
+                np.testing.assert_array_equal(exceedances[pair][stopped], stream_exceed[pair][stopped])
+
+    def test_bootstrap_moments(self):
+        usages = np.random.RandomState(0).rand(12, 5)
+        usages[:, 4] = 0.5
+
+        moments = bootstrap_moments(usages, n_iters=20000, chunk_size=3000, seed=0, quantiles=[0.025, 0.975])
+        # the seeded dense bootstrap draws the same resamples
+        boots = bootstrap_me(usages, n_iters=20000, seed=0)
+
+        assert moments['n'][0] == 20000
+        np.testing.assert_allclose(moments['mean'], boots.mean(0), rtol=1e-12)
+        np.testing.assert_allclose(moments['std'], boots.std(0), rtol=1e-9, atol=1e-12)
+        # quantiles are read from a histogram sketch, accurate to one bin width
+        np.testing.assert_allclose(moments['quantiles'][:, :4], np.percentile(boots, [2.5, 97.5], axis=0)[:, :4],
+                                   atol=2e-3)
+        assert moments['std'][4] == 0
+
+        # results only depend on the seed, not on the chunk size or number of workers
+        rerun = bootstrap_moments(usages, n_iters=20000, chunk_size=700, seed=0, n_jobs=2)
+        np.testing.assert_allclose(moments['mean'], rerun['mean'], rtol=1e-12)
+        np.testing.assert_allclose(moments['std'], rerun['std'], rtol=1e-9, atol=1e-12)
+
+    def test_run_batch_kruskal(self):
+        df = self.df.copy()
+        df['duration'] = np.random.RandomState(1).rand(len(df))
+
+        df_kw, df_dunn = run_batch_kruskal(df, ['usage', 'duration'], max_syllable=10, n_perm=500)
+        assert df_kw.shape[0] == 10 * 2
+        assert df_dunn.shape[0] == 10 * 2 * 3
+
+        for stat in ('usage', 'duration'):
+            usages = get_session_mean_df(df, stat, 10).reset_index()[list(range(10))]
+            h_all, _, _ = run_manual_KW_test(usages, usages.values, 3, self.n_per_group, self.cum_group_idx,
+                                             n_perm=500, seed=42)
+            real = [stats.kruskal(*np.array_split(usages.values[:, s], self.cum_group_idx[1:-1])).statistic
+                    for s in range(10)]
+
+            # same H-statistics and permutations as the single statistic test
+            stat_kw = df_kw[df_kw.stat == stat]
+            np.testing.assert_allclose(stat_kw.statistic, real)
+            np.testing.assert_array_equal(stat_kw.p_perm, ((h_all > np.array(real)).sum(0) + 1) / 500)
+
+        assert df_kw.is_sig[(df_kw.stat == 'usage') & (df_kw.syllable == 0)].all()
+
+    def test_stats_cache(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            df_kw, df_dunn = run_batch_kruskal(self.df, max_syllable=10, n_perm=200, cache_dir=cache_dir)
+            assert len(os.listdir(cache_dir)) == 1
+
+            # cache hits return the stored results
+            cached_kw, cached_dunn = run_batch_kruskal(self.df, max_syllable=10, n_perm=200, n_jobs=2,
+                                                       cache_dir=cache_dir)
+            pd.testing.assert_frame_equal(df_kw, cached_kw)
+            pd.testing.assert_frame_equal(df_dunn, cached_dunn)
+            assert len(os.listdir(cache_dir)) == 1
+
+            # changes to the parameters or data add new entries
+            run_batch_kruskal(self.df, max_syllable=10, n_perm=200, seed=0, cache_dir=cache_dir)
+            df = self.df.copy()
+            df.loc[0, 'usage'] += 1
+            new_kw, _ = run_batch_kruskal(df, max_syllable=10, n_perm=200, cache_dir=cache_dir)
+            assert len(os.listdir(cache_dir)) == 3
+            assert new_kw.statistic.iloc[0] != df_kw.statistic.iloc[0]
+
+            df_pvals = run_all_pairwise_stats(self.df, test_type='t_test', max_syllable=10, cache_dir=cache_dir)
+            pd.testing.assert_frame_equal(df_pvals, run_all_pairwise_stats(self.df, test_type='t_test',
+                                                                           max_syllable=10))
+            assert len(os.listdir(cache_dir)) == 4
+
+    def test_vectorized_pairwise_tests(self):
+        rng = np.random.RandomState(0)
+        # integer values to include ties, and a constant syllable
+        x = rng.randint(0, 4, size=(8, 6)).astype(float)
+        y = rng.randint(1, 5, size=(11, 6)).astype(float)
+        x[:, 5] = y[:, 5] = 1
+
+        for alternative in ('two-sided', 'less', 'greater'):
+            u, p = mann_whitney_vect(x, y, alternative=alternative)
+            for s in range(6):
+                try:
+                    res = stats.mannwhitneyu(x[:, s], y[:, s], alternative=alternative, method='asymptotic')
+                except TypeError:
+                    res = stats.mannwhitneyu(x[:, s], y[:, s], alternative=alternative)
+                np.testing.assert_allclose(u[s], res.statistic)
+                np.testing.assert_allclose(p[s], res.pvalue)
+
+        for equal_var in (True, False):
+            t, p = ttest_vect(x[:, :5], y[:, :5], equal_var=equal_var)
+            res = stats.ttest_ind(x[:, :5], y[:, :5], equal_var=equal_var)
+            np.testing.assert_allclose(t, res.statistic)
+            np.testing.assert_allclose(p, res.pvalue)
+
+        for test_type in ('mw', 't_test', 'z_test'):
+            df_pvals = run_all_pairwise_stats(self.df, test_type=test_type, max_syllable=10, seed=0, n_iters=1000)
+            assert len(df_pvals) == 3 * 10
+            assert (df_pvals[df_pvals.syllable == 0].pvalue < 0.05).all()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,11 @@
+import os
 import joblib
 import numpy as np
 from operator import add
 from copy import deepcopy
 from functools import reduce
 from unittest import TestCase
+from tempfile import TemporaryDirectory
 import matplotlib.pyplot as plt
 from collections import OrderedDict
 from moseq2_viz.util import parse_index, read_yaml
@@ -11,7 +13,9 @@ from moseq2_viz.model.util import parse_model_results
 from moseq2_viz.model.trans_graph import get_pos, get_trans_graph_groups, \
     get_group_trans_mats, get_transition_matrix, graph_transition_matrix,  get_transitions, make_transition_graphs, \
     make_difference_graphs, draw_graph, normalize_transition_matrix, \
-    convert_ebunch_to_graph, convert_transition_matrix_to_ebunch, compute_and_graph_grouped_TMs
+    convert_ebunch_to_graph, convert_transition_matrix_to_ebunch, compute_and_graph_grouped_TMs, \
+    n_gram_transition_matrix, get_transition_tensor, clear_layout_cache, bootstrap_transition_differences, \
+    write_transition_graphs
 
 def make_sequence(lbls, durs):
     arr = [[x] * y for x, y in zip(lbls, durs)]
@@ -117,6 +121,25 @@ class TestModelTransGraph(TestCase):
             normed_mtx = normalize_transition_matrix(deepcopy(init_matrix), norm)
             assert np.any(np.not_equal(init_matrix, normed_mtx))
 
+    def test_n_gram_transition_matrix(self):
+        labels = np.array([0, 1, 2, 1, 0, 5, 1, 2, 1, 3, 0])
+
+        bigrams = n_gram_transition_matrix(labels, n=2, max_label=4)
+        expected = np.zeros((4, 4))
+        for i, j in zip(labels[:-1], labels[1:]):
+            if i < 4 and j < 4:
+                expected[i, j] += 1
+        np.testing.assert_array_equal(bigrams, expected)
+
+        trigrams = n_gram_transition_matrix(labels, n=3, max_label=4)
+        assert trigrams.shape == (4, 4, 4)
+        assert trigrams[0, 1, 2] == 1
+        assert trigrams[1, 2, 1] == 2
+        # windows containing the out-of-range label 5 are skipped
+        assert trigrams.sum() == len(labels) - 2 - 3
+
+        assert n_gram_transition_matrix(labels[:1], n=2, max_label=4).sum() == 0
+
     def test_get_transition_matrix(self):
 
         test_model = 'data/test_model.p'
@@ -129,6 +152,60 @@ class TestModelTransGraph(TestCase):
         assert len(trans_mats) == 2
         assert trans_mats[0].shape == (20, 20)
 
+    def test_get_transition_tensor(self):
+        rng = np.random.default_rng(0)
+        labels = [np.r_[[-5] * 3, make_sequence(rng.integers(0, 30, size=200), rng.integers(1, 10, size=200))]
+                  for _ in range(5)]
+        groups = ['a', 'b', 'a', 'c', 'b']
+
+        for normalize in ('bigram', 'rows', 'columns'):
+            trans_mats = get_transition_matrix(labels, max_syllable=25, normalize=normalize, disable_output=True)
+            trans_tensor = get_transition_matrix(labels, max_syllable=25, normalize=normalize, as_tensor=True)
+            assert trans_tensor.shape == (5, 25, 25)
+            assert trans_tensor.dtype == np.float32
+            np.testing.assert_allclose(np.array(trans_mats), trans_tensor, rtol=1e-6, equal_nan=True)
+
+            group_tensor = get_transition_tensor(labels, max_syllable=25, normalize=normalize, smoothing=1,
+                                                 groups=groups, group_order=['c', 'a'], dtype='float64')
+            assert group_tensor.shape == (2, 25, 25)
+            group_a = get_transition_matrix([labels[0], labels[2]], max_syllable=25, normalize=normalize,
+                                            smoothing=1, combine=True, disable_output=True)
+            np.testing.assert_array_equal(group_tensor[1], group_a)
+
+    def test_sparse_transition_matrix(self):
+        rng = np.random.default_rng(1)
+        labels = [np.r_[[-5] * 3, make_sequence(rng.integers(0, 30, size=200), rng.integers(1, 10, size=200))]
+                  for _ in range(3)]
+
+        for normalize in ('bigram', 'rows', 'columns'):
+            dense = get_transition_matrix(labels, max_syllable=25, normalize=normalize, combine=True,
+                                          disable_output=True)
+            sparse = get_transition_matrix(labels, max_syllable=25, normalize=normalize, combine=True,
+                                           disable_output=True, sparse=True)
+            # empty rows/columns stay zero in the sparse matrix instead of NaN
+            np.testing.assert_allclose(np.nan_to_num(dense), sparse.toarray())
+
+        # n > 2 is sparse by default, with one row per (n - 1)-syllable prefix
+        trigrams = get_transition_matrix(labels, max_syllable=25, normalize='rows', n=3, disable_output=True)
+        assert len(trigrams) == 3
+        assert trigrams[0].shape == (25 ** 2, 25)
+        dense_trigrams = get_transition_matrix(labels, max_syllable=25, normalize='rows', n=3, sparse=False,
+                                               disable_output=True)
+        assert dense_trigrams[0].shape == (25, 25, 25)
+        np.testing.assert_allclose(np.nan_to_num(dense_trigrams[0]).reshape(-1, 25), trigrams[0].toarray())
+
+        with self.assertRaises(ValueError):
+            get_transition_matrix(labels, max_syllable=25, n=3, smoothing=1, disable_output=True)
+
+        # group differences work directly on the sparse matrices
+        trans_mats = get_transition_matrix(labels[:2], max_syllable=20, sparse=True, disable_output=True)
+        dense_mats = get_transition_matrix(labels[:2], max_syllable=20, disable_output=True)
+        sparse_graphs = make_difference_graphs(trans_mats, None, ['a', 'b'], ['a', 'b'], {}, [], None, [],
+                                               difference_graphs=[])[2]
+        dense_graphs = make_difference_graphs(dense_mats, None, ['a', 'b'], ['a', 'b'], {}, [], None, [],
+                                              difference_graphs=[])[2]
+        assert list(sparse_graphs[0].edges()) == list(dense_graphs[0].edges())
+
     def test_convert_ebunch_to_graph(self):
 
         test_model = 'data/test_model.p'
@@ -164,6 +241,93 @@ class TestModelTransGraph(TestCase):
         assert len(ebunch) == 0
         assert len(orphans) == 400
 
+    def test_convert_transition_matrix_to_ebunch_masks(self):
+        weights = np.array([[0.0, 0.2, -0.05],
+                            [0.3, 0.0, 0.01],
+                            [-0.4, 0.02, 0.1]])
+
+        ebunch, orphans = convert_transition_matrix_to_ebunch(weights, weights, edge_threshold=0.03,
+                                                              keep_orphans=True)
+        assert ebunch == [(0, 1, 0.2), (0, 2, -0.05), (1, 0, 0.3), (2, 0, -0.4), (2, 2, 0.1)]
+        assert orphans == [(0, 0), (1, 1), (1, 2), (2, 1)]
+
+        # edges outside of indices become orphans
+        ebunch, orphans = convert_transition_matrix_to_ebunch(weights, weights, edge_threshold=0.03,
+                                                              keep_orphans=True, indices=[(0, 1), (2, 0)])
+        assert ebunch == [(0, 1, 0.2), (2, 0, -0.4)]
+        assert orphans == [(0, 0), (1, 1), (1, 2), (2, 1), (0, 2), (1, 0), (2, 2)]
+
+        # both nodes of an edge need to pass the usage threshold
+        usages = {0: 0.5, 1: 0.01, 2: 0.3}
+        ebunch, _ = convert_transition_matrix_to_ebunch(weights, weights, edge_threshold=0.03,
+                                                        usages=usages, usage_threshold=0.1)
+        assert ebunch == [(0, 2, -0.05), (2, 0, -0.4), (2, 2, 0.1)]
+
+        # range thresholds: the in-node excludes the lower bound, the out-node includes it
+        ebunch, _ = convert_transition_matrix_to_ebunch(weights, weights, edge_threshold=0.03,
+                                                        usages=usages, usage_threshold=(0.3, 0.5))
+        assert ebunch == [(0, 2, -0.05)]
+
+    def test_bootstrap_transition_differences(self):
+        rng = np.random.RandomState(0)
+        # group b switches the 0 -> 1 transition to 0 -> 2
+        base = [0, 1, 2, 3] * 50
+        switched = [0, 2, 1, 3] * 50
+        labels = [np.repeat(base, rng.randint(1, 4, size=len(base))) for _ in range(4)]
+        labels += [np.repeat(switched, rng.randint(1, 4, size=len(switched))) for _ in range(4)]
+        label_group = ['a'] * 4 + ['b'] * 4
+
+        differences = bootstrap_transition_differences(labels, label_group, ['a', 'b'], max_syllable=4,
+                                                       normalize='rows', n_bootstrap=200, chunk_size=64)
+        assert list(differences) == [('a', 'b')]
+        res = differences[('a', 'b')]
+
+        trans_mats, _ = get_group_trans_mats(labels, label_group, ['a', 'b'], 4, normalize='rows')
+        np.testing.assert_allclose(res['difference'], trans_mats[1] - trans_mats[0])
+        assert np.all(res['ci_low'] <= res['difference']) and np.all(res['difference'] <= res['ci_high'])
+        assert res['significant'][0, 1] and res['significant'][0, 2]
+        assert not res['significant'][3, 0]
+
+        # same seed gives the same bootstrap, independent of the chunk size
+        rerun = bootstrap_transition_differences(labels, label_group, ['a', 'b'], max_syllable=4,
+                                                 normalize='rows', n_bootstrap=200, chunk_size=200)
+        np.testing.assert_array_equal(res['pvalue'], rerun[('a', 'b')]['pvalue'])
+
+        # syllable 3 is only used by group a, so its row-normalized difference is undefined
+        partial = [np.repeat(base, rng.randint(1, 4, size=len(base))) for _ in range(2)]
+        partial += [np.repeat([0, 2, 1] * 50, rng.randint(1, 4, size=150)) for _ in range(2)]
+        missing = bootstrap_transition_differences(partial, ['a', 'a', 'b', 'b'], ['a', 'b'], max_syllable=4,
+                                                   normalize='rows', n_bootstrap=200, chunk_size=64)[('a', 'b')]
+        assert np.isnan(missing['difference'][3]).all()
+        assert np.isnan(missing['pvalue'][3]).all() and np.isnan(missing['std'][3]).all()
+        assert not missing['significant'][3].any()
+        assert missing['significant'][0, 1] and missing['significant'][0, 2]
+
+        # non-significant edges are dropped from the difference graph
+        _, _, graphs, *_ = make_difference_graphs(trans_mats, None, ['a', 'b'], ['a', 'b'], {}, [], None, [],
+                                                  difference_threshold=0, difference_graphs=[],
+                                                  edge_filter={k: v['significant'] for k, v in differences.items()})
+        assert set(graphs[0].edges()) == set(zip(*np.where(res['significant'] & (res['difference'] != 0))))
+
+    def test_write_transition_graphs(self):
+        rng = np.random.RandomState(0)
+        labels = [np.repeat(rng.randint(0, 10, 300), rng.randint(1, 4, 300)) for _ in range(6)]
+        label_group = ['a', 'b', 'c'] * 2
+        trans_mats, usages = get_group_trans_mats(labels, label_group, ['a', 'b', 'c'], 10)
+
+        with TemporaryDirectory() as tmp:
+            output_file = os.path.join(tmp, 'transitions')
+            output_files = write_transition_graphs(trans_mats, output_file, usages=usages, groups=['a', 'b', 'c'],
+                                                   edge_threshold=0.001, max_syllable=10, processes=2,
+                                                   summary=True)
+
+            # 3 group graphs, 3 difference graphs and the summary figure
+            names = ['a', 'b', 'c', 'b-a', 'c-a', 'c-b']
+            assert output_files == [f'{output_file}_{n}' for n in names] + [output_file]
+            for f in output_files:
+                assert os.path.exists(f'{f}.png')
+                assert os.path.exists(f'{f}.pdf')
+
     def test_make_difference_graph(self):
 
         test_model = 'data/test_model.p'
@@ -275,6 +439,32 @@ class TestModelTransGraph(TestCase):
             else:
                 assert len(pos.keys()) == len(usages_anchor.keys())
 
+    def test_get_pos_cache(self):
+        ebunch = [(i, (i * 7) % 30, 0.1) for i in range(30)]
+        graph_anchor = convert_ebunch_to_graph(ebunch)
+        nnodes = graph_anchor.number_of_nodes()
+
+        clear_layout_cache()
+        with TemporaryDirectory() as tmp:
+            cache_file = os.path.join(tmp, 'transitions_layout.p')
+            pos = get_pos(graph_anchor, 'spring', nnodes, seed=0, cache_file=cache_file)
+            assert os.path.exists(cache_file)
+
+            # modifying the returned layout doesn't change the cached one
+            pos[0][:] = 100
+            pos2 = get_pos(graph_anchor, 'spring', nnodes, seed=0)
+            assert not np.allclose(pos2[0], 100)
+
+            # the persisted layout is reused after the in-memory cache is cleared
+            clear_layout_cache()
+            pos3 = get_pos(graph_anchor, 'spring', nnodes, seed=0, cache_file=cache_file)
+            for node in pos2:
+                np.testing.assert_array_equal(pos2[node], pos3[node])
+
+            pos4 = get_pos(graph_anchor, 'spring', nnodes, seed=1)
+            assert not np.allclose(pos4[0], pos2[0])
+        clear_layout_cache()
+
     def test_draw_graphs(self):
         test_model = 'data/test_model.p'
         width_per_group = 8
@@ -1,6 +1,7 @@
 import os
 import math
 import joblib
+import h5py
 import shutil
 import unittest
 import numpy as np
@@ -9,15 +10,17 @@ from operator import add
 from copy import deepcopy
 from functools import reduce
 from unittest import TestCase
+from tempfile import TemporaryDirectory
 from cytoolz import keyfilter, groupby
 from moseq2_viz.model.trans_graph import get_transitions
 from moseq2_viz.scalars.util import scalars_to_dataframe
 from moseq2_viz.util import parse_index, get_index_hits, load_changepoint_distribution, load_timestamps, read_yaml
 from moseq2_viz.model.util import (relabel_by_usage, h5_to_dict, retrieve_pcs_from_slices,
     get_best_fit, get_syllable_statistics, parse_model_results, merge_models, get_mouse_syllable_slices,
-    syllable_slices_from_dict, get_syllable_slices, labels_to_changepoints,
-    _gen_to_arr, normalize_pcs, _whiten_all, simulate_ar_trajectory, whiten_pcs,
-    make_separate_crowd_movies, get_normalized_syllable_usages, get_Xy_values, compute_behavioral_statistics)
+    syllable_slices_from_dict, get_syllable_slices, get_syllable_instance_table, labels_to_changepoints,
+    _gen_to_arr, normalize_pcs, _whiten_all, simulate_ar_trajectory, simulate_ar_trajectories, whiten_pcs,
+    make_separate_crowd_movies, get_normalized_syllable_usages, get_Xy_values, compute_behavioral_statistics,
+    prepare_model_dataframe)
 
 def make_sequence(lbls, durs):
     arr = [[x] * y for x, y in zip(lbls, durs)]
@@ -49,6 +52,35 @@ class TestModelUtils(TestCase):
 
         assert X.ndim == 2
 
+    def test_compute_behavioral_statistics_numpy_engine(self):
+        rng = np.random.default_rng(0)
+        dfs = []
+        for i in range(6):
+            labels = make_sequence(rng.integers(0, 12, size=100), rng.integers(1, 9, size=100))
+            labels[:3] = -5
+            df = pd.DataFrame({'group': ['ctrl', 'exp', 'ko'][i % 3],
+                               'uuid': f'session{i}',
+                               'labels (original)': labels,
+                               'labels (usage sort)': labels,
+                               'onset': np.r_[True, np.diff(labels) != 0],
+                               'velocity_2d_mm': rng.normal(size=len(labels)),
+                               'height_ave_mm': rng.normal(size=len(labels)).astype('float32'),
+                               'frame index': np.arange(len(labels))})
+            df.loc[rng.random(len(df)) < 0.05, 'velocity_2d_mm'] = np.nan
+            dfs.append(df)
+        scalar_df = pd.concat(dfs, ignore_index=True)
+
+        for count in ('usage', 'frames'):
+            for group_cols in (['group', 'uuid'], ['group']):
+                for usage_normalization in (True, False):
+                    kwargs = dict(groupby=group_cols, count=count, usage_normalization=usage_normalization)
+                    pd_df = compute_behavioral_statistics(scalar_df, engine='pandas', **kwargs)
+                    np_df = compute_behavioral_statistics(scalar_df, engine='numpy', **kwargs)
+                    pd.testing.assert_frame_equal(pd_df, np_df, check_dtype=False, rtol=1e-5)
+
+        with self.assertRaises(ValueError):
+            compute_behavioral_statistics(scalar_df, engine='polars')
+
     def test_index_hits(self):
 
         test_index = 'data/test_index.yaml'
@@ -251,6 +283,26 @@ class TestModelUtils(TestCase):
 
         np.testing.assert_array_equal(actual_labels, list(labels.values()))
 
+    def test_prepare_model_dataframe(self):
+        model_path = 'data/test_model.p'
+        pca_path = 'data/test_scores.h5'
+
+        labels = parse_model_results(model_path, map_uuid_to_keys=True)['labels']
+        usage, _ = relabel_by_usage(labels, count='usage')
+        frames, _ = relabel_by_usage(labels, count='frames')
+
+        model_df = prepare_model_dataframe(model_path, pca_path)
+
+        assert len(model_df) == sum(len(v) for v in labels.values())
+        assert model_df['uuid'].dtype.name == 'category'
+        assert model_df['group'].dtype.name == 'category'
+        for k in labels:
+            session_df = model_df[model_df['uuid'] == k]
+            np.testing.assert_array_equal(session_df['labels (original)'], labels[k])
+            np.testing.assert_array_equal(session_df['labels (usage sort)'], usage[k])
+            np.testing.assert_array_equal(session_df['labels (frames sort)'], frames[k])
+            np.testing.assert_array_equal(session_df['syllable index'], np.arange(len(labels[k])))
+
     def test_normalize_pcs(self):
         index_file = 'data/test_index.yaml'
 
@@ -334,6 +386,33 @@ class TestModelUtils(TestCase):
 
         assert pca_scores.values() != whitened_test.values()
 
+    def test_streaming_whiten_and_normalize_pcs(self):
+        rng = np.random.default_rng(0)
+        mixing = rng.normal(size=(10, 10))
+        pca_scores = {f'session{i}': rng.normal(size=(n, 10)) @ mixing + 3 for i, n in enumerate([500, 731, 1002])}
+        pca_scores['session1'][5] = np.nan
+
+        with TemporaryDirectory() as tmp:
+            pca_path = os.path.join(tmp, 'pca_scores.h5')
+            with h5py.File(pca_path, 'w') as f:
+                for k, v in pca_scores.items():
+                    f.create_dataset(f'scores/{k}', data=v)
+
+            for method in ('all', 'each'):
+                in_memory = whiten_pcs(pca_scores, method)
+                streamed = whiten_pcs(pca_scores, method, chunk_size=97)
+                out_file = whiten_pcs(pca_path, method, chunk_size=64, output_file=os.path.join(tmp, 'white.h5'))
+                on_disk = h5_to_dict(out_file, 'scores')
+                for k in pca_scores:
+                    np.testing.assert_allclose(in_memory[k], streamed[k], rtol=1e-6, atol=1e-8)
+                    np.testing.assert_allclose(in_memory[k], on_disk[k], rtol=1e-6, atol=1e-8)
+
+            for method in ('zscore', 'demean', 'ind-zscore'):
+                in_memory = normalize_pcs(pca_scores, method)
+                streamed = normalize_pcs(pca_path, method, chunk_size=77)
+                for k in pca_scores:
+                    np.testing.assert_allclose(in_memory[k], streamed[k], rtol=1e-6, atol=1e-8)
+
     def test_retrieve_pcs_from_slices(self):
 
         index_file = 'data/test_index.yaml'
@@ -355,6 +434,30 @@ class TestModelUtils(TestCase):
 
         assert syllable_matrix.shape == (100, 30, 10)
 
+    def test_get_syllable_instance_table(self):
+        rng = np.random.default_rng(0)
+        uuids = ['a', 'b', 'c']
+        labels = [np.repeat(rng.integers(0, 5, size=40), rng.integers(1, 8, size=40)) for _ in uuids]
+        index = {'files': {k: {'path': [f'{k}.h5', f'{k}.yaml']} for k in uuids}}
+
+        table = get_syllable_instance_table(labels, uuids, index, trim_nans=False)
+        for syllable in range(5):
+            slices = get_syllable_slices(syllable, labels, uuids, index, trim_nans=False)
+            sub = table[table['syllable'] == syllable]
+            assert [[(s, e), u, h] for s, e, u, h in zip(sub['start'], sub['end'], sub['uuid'], sub['h5'])] == slices
+
+        # table rows are used directly by retrieve_pcs_from_slices
+        pca_scores = {k: rng.normal(size=(len(v), 10)) for k, v in zip(uuids, labels)}
+        slices = get_syllable_slices(2, labels, uuids, index, trim_nans=False)
+        from_slices = retrieve_pcs_from_slices(slices, pca_scores, max_dur=30, max_samples=None)
+        from_table = retrieve_pcs_from_slices(table[table['syllable'] == 2], pca_scores, max_dur=30, max_samples=None)
+        np.testing.assert_array_equal(from_slices, from_table)
+
+        (start, end), uuid, _ = next(s for s in slices if 3 < s[0][1] - s[0][0] < 30)
+        i = [s[0] for s in slices if 3 < s[0][1] - s[0][0] < 30].index((start, end))
+        np.testing.assert_allclose(from_table[i, :end - start], pca_scores[uuid][start:end], rtol=1e-6)
+        assert np.all(from_table[i, end - start:] == 0)
+
     def test_simulate_ar_trajectory(self):
         model_path = 'data/mock_model.p'
 
@@ -365,6 +468,28 @@ class TestModelUtils(TestCase):
         assert sim_mats.shape == (100, 100)
         assert ar_mats.all() != sim_mats.all()
 
+    def test_simulate_ar_trajectories(self):
+        rng = np.random.default_rng(0)
+        nstates, npcs, nlags = 5, 4, 3
+        ar_mats = rng.normal(scale=0.2, size=(nstates, npcs, npcs * nlags + 1))
+        init_points = rng.normal(size=(nstates, 2, 2 * nlags + 1, npcs))
+
+        sim_mats = simulate_ar_trajectories(ar_mats, init_points[:, 0], sim_points=20)
+        assert sim_mats.shape == (nstates, 20, npcs)
+        for i in range(nstates):
+            np.testing.assert_allclose(sim_mats[i], simulate_ar_trajectory(ar_mats[i], init_points[i, 0], sim_points=20),
+                                       rtol=1e-5, atol=1e-6)
+
+        # multiple initial points per state
+        sim_mats = simulate_ar_trajectories(ar_mats, init_points, sim_points=20)
+        assert sim_mats.shape == (nstates, 2, 20, npcs)
+        np.testing.assert_allclose(sim_mats[3, 1], simulate_ar_trajectory(ar_mats[3], init_points[3, 1], sim_points=20),
+                                   rtol=1e-5, atol=1e-6)
+
+        # no initial points
+        sim_mats = simulate_ar_trajectories(ar_mats, sim_points=20)
+        np.testing.assert_allclose(sim_mats[0], simulate_ar_trajectory(ar_mats[0], sim_points=20), rtol=1e-5, atol=1e-6)
+
     def test_get_best_fit(self):
         model_path_1 = 'data/mock_model.p'
         model_path_2 = 'data/test_model.p'